@@ -0,0 +1,412 @@
+import argparse
+import queue
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from enum import StrEnum
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sno_fo_fro.analyzer import (
+    METRIC_COLDNESS,
+    METRIC_CONTRAST,
+    METRIC_SATURATION,
+    METRIC_WHITENESS,
+    CombinedImageProcessor,
+    ImageAnalyzer,
+)
+from sno_fo_fro.classifier import (
+    PATH_TO_MODEL,
+    H2OMLClassifier,
+    ImageClassifier,
+    MockImageClassifier,
+)
+from sno_fo_fro.classify import collect_paths
+from sno_fo_fro.h2o_backend import get_shared_backend
+from sno_fo_fro.jpeg_fast import JpegCalibration, JpegFastAnalyzer, decode_reduced
+
+# Scale factor of the decode of the cheap tier
+CHEAP_FACTOR = 8
+
+# Per-pixel color statistics without any filtering; a matching model has to be
+# trained on `cheap_metrics` of the training images
+CheapAnalyzer = CombinedImageProcessor[float](
+    [METRIC_WHITENESS, METRIC_CONTRAST, METRIC_SATURATION, METRIC_COLDNESS]
+)
+
+
+class QualityTier(StrEnum):
+    """
+    Enum for specifying how much work is spent on a request, from the best to the cheapest.
+
+    FULL: All metrics of the full-resolution image.
+    REDUCED: All metrics estimated from a scaled JPEG decode.
+    CHEAP: A few color metrics of a 1/8 decode, scored by a matching model.
+    REJECT: The request is not processed.
+    """
+
+    FULL = "full"
+    REDUCED = "reduced"
+    CHEAP = "cheap"
+    REJECT = "reject"
+
+
+def cheap_metrics(path: str) -> Dict[str, float]:
+    """
+    Computes the metrics of the cheap tier, also to train its model.
+    """
+    image, _ = decode_reduced(path, CHEAP_FACTOR)
+    if image is None:
+        raise ValueError(f"Could not read image at {path}")
+    return {
+        name: float(value) for name, value in CheapAnalyzer.process_image(image).items()
+    }
+
+
+class TieredResult(NamedTuple):
+    """
+    Response of the admission service.
+
+    Attributes:
+        path: The image path.
+        tier: The quality tier the request was served with.
+        label: The predicted class label (None if rejected).
+        probabilities: The probability of every class label (may be empty).
+        latency: Seconds from the submission to the response.
+    """
+
+    path: str
+    tier: QualityTier
+    label: Optional[str]
+    probabilities: Dict[str, float]
+    latency: float
+
+
+class AdaptiveController:
+    """
+    Chooses the quality tier of every request to hold a latency SLO.
+
+    Two signals are combined:
+    - Queue: when a request is dequeued, the best tier is chosen whose estimated
+      service time fits into what is left of the SLO, and at which the requests
+      still waiting would be served within the SLO as well. Service times are
+      moving averages per tier.
+    - Percentile: when the recent latency percentile exceeds the SLO, the best
+      allowed tier (the ceiling) is lowered; it is raised again once the
+      percentile falls well below the SLO. Changes are spaced by a cooldown.
+
+    A tier is only measured when it serves requests, so a tier skipped for
+    its estimate is probed again: when nothing is waiting, every
+    `probe_interval`-th request passing it over is served with it anyway.
+    """
+
+    def __init__(
+        self,
+        slo: float = 1.0,
+        percentile: float = 95,
+        window: int = 100,
+        tiers: Sequence[QualityTier] = (
+            QualityTier.FULL,
+            QualityTier.REDUCED,
+            QualityTier.CHEAP,
+        ),
+        smoothing: float = 0.2,
+        recover_ratio: float = 0.5,
+        cooldown: int = 20,
+        probe_interval: int = 50,
+    ):
+        """
+        Initializes the AdaptiveController.
+
+        Args:
+            slo: The latency objective in seconds.
+            percentile: The latency percentile held below the SLO.
+            window: The number of recent latencies the percentile is computed on.
+            tiers: The available tiers from the best to the cheapest.
+            smoothing: The weight of a new service time in the moving averages.
+            recover_ratio: The ceiling is raised when the percentile is below
+                this share of the SLO.
+            cooldown: The minimal number of responses between two ceiling changes.
+            probe_interval: The number of idle requests after which a tier
+                skipped for its service time is tried again.
+        """
+        self.slo = slo
+        self.percentile = percentile
+        self.tiers = list(tiers)
+        self.smoothing = smoothing
+        self.recover_ratio = recover_ratio
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.ceiling = 0
+        self.service_times: Dict[QualityTier, Optional[float]] = {
+            tier: None for tier in self.tiers
+        }
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self._skipped: Dict[QualityTier, int] = {tier: 0 for tier in self.tiers}
+        self._since_change = 0
+        self._lock = threading.Lock()
+
+    def latency_percentile(self) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            return float(np.percentile(self.latencies, self.percentile))
+
+    def choose(
+        self, waited: float = 0.0, queue_depth: int = 0, workers: int = 1
+    ) -> QualityTier:
+        """
+        Chooses the tier of a request that is about to be processed.
+
+        Args:
+            waited: The seconds the request spent in the queue.
+            queue_depth: The number of requests still waiting.
+            workers: The number of requests processed in parallel.
+
+        Returns:
+            The best tier that keeps the request within the SLO, or REJECT.
+        """
+        budget = self.slo - waited
+        with self._lock:
+            for tier in self.tiers[self.ceiling :]:
+                # Tiers without measurements are tried optimistically
+                service = self.service_times[tier] or 0.0
+                drain = queue_depth / workers * service
+                if service <= budget and drain <= self.slo:
+                    return tier
+                if queue_depth == 0 and budget > 0:
+                    # Otherwise its estimate would never recover from a peak
+                    self._skipped[tier] += 1
+                    if self._skipped[tier] >= self.probe_interval:
+                        self._skipped[tier] = 0
+                        return tier
+        return QualityTier.REJECT
+
+    def record(self, tier: QualityTier, service: float, latency: float):
+        """
+        Records a response.
+
+        Args:
+            tier: The tier the request was served with.
+            service: The seconds spent processing it.
+            latency: The seconds from its submission to the response.
+        """
+        with self._lock:
+            if tier in self.service_times:
+                self._skipped[tier] = 0
+                previous = self.service_times[tier]
+                self.service_times[tier] = (
+                    service
+                    if previous is None
+                    else (1 - self.smoothing) * previous + self.smoothing * service
+                )
+            self.latencies.append(latency)
+            self._since_change += 1
+            if self._since_change < self.cooldown or len(self.latencies) < 10:
+                return
+
+            observed = float(np.percentile(self.latencies, self.percentile))
+            if observed > self.slo and self.ceiling < len(self.tiers) - 1:
+                self.ceiling += 1
+            elif observed < self.slo * self.recover_ratio and self.ceiling > 0:
+                self.ceiling -= 1
+            else:
+                return
+            # The percentile of the new regime starts from scratch
+            self._since_change = 0
+            self.latencies.clear()
+
+
+class AdmissionService:
+    """
+    Classifies images on a pool of worker threads, degrading the quality
+    of the answers under load instead of letting the latency grow.
+
+    Every request is queued with its submission time; when a worker takes it,
+    the AdaptiveController chooses its tier. The decoding and the OpenCV
+    metrics release the GIL, so threads run them in parallel.
+    """
+
+    def __init__(
+        self,
+        classifier: ImageClassifier,
+        controller: Optional[AdaptiveController] = None,
+        workers: int = 2,
+        cheap_classifier: Optional[ImageClassifier] = None,
+        calibration: Optional[JpegCalibration] = None,
+        max_queue: int = 1000,
+    ):
+        """
+        Initializes the AdmissionService and starts its workers.
+
+        Args:
+            classifier: The classifier of the full metrics (FULL and REDUCED tiers).
+            controller: The controller of the tiers (default: 1 second SLO).
+            workers: The number of worker threads.
+            cheap_classifier: The model trained on `cheap_metrics`; without it
+                there is no CHEAP tier.
+            calibration: The calibration of the REDUCED tier (see jpeg_fast).
+            max_queue: Requests beyond this queue depth are rejected at once.
+        """
+        if controller is None:
+            tiers = [QualityTier.FULL, QualityTier.REDUCED]
+            if cheap_classifier is not None:
+                tiers.append(QualityTier.CHEAP)
+            controller = AdaptiveController(tiers=tiers)
+        elif cheap_classifier is None and QualityTier.CHEAP in controller.tiers:
+            raise ValueError("The CHEAP tier requires a cheap classifier")
+        self.classifier = classifier
+        self.controller = controller
+        self.cheap_classifier = cheap_classifier
+        self.fast_analyzer = JpegFastAnalyzer(calibration)
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: queue.Queue = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True) for _ in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, path: str) -> "Future[TieredResult]":
+        future: Future = Future()
+        if self._queue.qsize() >= self.max_queue:
+            future.set_result(TieredResult(path, QualityTier.REJECT, None, {}, 0.0))
+            return future
+        self._queue.put((path, future, time.perf_counter()))
+        return future
+
+    def classify(self, path: str) -> TieredResult:
+        return self.submit(path).result()
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def process(self, path: str, tier: QualityTier) -> Tuple[str, Dict[str, float]]:
+        """
+        Classifies an image at the given tier.
+
+        Returns:
+            The predicted label and the class probabilities.
+        """
+        if tier == QualityTier.FULL:
+            metrics = ImageAnalyzer.process_image_by_path(path)
+            prediction = self.classifier.predict([metrics])[0]
+        elif tier == QualityTier.REDUCED:
+            metrics = self.fast_analyzer.process_image_by_path(path)
+            prediction = self.classifier.predict([metrics])[0]
+        elif tier == QualityTier.CHEAP:
+            prediction = self.cheap_classifier.predict([cheap_metrics(path)])[0]
+        else:
+            raise ValueError(f"Cannot process a request at tier {tier}")
+        return prediction.label, prediction.probabilities
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, future, submitted = item
+            started = time.perf_counter()
+            tier = self.controller.choose(
+                started - submitted, self._queue.qsize(), self.workers
+            )
+            try:
+                if tier == QualityTier.REJECT:
+                    label, probabilities = None, {}
+                else:
+                    label, probabilities = self.process(path, tier)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            latency = finished - submitted
+            if tier != QualityTier.REJECT:
+                self.controller.record(tier, finished - started, latency)
+            future.set_result(TieredResult(path, tier, label, probabilities, latency))
+
+
+def replay(
+    service: AdmissionService, paths: List[str], rate: float
+) -> List[TieredResult]:
+    """
+    Submits the images at a fixed rate (requests per second) and waits for all answers.
+    """
+    futures = []
+    started = time.perf_counter()
+    for i, path in enumerate(paths):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(service.submit(path))
+    return [future.result() for future in futures]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Replay images at a given rate through the admission control."
+    )
+    parser.add_argument("inputs", nargs="+", help="image files or directories")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests per second")
+    parser.add_argument("--slo", type=float, default=1.0, help="latency SLO in seconds")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--calibration", help="JPEG calibration of the REDUCED tier")
+    parser.add_argument("--model", default=PATH_TO_MODEL)
+    parser.add_argument("--cheap-model", help="model trained on the cheap metrics")
+    parser.add_argument("--mock", action="store_true", help="use the mock classifier")
+    parser.add_argument(
+        "--shared-h2o",
+        action="store_true",
+        help="use the H2O backend shared with other processes (see h2o_backend)",
+    )
+    args = parser.parse_args(argv)
+
+    backend = get_shared_backend() if args.shared_h2o else None
+    if args.mock:
+        classifier = MockImageClassifier()
+        cheap_classifier = MockImageClassifier()
+    else:
+        classifier = H2OMLClassifier(args.model, backend=backend)
+        cheap_classifier = (
+            H2OMLClassifier(args.cheap_model, backend=backend)
+            if args.cheap_model
+            else None
+        )
+    tiers = [QualityTier.FULL, QualityTier.REDUCED]
+    if cheap_classifier is not None:
+        tiers.append(QualityTier.CHEAP)
+    calibration = JpegCalibration.load(args.calibration) if args.calibration else None
+
+    service = AdmissionService(
+        classifier,
+        AdaptiveController(args.slo, tiers=tiers),
+        args.workers,
+        cheap_classifier,
+        calibration,
+    )
+    results = replay(service, list(collect_paths(args.inputs)), args.rate)
+    service.close()
+
+    tiers_used = Counter(result.tier for result in results)
+    for tier in QualityTier:
+        print(f"{tier:>8}: {tiers_used[tier]} requests")
+    latencies = [r.latency for r in results if r.tier != QualityTier.REJECT]
+    if latencies:
+        p50, p95 = np.percentile(latencies, [50, 95])
+        print(f"Latency: p50 {p50:.3f} s, p95 {p95:.3f} s (SLO {args.slo} s)")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.admission weather-data --rate 20 --slo 0.5 [--mock]
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,8 @@
+import os
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple
+
 from numpy import ndarray
+from sno_fo_fro.color_histogram import ColorHistogram, histogram_metric_for
 from sno_fo_fro.hypotheses import (
     ImageBlurrinessProcessor,
     ImageBrightSpotsProcessor,
@@ -10,7 +14,11 @@ from sno_fo_fro.hypotheses import (
     ImageWhiteGradientProcessor,
     ImageWhitenessProcessor,
 )
-from sno_fo_fro.image_processor import ImageProcessor
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS, ImageProcessor
+from sno_fo_fro.metric_table import MetricTable
+
+if TYPE_CHECKING:
+    from sno_fo_fro.dataset import ImageSource
 
 
 class Metric:
@@ -33,16 +41,75 @@ METRIC_BRIGHT_SPOTS = Metric("BRIGHT_SPOTS", ImageBrightSpotsProcessor())
 
 
 class CombinedImageProcessor[T](ImageProcessor):
+    """
+    Computes several metrics of an image.
+
+    The colour metrics (whiteness, saturation, coldness, luminance, bright
+    spots) are derived from one ColorHistogram of the image instead of a scan
+    of their own each, so the HSV conversion and the V blur are done once.
+    """
+
     def __init__(self, metrics: list[Metric]):
         self.metrics = metrics
 
     def process_image(self, image: ndarray) -> dict[str, T]:
+        from_histogram = {
+            metric.name: histogram_metric_for(metric.img_proc)
+            for metric in self.metrics
+        }
+        kernels = {
+            metric.img_proc.kernel_size
+            for metric in self.metrics
+            if from_histogram[metric.name] is not None
+            and isinstance(metric.img_proc, ImageBrightSpotsProcessor)
+        }
+        histogram = None
+        if sum(f is not None for f in from_histogram.values()) > 1:
+            histogram = ColorHistogram.from_image(image, kernels)
+
         result = {}
         for metric in self.metrics:
-            result[metric.name] = metric.img_proc.process_image(image)
+            derive = from_histogram[metric.name]
+            if histogram is not None and derive is not None:
+                result[metric.name] = derive(histogram)
+            else:
+                result[metric.name] = metric.img_proc.process_image(image)
 
         return result
 
+    @property
+    def metric_names(self) -> list[str]:
+        return [metric.name for metric in self.metrics]
+
+    def process_images(self, images: Iterable[Tuple[str, ndarray]]) -> MetricTable:
+        """
+        Processes already decoded images into a columnar MetricTable.
+        """
+        table = MetricTable(self.metric_names)
+        for path, image in images:
+            table.append(path, self.process_image(image))
+        return table
+
+    def process_source(self, source: "ImageSource") -> Dict[str, MetricTable]:
+        """
+        Processes all images of a dataset in one pass over its storage.
+
+        Returns:
+            One MetricTable per label.
+        """
+        tables = {label: MetricTable(self.metric_names) for label in source.labels()}
+        for label, path, image in source.labeled_images():
+            tables[label].append(path, self.process_image(image))
+        return tables
+
+    def process_images_in_dir(self, dir_path: str) -> MetricTable:
+        table = MetricTable(self.metric_names)
+        for filename in os.listdir(dir_path):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                image_path = os.path.join(dir_path, filename)
+                table.append(image_path, self.process_image_by_path(image_path))
+        return table
+
 
 ImageAnalyzer = CombinedImageProcessor[float](
     [
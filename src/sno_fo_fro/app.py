@@ -15,6 +15,7 @@ from PyQt5.QtCore import Qt
 
 from sno_fo_fro.analyzer import ImageAnalyzer
 from sno_fo_fro.classifier import H2OMLClassifier, WeatherClass
+from sno_fo_fro.gallery import GalleryView
 
 
 def get_image_class(path: str) -> WeatherClass:
@@ -26,6 +27,7 @@ class App(QWidget):
     def __init__(self):
         super().__init__()
         self.image_pixmap = None
+        self.galleries = []
         self.initUI()
 
     def initUI(self):
@@ -48,6 +50,9 @@ class App(QWidget):
         self.open_button = QPushButton("Open Image", self)
         self.open_button.clicked.connect(self.open_image)
 
+        self.open_folder_button = QPushButton("Open Folder", self)
+        self.open_folder_button.clicked.connect(self.open_folder)
+
         # Layout
         layout = QVBoxLayout()
         layout.addWidget(self.image_label)
@@ -59,7 +64,10 @@ class App(QWidget):
         caption_layout.addStretch()
         layout.addLayout(caption_layout)
 
-        layout.addWidget(self.open_button)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.open_button)
+        buttons_layout.addWidget(self.open_folder_button)
+        layout.addLayout(buttons_layout)
 
         self.setLayout(layout)
 
@@ -73,19 +81,34 @@ class App(QWidget):
             options=options,
         )
         if file_path:
-            pixmap = QPixmap(file_path)
-            if pixmap.isNull():
-                QMessageBox.critical(self, "Error", "Failed to load the image.")
-                return
-
-            self.image_pixmap = pixmap
-            self.resize_image()
-
-            # Show caption with file path
-            weather_res = get_image_class(file_path)
-            self.caption_label.setFont(QFont("Courier New", 14))
-            self.caption_label.setText(f"{weather_res}")
-            self.caption_label.show()
+            self.show_image(file_path)
+
+    def show_image(self, file_path: str):
+        pixmap = QPixmap(file_path)
+        if pixmap.isNull():
+            QMessageBox.critical(self, "Error", "Failed to load the image.")
+            return
+
+        self.image_pixmap = pixmap
+        self.resize_image()
+
+        # Show caption with file path
+        weather_res = get_image_class(file_path)
+        self.caption_label.setFont(QFont("Courier New", 14))
+        self.caption_label.setText(f"{weather_res}")
+        self.caption_label.show()
+
+    def open_folder(self):
+        dir_path = QFileDialog.getExistingDirectory(self, "Open Folder")
+        if dir_path:
+            gallery = GalleryView(dir_path, classifier)
+            # Double click or Enter on a thumbnail opens the image here
+            gallery.imageActivated.connect(self.show_image)
+            # A closed gallery is dropped with its workers and thumbnail cache
+            gallery.setAttribute(Qt.WA_DeleteOnClose)
+            gallery.closed.connect(lambda: self.galleries.remove(gallery))
+            gallery.show()
+            self.galleries.append(gallery)
 
     def resize_image(self):
         """Resize image while keeping the aspect ratio."""
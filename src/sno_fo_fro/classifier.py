@@ -1,10 +1,19 @@
 import random
 from abc import ABC, abstractmethod
 from enum import StrEnum
-from typing import Dict
+from typing import Dict, List, NamedTuple, Optional
 import h2o
 import pandas as pd
 
+from sno_fo_fro.h2o_backend import SharedH2OBackend, get_shared_registry
+from sno_fo_fro.metric_table import MetricTable
+from sno_fo_fro.models import (
+    EnsembleMode,
+    ModelRegistry,
+    StackingCombiner,
+    get_default_registry,
+)
+
 PATH_TO_MODEL = "pretrained/GBM_2_AutoML_1_20250122_184812"
 
 
@@ -14,6 +23,19 @@ class WeatherClass(StrEnum):
     FROST = "Frost"
 
 
+class Prediction(NamedTuple):
+    """
+    Result of classifying one image.
+
+    Attributes:
+        label: The predicted class label.
+        probabilities: The probability of every class label (may be empty).
+    """
+
+    label: str
+    probabilities: Dict[str, float]
+
+
 class ImageClassifier(ABC):
     """
     Abstract base class for image classification.
@@ -29,6 +51,28 @@ class ImageClassifier(ABC):
         """
         pass
 
+    def predict(self, batch: List[Dict[str, float]]) -> List[Prediction]:
+        """
+        Classifies a batch of images based on their parameters.
+
+        Subclasses that can score several rows at once should override this method.
+
+        :param batch: A list of dictionaries of image metrics, one per image.
+        :return: A list of predictions in the order of the batch.
+        """
+        return [Prediction(self.classify(params), {}) for params in batch]
+
+    def predict_table(self, table: MetricTable) -> List[Prediction]:
+        """
+        Classifies the images of a MetricTable.
+
+        Subclasses that score a matrix of metrics should override this method.
+
+        :param table: The metrics of the images.
+        :return: A list of predictions in the order of the table.
+        """
+        return self.predict([table.row(i) for i in range(len(table))])
+
 
 class MockImageClassifier(ImageClassifier):
     """
@@ -38,23 +82,49 @@ class MockImageClassifier(ImageClassifier):
     def classify(self, image_params: Dict[str, float]) -> str:
         return random.choice(list(WeatherClass))
 
+    def predict(self, batch: List[Dict[str, float]]) -> List[Prediction]:
+        predictions = []
+        for params in batch:
+            label = self.classify(params)
+            probabilities = {
+                weather: float(weather == label) for weather in WeatherClass
+            }
+            predictions.append(Prediction(label, probabilities))
+        return predictions
+
 
 class H2OMLClassifier(ImageClassifier):
-    def __init__(self, model_path: str = PATH_TO_MODEL):
+    def __init__(
+        self,
+        model_path: str = PATH_TO_MODEL,
+        registry: Optional[ModelRegistry] = None,
+        backend: Optional[SharedH2OBackend] = None,
+    ):
         """
         Initializes the H2OMLClassifier.
 
         :param model_path: The path to the saved H2O model (default is the path to the model saved in the repository)
+        :param registry: The registry the model is loaded from once (default is the shared registry of `pretrained/`)
+        :param backend: The H2O backend shared with other processes (default starts or joins one with `h2o.init()`)
         """
         self.model_path = model_path
-        h2o.init()
+        self.backend = backend
+        if backend is not None:
+            backend.connect()
+            if registry is None:
+                registry = get_shared_registry(backend)
+        else:
+            h2o.init()
+        self.registry = registry if registry is not None else get_default_registry()
 
     def format_dataframe(self, df):
-        res = df.as_data_frame().to_dict()
-        pred: str = res["predict"][0]
-        fog = res["fogsmog"][0] * 100
-        frost = res["frost"][0] * 100
-        snow = res["snow"][0] * 100
+        return self.format_prediction(self.to_predictions(df)[0])
+
+    def format_prediction(self, prediction: Prediction) -> str:
+        pred = prediction.label
+        fog = prediction.probabilities["fogsmog"] * 100
+        frost = prediction.probabilities["frost"] * 100
+        snow = prediction.probabilities["snow"] * 100
 
         header = f"--- {pred.upper()} ---"
         ln = len(header)
@@ -66,9 +136,99 @@ class H2OMLClassifier(ImageClassifier):
         )
         return formatted_string
 
-    def classify(self, image_params: Dict[str, float]) -> str:
-        loaded_model = h2o.load_model(self.model_path)
-        pandas_df = pd.DataFrame(image_params, index=[0])
-        h2o_df = h2o.H2OFrame(pandas_df)
+    def to_predictions(self, df) -> List[Prediction]:
+        """
+        Converts an H2O prediction frame into a list of predictions.
+        """
+        return self.frame_to_predictions(df.as_data_frame())
+
+    @staticmethod
+    def frame_to_predictions(pandas_df: pd.DataFrame) -> List[Prediction]:
+        """
+        Converts a pandas frame with a "predict" column and one column of
+        probabilities per class into a list of predictions.
+        """
+        classes = [column for column in pandas_df.columns if column != "predict"]
+        return [
+            Prediction(
+                str(row["predict"]),
+                {label: float(row[label]) for label in classes},
+            )
+            for _, row in pandas_df.iterrows()
+        ]
+
+    def to_frame(self, batch: List[Dict[str, float]]) -> h2o.H2OFrame:
+        """
+        Uploads a batch of image metrics to the H2O backend.
+        """
+        pandas_df = pd.DataFrame(batch)
+        return h2o.H2OFrame(pandas_df)
+
+    def table_to_frame(self, table: MetricTable) -> h2o.H2OFrame:
+        """
+        Uploads the metrics of a MetricTable to the H2O backend.
+        """
+        return h2o.H2OFrame(table.to_pandas())
+
+    def predict_frame(self, h2o_df: h2o.H2OFrame) -> List[Prediction]:
+        """
+        Scores an uploaded frame with the model and downloads the predictions.
+        """
+        loaded_model = self.registry.get(self.model_path)
         new_preds = loaded_model.predict(h2o_df)
-        return self.format_dataframe(new_preds)
+        return self.to_predictions(new_preds)
+
+    def predict(self, batch: List[Dict[str, float]]) -> List[Prediction]:
+        if self.backend is not None:
+            # Uploaded frames and loaded models are lost if the backend restarts
+            return self.backend.call(lambda: self.predict_frame(self.to_frame(batch)))
+        return self.predict_frame(self.to_frame(batch))
+
+    def predict_table(self, table: MetricTable) -> List[Prediction]:
+        if self.backend is not None:
+            return self.backend.call(
+                lambda: self.predict_frame(self.table_to_frame(table))
+            )
+        return self.predict_frame(self.table_to_frame(table))
+
+    def classify(self, image_params: Dict[str, float]) -> str:
+        return self.format_prediction(self.predict([image_params])[0])
+
+
+class EnsembleClassifier(H2OMLClassifier):
+    """
+    Classifies images with several pretrained models at once and combines
+    their class probabilities.
+    """
+
+    def __init__(
+        self,
+        model_paths: List[str],
+        mode: EnsembleMode = EnsembleMode.MEAN,
+        combiner: Optional[StackingCombiner] = None,
+        registry: Optional[ModelRegistry] = None,
+    ):
+        """
+        Initializes the EnsembleClassifier.
+
+        :param model_paths: The models of the ensemble (names in `pretrained/` or paths)
+        :param mode: How the probabilities of the models are combined
+        :param combiner: The meta-model fitted with `ModelRegistry.fit_stacking` (required for stacking)
+        :param registry: The registry the models are loaded from
+        """
+        super().__init__(model_paths[0], registry)
+        self.model_paths = model_paths
+        self.mode = mode
+        self.combiner = combiner
+
+    def predict(self, batch: List[Dict[str, float]]) -> List[Prediction]:
+        probabilities = self.registry.ensemble_proba(
+            pd.DataFrame(batch), self.model_paths, self.mode, self.combiner
+        )
+        return self.frame_to_predictions(probabilities)
+
+    def predict_table(self, table: MetricTable) -> List[Prediction]:
+        probabilities = self.registry.ensemble_proba(
+            table.to_pandas(), self.model_paths, self.mode, self.combiner
+        )
+        return self.frame_to_predictions(probabilities)
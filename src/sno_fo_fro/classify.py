@@ -0,0 +1,329 @@
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import cv2
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.classifier import (
+    PATH_TO_MODEL,
+    H2OMLClassifier,
+    ImageClassifier,
+    MockImageClassifier,
+)
+from sno_fo_fro.h2o_backend import get_shared_backend
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS
+from sno_fo_fro.jpeg_fast import JpegCalibration, JpegFastAnalyzer
+from sno_fo_fro.metric_table import MetricTable
+from sno_fo_fro.scheduler import init_worker, plan_for_paths
+
+# (path, metrics or None, error or None, decode seconds, analyze seconds)
+AnalyzedImage = Tuple[str, Optional[Dict[str, float]], Optional[str], float, float]
+
+
+def collect_paths(
+    inputs: Iterable[str], manifest: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Expands files, directories (recursively) and a manifest into image paths.
+
+    Args:
+        inputs: Paths to image files or directories.
+        manifest: Optional text file with one image path per line.
+
+    Yields:
+        Image paths in a deterministic order.
+    """
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+    if manifest is not None:
+        with open(manifest, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+
+
+def read_checkpoint(output_path: str) -> Set[str]:
+    """
+    Returns the paths already classified in an output file of a previous run.
+
+    A truncated last line (from an interrupted run) is ignored, so the image is
+    classified again. Images recorded with an error are retried as well.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "path" in record and ("class" in record or "label" in record):
+                done.add(record["path"])
+    return done
+
+
+def _drop_partial_line(output_path: str):
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return
+    with open(output_path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        # Truncate the line that an interrupted run left unfinished
+        position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            step = min(position, 64 * 1024)
+            f.seek(position - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+def analyze_path(
+    path: str, fast_jpeg: Optional[JpegFastAnalyzer] = None
+) -> AnalyzedImage:
+    """
+    Decodes an image and computes its metrics with ImageAnalyzer, or estimates
+    them from a scaled JPEG decode with `fast_jpeg`.
+
+    Runs in the worker processes, so it never raises: errors are returned.
+    """
+    started = time.perf_counter()
+    if fast_jpeg is None:
+        image, factor = cv2.imread(path), 1
+    else:
+        image, factor = fast_jpeg.decode(path)
+    decoded = time.perf_counter()
+    if image is None:
+        return path, None, "Could not read image", decoded - started, 0.0
+
+    try:
+        if fast_jpeg is None:
+            metrics = {
+                name: float(value)
+                for name, value in ImageAnalyzer.process_image(image).items()
+            }
+        else:
+            metrics = fast_jpeg.process_reduced(image, factor)
+    except Exception as e:
+        return path, None, str(e), decoded - started, time.perf_counter() - decoded
+    return path, metrics, None, decoded - started, time.perf_counter() - decoded
+
+
+class BatchClassifier:
+    """
+    Classifies many images: decoding and metrics run in a pool of worker
+    processes, and the metrics are scored by the classifier in batches.
+    Every result is written as one JSON line as soon as its batch completes.
+    """
+
+    def __init__(
+        self,
+        classifier: ImageClassifier,
+        jobs: Optional[int] = 1,
+        batch_size: int = 64,
+        cv_threads: Optional[int] = None,
+        fast_jpeg: Optional[JpegFastAnalyzer] = None,
+    ):
+        """
+        Initializes the BatchClassifier.
+
+        Args:
+            classifier: The classifier applied to the metrics.
+            jobs: The number of worker processes for decoding and metrics
+                (None chooses it together with `cv_threads` from the workload).
+            batch_size: The number of images scored by one classifier call.
+            cv_threads: The number of OpenCV threads in every worker
+                (None keeps the OpenCV default).
+            fast_jpeg: Estimates the metrics of JPEG files from a scaled decode
+                instead of computing them at full resolution.
+        """
+        self.classifier = classifier
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.cv_threads = cv_threads
+        self.fast_jpeg = fast_jpeg
+
+    def _analyze(self, paths: List[str]) -> Iterator[AnalyzedImage]:
+        analyze = functools.partial(analyze_path, fast_jpeg=self.fast_jpeg)
+        if self.cv_threads is None:
+            initializer, initargs = None, ()
+        else:
+            initializer, initargs = init_worker, (self.cv_threads,)
+
+        if self.jobs <= 1:
+            if initializer is None:
+                yield from map(analyze, paths)
+                return
+            # In this process the setting must not outlive the run
+            previous = cv2.getNumThreads()
+            initializer(*initargs)
+            try:
+                yield from map(analyze, paths)
+            finally:
+                cv2.setNumThreads(previous)
+            return
+
+        with multiprocessing.Pool(self.jobs, initializer, initargs) as pool:
+            yield from pool.imap_unordered(analyze, paths, chunksize=4)
+
+    def _flush(self, batch: List[AnalyzedImage], out) -> int:
+        started = time.perf_counter()
+        table = MetricTable.from_rows(
+            list(batch[0][1]), ((path, metrics) for path, metrics, *_ in batch)
+        )
+        predictions = self.classifier.predict_table(table)
+        classify_seconds = (time.perf_counter() - started) / len(batch)
+
+        for (path, metrics, _, decode_s, analyze_s), prediction in zip(
+            batch, predictions
+        ):
+            record = {
+                "path": path,
+                "metrics": metrics,
+                "class": prediction.label,
+                "probabilities": prediction.probabilities,
+                "timings": {
+                    "decode": decode_s,
+                    "analyze": analyze_s,
+                    "classify": classify_seconds,
+                },
+            }
+            out.write(json.dumps(record) + "\n")
+        out.flush()
+        return len(batch)
+
+    def run(self, paths: Iterable[str], output_path: str, resume: bool = True) -> int:
+        """
+        Classifies the images and appends the results to the output file.
+
+        Args:
+            paths: The image paths to classify.
+            output_path: The JSON lines file with the results, also used as checkpoint.
+            resume: Skip the paths already recorded in the output file.
+
+        Returns:
+            The number of images processed in this run.
+        """
+        done = read_checkpoint(output_path) if resume else set()
+        todo = [path for path in dict.fromkeys(paths) if path not in done]
+        if done:
+            print(f"Resuming: {len(done)} images already classified")
+        if self.jobs is None:
+            plan = plan_for_paths(todo)
+            print(plan.describe())
+            self.jobs, self.cv_threads = plan.workers, plan.cv_threads
+        print(f"Classifying {len(todo)} images with {self.jobs} jobs")
+
+        if resume:
+            _drop_partial_line(output_path)
+        started = time.perf_counter()
+        count = 0
+        batch: List[AnalyzedImage] = []
+        with open(output_path, "a" if resume else "w") as out:
+            for analyzed in self._analyze(todo):
+                path, metrics, error, *_ = analyzed
+                if metrics is None:
+                    out.write(json.dumps({"path": path, "error": error}) + "\n")
+                    count += 1
+                    continue
+
+                batch.append(analyzed)
+                if len(batch) >= self.batch_size:
+                    count += self._flush(batch, out)
+                    batch = []
+            if batch:
+                count += self._flush(batch, out)
+
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"Classified {count} images in {elapsed:.1f}s ({rate:.1f} images/s)")
+        return count
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Classify images without the GUI and stream JSON lines."
+    )
+    parser.add_argument("inputs", nargs="*", help="image files or directories")
+    parser.add_argument("--manifest", help="text file with one image path per line")
+    parser.add_argument("--output", default="classify-results.jsonl")
+    parser.add_argument(
+        "--jobs", type=int, help="worker processes (default chosen from the workload)"
+    )
+    parser.add_argument(
+        "--cv-threads", type=int, help="OpenCV threads per worker (with --jobs)"
+    )
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument(
+        "--fast-jpeg",
+        metavar="CALIBRATION",
+        help="estimate the metrics of JPEG files from a scaled decode "
+        "calibrated by this file (see jpeg_fast)",
+    )
+    parser.add_argument("--jpeg-factor", type=int, default=4, choices=(2, 4, 8))
+    parser.add_argument("--model", default=PATH_TO_MODEL)
+    parser.add_argument("--mock", action="store_true", help="use the mock classifier")
+    parser.add_argument(
+        "--shared-h2o",
+        action="store_true",
+        help="use the H2O backend shared with other processes (see h2o_backend)",
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true", help="overwrite the output file"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.inputs and args.manifest is None:
+        parser.error("no inputs given")
+
+    backend = get_shared_backend() if args.shared_h2o else None
+    classifier = (
+        MockImageClassifier()
+        if args.mock
+        else H2OMLClassifier(args.model, backend=backend)
+    )
+    fast_jpeg = None
+    if args.fast_jpeg:
+        fast_jpeg = JpegFastAnalyzer(
+            JpegCalibration.load(args.fast_jpeg), args.jpeg_factor
+        )
+    runner = BatchClassifier(
+        classifier,
+        jobs=args.jobs,
+        batch_size=args.batch_size,
+        cv_threads=args.cv_threads,
+        fast_jpeg=fast_jpeg,
+    )
+    runner.run(
+        collect_paths(args.inputs, args.manifest),
+        args.output,
+        resume=not args.no_resume,
+    )
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.classify <dir_or_image> [...] [--jobs 8]
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import argparse
+import json
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.dataset import open_source
+from sno_fo_fro.hypotheses import (
+    ImageBrightSpotsProcessor,
+    ImageColdnessProcessor,
+    ImageLuminanceProcessor,
+    ImageSaturationProcessor,
+    ImageWhitenessProcessor,
+)
+from sno_fo_fro.image_processor import ImageProcessor
+from sno_fo_fro.workspace import get_workspace
+
+HISTOGRAM_FORMAT = "sno-fo-fro-color-histogram/1"
+DEFAULT_BRIGHT_KERNELS = (15,)
+
+Thresholds = Union[float, Iterable[float]]
+
+
+def _sparse(counts: np.ndarray) -> Dict:
+    index = np.flatnonzero(counts)
+    return {"index": index.tolist(), "counts": counts.ravel()[index].tolist()}
+
+
+def _dense(data: Dict, shape) -> np.ndarray:
+    counts = np.zeros(int(np.prod(shape)), dtype=np.int64)
+    counts[np.asarray(data["index"], dtype=np.int64)] = data["counts"]
+    return counts.reshape(shape)
+
+
+class ColorHistogram:
+    """
+    Joint S x V histogram, per-channel BGR histograms and histograms of the
+    difference between V and its local average, built in one pass over an image.
+
+    The colour metrics are functions of these distributions, so they are
+    derived from the histogram in O(bins) without the pixels: the white
+    fraction for any pair of thresholds, the mean saturation and brightness,
+    the channel means (coldness, luminance) and the bright spots fraction for
+    any threshold of the blur kernels the histogram was built with.
+
+    Histograms add up, so they can be merged across tiles, frames or images,
+    and serialize sparsely to JSON to be stored next to the results.
+    """
+
+    def __init__(self, bright_kernels: Iterable[int] = DEFAULT_BRIGHT_KERNELS):
+        """
+        Initializes an empty ColorHistogram.
+
+        Args:
+            bright_kernels: The box blur sizes of the V differences
+                (see ImageBrightSpotsProcessor.kernel_size).
+        """
+        # sv[s, v] = number of pixels with saturation s and value v
+        self.sv = np.zeros((256, 256), dtype=np.int64)
+        self.bgr = np.zeros((3, 256), dtype=np.int64)
+        # bright[kernel][d + 255] = number of pixels with V - local average == d
+        self.bright = {int(k): np.zeros(511, dtype=np.int64) for k in bright_kernels}
+        self._white_counts: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_image(
+        cls, image: np.ndarray, bright_kernels: Iterable[int] = DEFAULT_BRIGHT_KERNELS
+    ) -> "ColorHistogram":
+        return cls(bright_kernels).update(image)
+
+    @property
+    def pixels(self) -> int:
+        return int(self.bgr[0].sum())
+
+    def update(self, image: np.ndarray) -> "ColorHistogram":
+        """
+        Adds the pixels of an image (OpenCV BGR format).
+        """
+        if len(image.shape) != 3 or image.shape[2] != 3:
+            raise ValueError("Input image must be a BGR color image.")
+        ws = get_workspace(image)
+        plane_shape = image.shape[:2]
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=ws.get("hsv", image.shape))
+        sv = cv2.calcHist([hsv], [1, 2], None, [256, 256], [0, 256, 0, 256])
+        self.sv += sv.astype(np.int64)
+        for channel in range(3):
+            counts = cv2.calcHist([image], [channel], None, [256], [0, 256])
+            self.bgr[channel] += counts.ravel().astype(np.int64)
+
+        v = cv2.extractChannel(hsv, 2, dst=ws.get("plane_v", plane_shape))
+        for kernel, counts in self.bright.items():
+            local_avg = cv2.blur(
+                v, (kernel, kernel), dst=ws.get("local_avg", plane_shape)
+            )
+            difference = cv2.subtract(
+                v,
+                local_avg,
+                dst=ws.get("difference_signed", plane_shape, np.int16),
+                dtype=cv2.CV_16S,
+            )
+            # Shift -255..255 to 0..510 for a histogram of unsigned values
+            np.add(difference, 255, out=difference)
+            shifted = cv2.calcHist(
+                [difference.view(np.uint16)], [0], None, [511], [0, 511]
+            )
+            counts += shifted.ravel().astype(np.int64)
+        self._white_counts = None
+        return self
+
+    def merge(self, other: "ColorHistogram") -> "ColorHistogram":
+        if set(self.bright) != set(other.bright):
+            raise ValueError("Cannot merge histograms with different blur kernels")
+        self.sv += other.sv
+        self.bgr += other.bgr
+        for kernel, counts in other.bright.items():
+            self.bright[kernel] += counts
+        self._white_counts = None
+        return self
+
+    def whiteness(
+        self, value_threshold: Thresholds = 200, saturation_threshold: Thresholds = 50
+    ) -> np.float32:
+        """
+        The fraction of pixels with V >= value_threshold and S <= saturation_threshold,
+        as ImageWhitenessProcessor computes it (thresholds may be arrays).
+        """
+        if self._white_counts is None:
+            # counts[s, v] = number of pixels with S < s and V >= v
+            counts = np.cumsum(self.sv, axis=0)
+            counts = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+            self._white_counts = np.pad(counts, ((1, 0), (0, 1)))
+        s = np.clip(np.floor(saturation_threshold) + 1, 0, 256).astype(int)
+        v = np.clip(np.ceil(value_threshold), 0, 256).astype(int)
+        return (self._white_counts[s, v] / self.pixels).astype(np.float32)
+
+    def saturation(self) -> np.float64:
+        """
+        The mean saturation, as ImageSaturationProcessor computes it.
+        """
+        return np.float64(self.sv.sum(axis=1) @ np.arange(256) / self.pixels)
+
+    def brightness(self) -> np.float64:
+        """
+        The mean V, as ImageLuminanceProcessor(use_brightness=True) computes it.
+        """
+        return np.float64(self.sv.sum(axis=0) @ np.arange(256) / self.pixels)
+
+    def channel_means(self) -> np.ndarray:
+        """
+        The mean of the blue, green and red channels.
+        """
+        return self.bgr @ np.arange(256) / self.pixels
+
+    def luminance(self) -> np.float64:
+        """
+        The mean perceived luminance, as ImageLuminanceProcessor computes it.
+        """
+        b_avg, g_avg, r_avg = self.channel_means()
+        return np.float64(0.2126 * r_avg + 0.7152 * g_avg + 0.0722 * b_avg)
+
+    def coldness(self) -> np.float32:
+        """
+        The coldness score, as ImageColdnessProcessor computes it.
+        """
+        b_avg, g_avg, r_avg = self.channel_means()
+        # A black image gives NaN, as in ImageColdnessProcessor
+        with np.errstate(invalid="ignore"):
+            return np.float32((b_avg - r_avg) / max(b_avg + r_avg + g_avg, 0))
+
+    def bright_spots(self, threshold_value: Thresholds = 20, kernel_size: int = 15):
+        """
+        The fraction of pixels brighter than their local average by more than
+        `threshold_value`, as ImageBrightSpotsProcessor computes it (the
+        threshold may be an array).
+        """
+        if kernel_size not in self.bright:
+            raise ValueError(f"Histogram has no differences for kernel {kernel_size}")
+        # exceeding[i] = number of pixels with V - local average >= i - 255
+        exceeding = np.append(np.cumsum(self.bright[kernel_size][::-1])[::-1], 0)
+        # V - average > t  <=>  V - average >= floor(t) + 1
+        index = np.clip(np.floor(threshold_value) + 1 + 255, 0, 511).astype(int)
+        fraction = exceeding[index] / self.pixels
+        return float(fraction) if np.ndim(fraction) == 0 else fraction
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Returns the ImageAnalyzer metrics derived from the histogram, with the
+        default parameters of their processors.
+        """
+        metrics = {
+            "WHITENESS": self.whiteness(),
+            "SATURATION": self.saturation(),
+            "COLDNESS": self.coldness(),
+        }
+        if DEFAULT_BRIGHT_KERNELS[0] in self.bright:
+            metrics["BRIGHT_SPOTS"] = self.bright_spots()
+        return metrics
+
+    def to_dict(self) -> Dict:
+        return {
+            "format": HISTOGRAM_FORMAT,
+            "sv": _sparse(self.sv),
+            "bgr": self.bgr.tolist(),
+            "bright": {
+                str(kernel): _sparse(counts) for kernel, counts in self.bright.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ColorHistogram":
+        if data.get("format") != HISTOGRAM_FORMAT:
+            raise ValueError(f"Unsupported histogram format: {data.get('format')}")
+        histogram = cls(int(kernel) for kernel in data["bright"])
+        histogram.sv = _dense(data["sv"], (256, 256))
+        histogram.bgr = np.asarray(data["bgr"], dtype=np.int64)
+        for kernel, counts in data["bright"].items():
+            histogram.bright[int(kernel)] = _dense(counts, (511,))
+        return histogram
+
+
+def histogram_metric_for(
+    processor: ImageProcessor,
+) -> Optional[Callable[[ColorHistogram], float]]:
+    """
+    Returns the function deriving the value of a processor from a ColorHistogram.
+
+    The parameters are read from the processor on every call. Subclasses may
+    compute something else, so only the processors themselves are matched.
+
+    Args:
+        processor: A processor from `sno_fo_fro.hypotheses`.
+
+    Returns:
+        The function, or None if the metric is not a function of the histogram.
+    """
+    kind = type(processor)
+    if kind is ImageWhitenessProcessor:
+        return lambda histogram: histogram.whiteness(
+            processor.value_threshold, processor.saturation_threshold
+        )
+    if kind is ImageSaturationProcessor:
+        return ColorHistogram.saturation
+    if kind is ImageColdnessProcessor:
+        return ColorHistogram.coldness
+    if kind is ImageLuminanceProcessor:
+        if processor.use_brightness:
+            return ColorHistogram.brightness
+        return ColorHistogram.luminance
+    if kind is ImageBrightSpotsProcessor:
+        return lambda histogram: histogram.bright_spots(
+            processor.threshold_value, processor.kernel_size
+        )
+    return None
+
+
+class ColorHistogramProcessor(ImageProcessor[ColorHistogram]):
+    """
+    Builds the ColorHistogram of every image, e.g. for `process_source`.
+    """
+
+    def __init__(self, bright_kernels: Iterable[int] = DEFAULT_BRIGHT_KERNELS):
+        self.bright_kernels = tuple(bright_kernels)
+
+    def process_image(self, image: np.ndarray) -> ColorHistogram:
+        return ColorHistogram.from_image(image, self.bright_kernels)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Store the colour histograms of a dataset and summarize them per class."
+    )
+    parser.add_argument("source", help="dataset directory, pack or archive")
+    parser.add_argument("--output", default="color-histograms.jsonl")
+    parser.add_argument(
+        "--bright-kernels", type=int, nargs="+", default=list(DEFAULT_BRIGHT_KERNELS)
+    )
+    args = parser.parse_args(argv)
+
+    processor = ColorHistogramProcessor(args.bright_kernels)
+    totals: Dict[str, ColorHistogram] = {}
+    with open(args.output, "w") as out:
+        for label, path, image in open_source(args.source).labeled_images():
+            histogram = processor.process_image(image)
+            record = {"path": path, "label": label, "histogram": histogram.to_dict()}
+            out.write(json.dumps(record) + "\n")
+            totals.setdefault(label, ColorHistogram(args.bright_kernels)).merge(
+                histogram
+            )
+
+    for label, histogram in totals.items():
+        metrics = ", ".join(
+            f"{name} {float(value):.4g}" for name, value in histogram.metrics().items()
+        )
+        print(f"{label} (over all {histogram.pixels} pixels): {metrics}")
+    print(f"Histograms saved: {args.output}")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.color_histogram weather-data [--output color-histograms.jsonl]
+if __name__ == "__main__":
+    sys.exit(main())
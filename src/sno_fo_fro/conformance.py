@@ -0,0 +1,689 @@
+import argparse
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.classifier import PATH_TO_MODEL, H2OMLClassifier, ImageClassifier
+from sno_fo_fro.color_histogram import ColorHistogram
+from sno_fo_fro.h2o_backend import get_shared_backend
+from sno_fo_fro.jpeg_fast import (
+    MIN_REDUCED_SIDE,
+    REDUCED_FLAGS,
+    JpegCalibration,
+    JpegFastAnalyzer,
+)
+from sno_fo_fro.metric_table import MetricTable
+from sno_fo_fro.hypotheses import ImageLuminanceProcessor
+from sno_fo_fro.reference import REFERENCE_LUMINANCE_METRICS, REFERENCE_METRICS
+from sno_fo_fro.sampling import SamplingImageProcessor
+from sno_fo_fro.stream import StreamAnalyzer
+from sno_fo_fro.sweep import (
+    BrightSpotsSweeper,
+    EdgeDensitySweeper,
+    ParameterSweeper,
+    SegmentsSharpnessSweeper,
+    WhitenessSweeper,
+)
+
+Case = Tuple[str, np.ndarray]
+
+# The processors of ImageAnalyzer, which have been optimized in place
+ANALYZER_METRICS = {metric.name: metric.img_proc for metric in ImageAnalyzer.metrics}
+# The luminance processors, optimized in place as well but not in ImageAnalyzer
+LUMINANCE_METRICS = {
+    "LUMINANCE": ImageLuminanceProcessor(),
+    "BRIGHTNESS": ImageLuminanceProcessor(use_brightness=True),
+}
+REFERENCE_PROCESSORS = {**REFERENCE_METRICS, **REFERENCE_LUMINANCE_METRICS}
+
+
+def generate_corpus(seed: int = 0) -> List[Case]:
+    """
+    Generates images that stress the metric engines: gradients, noise,
+    textures, edge-sized images, odd dimensions and partial tiles.
+
+    Returns:
+        (name, image) pairs in OpenCV BGR format.
+    """
+    rng = np.random.default_rng(seed)
+    corpus: List[Case] = []
+
+    def gradient(h, w, direction):
+        yy, xx = np.mgrid[0:h, 0:w].astype(np.float64)
+        if direction == "x":
+            return xx / (w - 1)
+        if direction == "y":
+            return yy / (h - 1)
+        return (xx + yy) / (h + w - 2)
+
+    for h, w in ((97, 131), (240, 321)):
+        for direction in ("x", "y", "xy"):
+            ramp = gradient(h, w, direction)
+            # A colour ramp and a bright, unsaturated one
+            colour = np.dstack([255 * ramp, 255 * (1 - ramp), np.full_like(ramp, 128)])
+            corpus.append((f"gradient-{direction}-{h}x{w}", colour.astype(np.uint8)))
+            white = (
+                np.dstack([150 + 105 * ramp] * 3)
+                - np.array([0, 10, 20]) * ramp[..., None]
+            )
+            corpus.append(
+                (f"white-gradient-{direction}-{h}x{w}", white.astype(np.uint8))
+            )
+
+    for h, w in ((101, 77), (333, 471)):
+        corpus.append(
+            (f"uniform-noise-{h}x{w}", rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+        )
+        gaussian = rng.normal(128, 30, (h, w, 3))
+        corpus.append(
+            (f"gaussian-noise-{h}x{w}", np.clip(gaussian, 0, 255).astype(np.uint8))
+        )
+        salt = np.full((h, w, 3), 60, np.uint8)
+        specks = rng.random((h, w)) < 0.02
+        salt[specks] = 255
+        corpus.append((f"salt-{h}x{w}", salt))
+
+    for period in (1, 3, 8, 25):
+        yy, xx = np.mgrid[0:150, 0:203]
+        board = ((yy // period + xx // period) % 2 * 255).astype(np.uint8)
+        corpus.append((f"checkerboard-{period}", cv2.merge([board] * 3)))
+    yy, xx = np.mgrid[0:181, 0:263]
+    for wavelength in (4.0, 17.0):
+        wave = 127.5 + 127.5 * np.sin(2 * np.pi * (xx + 0.5 * yy) / wavelength)
+        stripes = np.dstack([wave, np.roll(wave, 3, axis=1), 255 - wave])
+        corpus.append((f"sine-{wavelength:g}", stripes.astype(np.uint8)))
+    blobs = cv2.resize(
+        rng.integers(0, 256, (12, 16, 3), dtype=np.uint8),
+        (413, 307),
+        interpolation=cv2.INTER_CUBIC,
+    )
+    corpus.append(("blobs-307x413", blobs))
+    fog = cv2.GaussianBlur(blobs, (0, 0), 15) // 3 + 160
+    corpus.append(("fog-307x413", fog))
+    snow = blobs // 3
+    for y, x in rng.integers(0, (307, 413), (400, 2)):
+        cv2.circle(snow, (int(x), int(y)), int(rng.integers(1, 4)), (255, 255, 255), -1)
+    corpus.append(("snow-307x413", snow))
+
+    for h, w in (
+        (1, 1),
+        (1, 64),
+        (64, 1),
+        (3, 3),
+        (20, 20),
+        (21, 21),
+        (22, 41),
+        (81, 161),
+    ):
+        corpus.append(
+            (f"edge-{h}x{w}", rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+        )
+    corpus.append(("black-40x40", np.zeros((40, 40, 3), np.uint8)))
+    corpus.append(("white-40x40", np.full((40, 40, 3), 255, np.uint8)))
+    return corpus
+
+
+def reference_metrics(
+    image: np.ndarray, names: Optional[Iterable[str]] = None
+) -> Dict[str, Optional[float]]:
+    """
+    Computes metrics separately with the frozen reference processors.
+
+    Args:
+        image: The input image (OpenCV BGR format).
+        names: The computed metrics (default the ImageAnalyzer metrics; the
+            luminance metrics are computed on request).
+
+    Returns:
+        The value of every metric, or None where the reference fails or gives
+        NaN (e.g. SEGMENTS_SHARPNESS of images smaller than one segment,
+        COLDNESS of a black image).
+    """
+    metrics = {}
+    for name in REFERENCE_METRICS if names is None else names:
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                value = float(REFERENCE_PROCESSORS[name].process_image(image))
+        except Exception:
+            value = None
+        metrics[name] = value if value is not None and np.isfinite(value) else None
+    return metrics
+
+
+class ConformanceEngine(ABC):
+    """
+    Abstract base class for an optimized implementation of some of the
+    ImageAnalyzer metrics, checked against the reference processors.
+    """
+
+    name: str
+    metrics: Sequence[str]
+
+    def reference_image(self, image: np.ndarray) -> np.ndarray:
+        """
+        Returns the image the reference metrics are computed on (the input by
+        default; e.g. the decoded JPEG for engines that read JPEG files).
+        """
+        return image
+
+    @abstractmethod
+    def process(self, image: np.ndarray) -> Dict[str, Optional[float]]:
+        """
+        Computes the metrics of the engine for one image.
+
+        Returns:
+            The value of every metric, or None where it cannot be computed. An
+            engine may also raise for an image where the reference fails for
+            one of its metrics, as ImageAnalyzer does.
+        """
+        pass
+
+
+class ProcessorsEngine(ConformanceEngine):
+    """
+    The processors of ImageAnalyzer and the luminance processors, each run
+    separately: they were rewritten in place (workspace buffers, float32
+    kernels, segment variances in one mosaic, cv2.mean) and must still compute
+    the metrics of the reference.
+    """
+
+    name = "processors"
+    metrics = tuple(ANALYZER_METRICS) + tuple(LUMINANCE_METRICS)
+
+    def process(self, image):
+        values = {}
+        for name, processor in {**ANALYZER_METRICS, **LUMINANCE_METRICS}.items():
+            try:
+                values[name] = float(processor.process_image(image))
+            except Exception:
+                values[name] = None
+        return values
+
+
+class AnalyzerEngine(ConformanceEngine):
+    """
+    ImageAnalyzer as a whole, which derives its colour metrics from one
+    ColorHistogram instead of running their processors.
+    """
+
+    name = "analyzer"
+    metrics = tuple(ANALYZER_METRICS)
+
+    def process(self, image):
+        return ImageAnalyzer.process_image(image)
+
+
+class HistogramEngine(ConformanceEngine):
+    """
+    The colour and luminance metrics derived from a ColorHistogram.
+    """
+
+    name = "histogram"
+    metrics = (
+        "WHITENESS",
+        "SATURATION",
+        "COLDNESS",
+        "BRIGHT_SPOTS",
+        "LUMINANCE",
+        "BRIGHTNESS",
+    )
+
+    def process(self, image):
+        histogram = ColorHistogram.from_image(image)
+        return {
+            **histogram.metrics(),
+            "LUMINANCE": histogram.luminance(),
+            "BRIGHTNESS": histogram.brightness(),
+        }
+
+
+class SweepEngine(ConformanceEngine):
+    """
+    The parameter sweepers evaluated at the default parameters of the processors.
+    """
+
+    name = "sweep"
+    metrics = ("WHITENESS", "EDGE_DENSITY", "SEGMENTS_SHARPNESS", "BRIGHT_SPOTS")
+
+    def __init__(self):
+        self.sweepers: Dict[str, ParameterSweeper] = {}
+        for name, sweeper_class in (
+            ("WHITENESS", WhitenessSweeper),
+            ("EDGE_DENSITY", EdgeDensitySweeper),
+            ("SEGMENTS_SHARPNESS", SegmentsSharpnessSweeper),
+            ("BRIGHT_SPOTS", BrightSpotsSweeper),
+        ):
+            processor = ANALYZER_METRICS[name]
+            grid = {
+                parameter: (getattr(processor, parameter),)
+                for parameter in sweeper_class.default_grid
+            }
+            self.sweepers[name] = sweeper_class(grid)
+
+    def process(self, image):
+        # The sweepers are independent, so one failing leaves the others
+        values = {}
+        for name, sweeper in self.sweepers.items():
+            try:
+                values[name] = float(sweeper.evaluate(image)[0])
+            except Exception:
+                values[name] = None
+        return values
+
+
+class SamplingEngine(ConformanceEngine):
+    """
+    The mean-type metrics estimated from stratified pixel samples.
+    """
+
+    name = "sampling"
+    metrics = ("WHITENESS", "SATURATION", "COLDNESS", "BRIGHT_SPOTS")
+    # Target half-widths of the confidence intervals, in the units of the metrics
+    target_errors = {
+        "WHITENESS": 0.01,
+        "SATURATION": 1.0,
+        "COLDNESS": 0.005,
+        "BRIGHT_SPOTS": 0.005,
+    }
+
+    def __init__(self, seed: int = 0):
+        self.samplers = {
+            name: SamplingImageProcessor.for_processor(
+                ANALYZER_METRICS[name], target_error=error, seed=seed
+            )
+            for name, error in self.target_errors.items()
+        }
+
+    def process(self, image):
+        return {
+            name: sampler.process_image(image).value
+            for name, sampler in self.samplers.items()
+        }
+
+
+class StreamEngine(ConformanceEngine):
+    """
+    The incremental StreamAnalyzer, given a frame that differs from the image
+    by a patch first, so that the image is analyzed by the incremental path.
+    """
+
+    name = "stream"
+    metrics = tuple(REFERENCE_METRICS)
+
+    def __init__(self, tile_size: int = 40):
+        self.tile_size = tile_size
+
+    def process(self, image):
+        analyzer = StreamAnalyzer(tile_size=self.tile_size, halo=self.tile_size // 5)
+        previous = image.copy()
+        h, w = image.shape[:2]
+        patch = previous[h // 3 : h // 3 + h // 6 + 1, w // 2 : w // 2 + w // 6 + 1]
+        # Moves every pixel of the patch by 128, far above the change threshold
+        np.bitwise_xor(patch, 128, out=patch)
+        analyzer.process_image(previous)
+        return analyzer.process_image(image)
+
+
+class JpegReducedEngine(ConformanceEngine):
+    """
+    The calibrated metrics of a scaled JPEG decode, compared with the metrics
+    of the full decode of the same JPEG.
+    """
+
+    name = "jpeg-reduced"
+    metrics = tuple(REFERENCE_METRICS)
+
+    def __init__(
+        self, calibration: JpegCalibration, factor: int = 4, quality: int = 90
+    ):
+        self.analyzer = JpegFastAnalyzer(calibration, factor)
+        self.factor = factor
+        self.quality = quality
+
+    def _encode(self, image):
+        _, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return data
+
+    def reference_image(self, image):
+        return cv2.imdecode(self._encode(image), cv2.IMREAD_COLOR)
+
+    def process(self, image):
+        data = self._encode(image)
+        # Small images are decoded with a lower factor, as `decode_reduced` does
+        factor = self.factor
+        while factor > 1 and min(image.shape[:2]) // factor < MIN_REDUCED_SIDE:
+            factor //= 2
+        if factor == 1:
+            return self.analyzer.process_image(cv2.imdecode(data, cv2.IMREAD_COLOR))
+        return self.analyzer.process_reduced(
+            cv2.imdecode(data, REDUCED_FLAGS[factor]), factor
+        )
+
+
+class Tolerance(NamedTuple):
+    """
+    The allowed deviation of an engine from the reference for one metric.
+
+    A value conforms if |value - reference| <= absolute + relative * |reference|.
+
+    Attributes:
+        absolute: The absolute part of the allowed error.
+        relative: The relative part of the allowed error.
+        quantile: The share of the images that must conform.
+    """
+
+    absolute: float = 0.0
+    relative: float = 0.0
+    quantile: float = 1.0
+
+
+# Per engine, per metric ("*" for all metrics of the engine)
+DEFAULT_TOLERANCES: Dict[str, Dict[str, Tolerance]] = {
+    "processors": {
+        "*": Tolerance(1e-12, 1e-9),
+        # Float32 Sobel and products instead of float64
+        "WHITE_GRADIENT": Tolerance(1e-9, 1e-6),
+    },
+    "analyzer": {
+        "*": Tolerance(1e-12, 1e-9),
+        "WHITE_GRADIENT": Tolerance(1e-9, 1e-6),
+    },
+    "histogram": {"*": Tolerance(1e-12, 1e-9)},
+    "sweep": {"*": Tolerance(1e-12, 1e-6)},
+    "stream": {
+        "*": Tolerance(1e-9, 1e-6),
+        # Canny hysteresis may reach further than the halo
+        "EDGE_DENSITY": Tolerance(5e-3, 0.0),
+    },
+    "sampling": {
+        name: Tolerance(2 * error, 0.0, 0.95)
+        for name, error in SamplingEngine.target_errors.items()
+    },
+    "jpeg-reduced": {"*": Tolerance(0.01, 0.25, 0.9)},
+}
+
+# The minimal share of images classified as with the reference metrics
+DEFAULT_MIN_AGREEMENT = {
+    "processors": 1.0,
+    "analyzer": 1.0,
+    "histogram": 1.0,
+    "sweep": 1.0,
+    "stream": 0.95,
+    "sampling": 0.9,
+    "jpeg-reduced": 0.8,
+}
+
+
+class MetricConformance(NamedTuple):
+    """
+    The deviation of one engine from the reference for one metric.
+
+    Attributes:
+        compared: The number of images both computed the metric for.
+        missing: The number of images only one of them computed it for.
+        abs_errors: The median, 95th percentile and maximum absolute error.
+        rel_errors: The median, 95th percentile and maximum relative error.
+        conforming: The share of the compared images within the tolerance.
+        tolerance: The tolerance the metric was checked with.
+    """
+
+    compared: int
+    missing: int
+    abs_errors: Tuple[float, float, float]
+    rel_errors: Tuple[float, float, float]
+    conforming: float
+    tolerance: Tolerance
+
+    @property
+    def passed(self) -> bool:
+        return self.missing == 0 and self.conforming >= self.tolerance.quantile
+
+
+class EngineConformance(NamedTuple):
+    """
+    The conformance of one engine over the corpus.
+
+    Attributes:
+        metrics: The conformance of every metric of the engine.
+        agreement: The share of images classified as with the reference
+            metrics (None without a classifier).
+        min_agreement: The required agreement.
+        speedup: The time of the reference processors of the engine's metrics
+            divided by the time of the engine.
+        errors: The images the engine failed on, as (name, error) pairs.
+    """
+
+    metrics: Dict[str, MetricConformance]
+    agreement: Optional[float]
+    min_agreement: float
+    speedup: float
+    errors: List[Tuple[str, str]]
+
+    def violations(self) -> List[str]:
+        problems = [
+            f"{name}: {m.conforming:.1%} within tolerance, {m.missing} missing"
+            for name, m in self.metrics.items()
+            if not m.passed
+        ]
+        if self.agreement is not None and self.agreement < self.min_agreement:
+            problems.append(
+                f"class agreement {self.agreement:.1%} < {self.min_agreement:.1%}"
+            )
+        return problems
+
+
+def _quantiles(errors: np.ndarray) -> Tuple[float, float, float]:
+    if errors.size == 0:
+        return (0.0, 0.0, 0.0)
+    return tuple(float(q) for q in np.quantile(errors, [0.5, 0.95, 1.0]))
+
+
+def check_engine(
+    engine: ConformanceEngine,
+    corpus: Sequence[Case],
+    classifier: Optional[ImageClassifier] = None,
+    tolerances: Optional[Dict[str, Tolerance]] = None,
+    min_agreement: Optional[float] = None,
+) -> EngineConformance:
+    """
+    Runs an engine beside the reference processors on a corpus.
+
+    Args:
+        engine: The checked engine.
+        corpus: The (name, image) pairs, e.g. from `generate_corpus`.
+        classifier: The classifier the agreement of the predicted classes is
+            measured with (no agreement without one).
+        tolerances: The tolerance per metric, "*" for the others
+            (default from DEFAULT_TOLERANCES).
+        min_agreement: The required class agreement (default from DEFAULT_MIN_AGREEMENT).
+
+    Returns:
+        The error distributions, the class agreement and the speedup.
+    """
+    if tolerances is None:
+        tolerances = DEFAULT_TOLERANCES.get(engine.name, {})
+    if min_agreement is None:
+        min_agreement = DEFAULT_MIN_AGREEMENT.get(engine.name, 1.0)
+
+    pairs = {name: [] for name in engine.metrics}
+    missing = {name: 0 for name in engine.metrics}
+    errors = []
+    reference_rows, engine_rows = [], []
+    reference_seconds = engine_seconds = 0.0
+    for case, image in corpus:
+        reference_input = engine.reference_image(image)
+        started = time.perf_counter()
+        reference = reference_metrics(reference_input, engine.metrics)
+        reference_seconds += time.perf_counter() - started
+        # The other metrics are only needed as classifier input
+        others = [name for name in REFERENCE_METRICS if name not in reference]
+        reference.update(reference_metrics(reference_input, others))
+
+        started = time.perf_counter()
+        try:
+            # Degenerate images may give NaN, which counts as not computed
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = engine.process(image)
+        except Exception as e:
+            values = None
+            error = str(e)
+        engine_seconds += time.perf_counter() - started
+        if values is None:
+            # Failing as a whole where the reference fails is conforming
+            if all(reference[name] is not None for name in engine.metrics):
+                errors.append((case, error))
+                for name in engine.metrics:
+                    missing[name] += 1
+            continue
+
+        for name in engine.metrics:
+            value = values.get(name)
+            if value is not None and not np.isfinite(value):
+                value = None
+            if reference[name] is None or value is None:
+                missing[name] += (reference[name] is None) != (value is None)
+                continue
+            pairs[name].append((float(value), reference[name]))
+
+        if all(value is not None for value in reference.values()):
+            # The classifier only takes the ImageAnalyzer metrics
+            reference_rows.append((case, {n: reference[n] for n in REFERENCE_METRICS}))
+            # The metrics the engine does not compute come from the reference
+            computed = {
+                n: v
+                for n, v in values.items()
+                if v is not None and n in REFERENCE_METRICS
+            }
+            engine_rows.append((case, {**reference_rows[-1][1], **computed}))
+
+    metrics = {}
+    for name in engine.metrics:
+        tolerance = tolerances.get(name, tolerances.get("*", Tolerance()))
+        values = np.array(pairs[name]).reshape(-1, 2)
+        absolute = np.abs(values[:, 0] - values[:, 1])
+        scale = np.abs(values[:, 1])
+        relative = absolute / np.maximum(scale, 1e-12)
+        within = absolute <= tolerance.absolute + tolerance.relative * scale
+        metrics[name] = MetricConformance(
+            compared=len(values),
+            missing=missing[name],
+            abs_errors=_quantiles(absolute),
+            rel_errors=_quantiles(relative),
+            conforming=float(within.mean()) if len(values) else 1.0,
+            tolerance=tolerance,
+        )
+
+    agreement = None
+    if classifier is not None and reference_rows:
+        columns = list(REFERENCE_METRICS)
+        expected = classifier.predict_table(
+            MetricTable.from_rows(columns, reference_rows)
+        )
+        actual = classifier.predict_table(MetricTable.from_rows(columns, engine_rows))
+        agreement = float(
+            np.mean([a.label == b.label for a, b in zip(expected, actual)])
+        )
+
+    return EngineConformance(
+        metrics=metrics,
+        agreement=agreement,
+        min_agreement=min_agreement,
+        speedup=reference_seconds / max(engine_seconds, 1e-9),
+        errors=errors,
+    )
+
+
+def default_engines(
+    jpeg_calibration: Optional[JpegCalibration] = None,
+) -> List[ConformanceEngine]:
+    """
+    Returns all optimized engines (the JPEG engine only with a calibration).
+    """
+    engines = [
+        ProcessorsEngine(),
+        AnalyzerEngine(),
+        HistogramEngine(),
+        SweepEngine(),
+        SamplingEngine(),
+        StreamEngine(),
+    ]
+    if jpeg_calibration is not None:
+        engines.append(JpegReducedEngine(jpeg_calibration))
+    return engines
+
+
+def format_report(results: Dict[str, EngineConformance]) -> str:
+    lines = []
+    for engine, result in results.items():
+        agreement = "n/a" if result.agreement is None else f"{result.agreement:.1%}"
+        status = "FAILED" if result.violations() else "passed"
+        lines.append(
+            f"## {engine}: {status} (class agreement {agreement}, "
+            f"speedup x{result.speedup:.2f})"
+        )
+        lines.append(
+            f"{'metric':<20} {'n':>4} {'miss':>4} {'abs p50':>9} {'abs p95':>9} "
+            f"{'abs max':>9} {'rel p95':>9} {'rel max':>9} {'ok':>6}"
+        )
+        for name, m in result.metrics.items():
+            lines.append(
+                f"{name:<20} {m.compared:>4} {m.missing:>4} "
+                + " ".join(f"{e:>9.2e}" for e in (*m.abs_errors, *m.rel_errors[1:]))
+                + f" {m.conforming:>6.1%}"
+            )
+        for case, error in result.errors:
+            lines.append(f"error on {case}: {error}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Check the optimized metric engines against the reference processors."
+    )
+    parser.add_argument(
+        "--engines", nargs="+", help="engines to check (default all available)"
+    )
+    parser.add_argument("--jpeg-calibration", help="calibration of the JPEG engine")
+    parser.add_argument("--model", default=PATH_TO_MODEL)
+    parser.add_argument(
+        "--no-classifier", action="store_true", help="skip the class agreement"
+    )
+    parser.add_argument(
+        "--shared-h2o",
+        action="store_true",
+        help="use the H2O backend shared with other processes (see h2o_backend)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    calibration = (
+        JpegCalibration.load(args.jpeg_calibration) if args.jpeg_calibration else None
+    )
+    engines = default_engines(calibration)
+    if args.engines:
+        engines = [engine for engine in engines if engine.name in args.engines]
+    classifier = None
+    if not args.no_classifier:
+        backend = get_shared_backend() if args.shared_h2o else None
+        classifier = H2OMLClassifier(args.model, backend=backend)
+    corpus = generate_corpus(args.seed)
+
+    results = {
+        engine.name: check_engine(engine, corpus, classifier) for engine in engines
+    }
+    print(f"# Conformance on {len(corpus)} generated images\n")
+    print(format_report(results))
+    if any(result.violations() for result in results.values()):
+        return 1
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.conformance [--engines stream sampling] [--jpeg-calibration jpeg_calibration.json] [--no-classifier]
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import os
+import tarfile
+import zipfile
+from abc import ABC, abstractmethod
+from typing import IO, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS
+
+DEFAULT_LABELS = ("snow", "fogsmog", "frost")
+
+ARCHIVE_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".zip")
+
+# (path, decoded BGR image)
+LabeledImage = Tuple[str, np.ndarray]
+
+
+class ImageSource(ABC):
+    """
+    Abstract base class for datasets of labeled images.
+
+    Consumers iterate over decoded images without knowing whether they come
+    from image files, a pre-decoded pack or an archive.
+    """
+
+    @abstractmethod
+    def labels(self) -> List[str]:
+        """
+        Returns the class labels of the dataset.
+        """
+        pass
+
+    @abstractmethod
+    def images(self, label: str) -> Iterator[LabeledImage]:
+        """
+        Iterates over the images of one class.
+
+        Yields:
+            The path of every image and the image (OpenCV BGR format).
+        """
+        pass
+
+    def labeled_images(self) -> Iterator[Tuple[str, str, np.ndarray]]:
+        """
+        Iterates over the images of all classes in storage order.
+
+        Sources that can only be read sequentially override this to read
+        the dataset in one pass.
+
+        Yields:
+            The label, the path and the image of every image.
+        """
+        for label in self.labels():
+            for path, image in self.images(label):
+                yield label, path, image
+
+    def count(self, label: str) -> int:
+        """
+        Returns the number of images of one class.
+        """
+        return sum(1 for _ in self.images(label))
+
+    def shuffled_images(
+        self, label: str, rng: np.random.Generator
+    ) -> Iterator[LabeledImage]:
+        """
+        Iterates over the images of one class in random order.
+
+        The images are only decoded when they are drawn. Sources without
+        random access read the whole class before the first image is yielded.
+
+        Args:
+            label: The class label.
+            rng: The random generator of the order.
+        """
+        images = list(self.images(label))
+        for i in rng.permutation(len(images)):
+            yield images[i]
+
+
+class DirectorySource(ImageSource):
+    """
+    A dataset with one subdirectory of image files per class label,
+    like `weather-data`.
+    """
+
+    def __init__(self, parent_dir: str = "weather-data", labels=DEFAULT_LABELS):
+        self.parent_dir = parent_dir
+        self._labels = list(labels)
+
+    def labels(self) -> List[str]:
+        return self._labels
+
+    def paths(self, label: str) -> List[str]:
+        dir_path = os.path.join(self.parent_dir, label)
+        return [
+            os.path.join(dir_path, filename)
+            for filename in os.listdir(dir_path)
+            if filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+
+    def images(self, label: str) -> Iterator[LabeledImage]:
+        return self._read(self.paths(label))
+
+    def count(self, label: str) -> int:
+        return len(self.paths(label))
+
+    def shuffled_images(
+        self, label: str, rng: np.random.Generator
+    ) -> Iterator[LabeledImage]:
+        paths = self.paths(label)
+        return self._read(paths[i] for i in rng.permutation(len(paths)))
+
+    @staticmethod
+    def _read(paths: Iterable[str]) -> Iterator[LabeledImage]:
+        for path in paths:
+            image = cv2.imread(path)
+            if image is None:
+                print(f"Error: Could not read image at {path}")
+                continue
+            yield path, image
+
+
+class ArchiveSource(ImageSource):
+    """
+    A dataset stored in `.tar`, `.tar.gz` or `.zip` archives, read without extraction.
+
+    Members are streamed sequentially and decoded from memory. The label of a
+    member is the first directory of its path that is a known label, e.g.
+    `weather-data/snow/0001.jpg` is a snow image; other members are skipped.
+    """
+
+    def __init__(
+        self,
+        archive_paths: Union[str, Sequence[str]],
+        labels: Sequence[str] = DEFAULT_LABELS,
+    ):
+        """
+        Initializes the ArchiveSource.
+
+        Args:
+            archive_paths: One archive or several archive shards.
+            labels: The class labels.
+        """
+        if isinstance(archive_paths, str):
+            archive_paths = [archive_paths]
+        self.archive_paths = list(archive_paths)
+        self._labels = list(labels)
+
+    def labels(self) -> List[str]:
+        return self._labels
+
+    def label_of(self, member_name: str) -> Optional[str]:
+        directories = member_name.replace("\\", "/").split("/")[:-1]
+        for directory in directories:
+            if directory in self._labels:
+                return directory
+        return None
+
+    def _members(self, archive_path: str) -> Iterator[Tuple[str, IO[bytes]]]:
+        if archive_path.lower().endswith(".zip"):
+            with zipfile.ZipFile(archive_path) as archive:
+                # In the order of the data in the file, not of the directory
+                infos = sorted(archive.infolist(), key=lambda i: i.header_offset)
+                for info in infos:
+                    if not info.is_dir():
+                        with archive.open(info) as f:
+                            yield info.filename, f
+        else:
+            # "r|*" streams the (possibly compressed) tar without seeking
+            with tarfile.open(archive_path, "r|*") as archive:
+                for member in archive:
+                    if member.isfile():
+                        yield member.name, archive.extractfile(member)
+
+    def _images(self) -> Iterator[Tuple[str, str, IO[bytes]]]:
+        for archive_path in self.archive_paths:
+            for name, f in self._members(archive_path):
+                if self.label_of(name) is not None and name.lower().endswith(
+                    IMAGE_EXTENSIONS
+                ):
+                    yield archive_path, name, f
+
+    def labeled_images(self) -> Iterator[Tuple[str, str, np.ndarray]]:
+        for archive_path, name, f in self._images():
+            path = os.path.join(archive_path, name)
+            data = np.frombuffer(f.read(), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            if image is None:
+                print(f"Error: Could not decode image {path}")
+                continue
+            yield self.label_of(name), path, image
+
+    def count(self, label: str) -> int:
+        # Only the member headers are read, nothing is decoded
+        return sum(1 for _, name, _ in self._images() if self.label_of(name) == label)
+
+    def images(self, label: str) -> Iterator[LabeledImage]:
+        # Each call reads the whole archive; prefer `labeled_images`
+        for image_label, path, image in self.labeled_images():
+            if image_label == label:
+                yield path, image
+
+
+def open_source(path: str = "weather-data") -> ImageSource:
+    """
+    Opens a dataset: a pack written by `sno_fo_fro.pack`, a tar/zip archive
+    or a directory of images.
+    """
+    from sno_fo_fro.pack import DatasetPack
+
+    if DatasetPack.is_pack(path):
+        return DatasetPack(path)
+    if path.lower().endswith(ARCHIVE_EXTENSIONS):
+        return ArchiveSource(path)
+    return DirectorySource(path)
@@ -1,9 +1,13 @@
+import argparse
 from typing import Tuple
+
+from sno_fo_fro.dataset import open_source
 from sno_fo_fro.experiment.experimenter import (
     Experimenter,
     ExperimenterCompareMode,
     ExperimenterWeather,
 )
+from sno_fo_fro.experiment.sequential import SequentialExperimenter
 from sno_fo_fro.hypotheses import (
     ImageBlurrinessProcessor,
     ImageBrightSpotsProcessor,
@@ -66,6 +70,38 @@ img_proc_and_idea: list[
 ]
 
 
-for img_proc, weather_and_mode in img_proc_and_idea:
-    e = Experimenter(img_proc)
-    e.analyze_samples(weather_and_mode[0], weather_and_mode[1])
+parser = argparse.ArgumentParser(description="Check the hypotheses on a dataset.")
+parser.add_argument("source", nargs="?", default="weather-data")
+parser.add_argument(
+    "--sequential",
+    action="store_true",
+    help="process images in random order and stop as soon as the tests decide",
+)
+parser.add_argument("--alpha", type=float, default=0.05)
+parser.add_argument("--look-every", type=int, default=50)
+args = parser.parse_args()
+
+source = open_source(args.source)
+if args.sequential:
+    # Every experimenter draws its own random images and stops on its own
+    for img_proc, weather_and_mode in img_proc_and_idea:
+        e = SequentialExperimenter(
+            img_proc, source=source, alpha=args.alpha, look_every=args.look_every
+        )
+        e.analyze_samples(weather_and_mode[0], weather_and_mode[1])
+else:
+    # All processors run in one pass, so the dataset is decoded once per run
+    samples = [
+        {weather: [] for weather in ExperimenterWeather} for _ in img_proc_and_idea
+    ]
+    for label, _, image in source.labeled_images():
+        if label not in samples[0]:
+            continue
+        for (img_proc, _), by_weather in zip(img_proc_and_idea, samples):
+            result = img_proc.process_image(image)
+            if result is not None:
+                by_weather[label].append(result)
+
+    for (img_proc, weather_and_mode), by_weather in zip(img_proc_and_idea, samples):
+        e = Experimenter(img_proc, weather_samples=by_weather)
+        e.analyze_samples(weather_and_mode[0], weather_and_mode[1])
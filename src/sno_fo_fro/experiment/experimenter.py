@@ -1,9 +1,11 @@
-import os
+from typing import Dict, NamedTuple, Optional, Union
 import numpy as np
 from scipy import stats
 from enum import StrEnum
 
+from sno_fo_fro.dataset import ImageSource, open_source
 from sno_fo_fro.image_processor import ImageProcessor
+from sno_fo_fro.sketch import MetricSummary
 
 
 class ExperimenterCompareMode(StrEnum):
@@ -45,14 +47,62 @@ class Experimenter:
         self,
         img_proc: ImageProcessor[np.floating],
         parent_dir: str = "weather-data",
+        weather_samples: Optional[Dict[str, np.ndarray]] = None,
+        source: Optional[ImageSource] = None,
+        summaries: Optional[Dict[str, MetricSummary]] = None,
+        keep_samples: bool = True,
     ):
-        self.img_proc = img_proc
+        """
+        Initializes the Experimenter.
 
-        self.weather_samples = {}
-        for weather in ExperimenterWeather:
-            dir_path = os.path.join(parent_dir, weather)
-            sample = list(img_proc.process_images_in_dir(dir_path).values())
-            self.weather_samples[weather] = np.array(sample)
+        Args:
+            img_proc: The processor computing the checked metric.
+            parent_dir: The dataset (directory, pack or tar/zip archive).
+            weather_samples: The values per weather computed elsewhere.
+            source: The dataset, overrides `parent_dir`.
+            summaries: The summaries per weather computed elsewhere (e.g. merged
+                from shards); the tests then run on the sketches.
+            keep_samples: Keep every value in memory for the exact tests. Without
+                it only a constant-size MetricSummary per weather is kept.
+        """
+        self.img_proc = img_proc
+        self.weather_samples: Optional[Dict[str, np.ndarray]] = None
+
+        # Samples computed elsewhere (e.g. merged shards) are used as they are
+        if weather_samples is not None:
+            self.weather_samples = {
+                weather: np.asarray(weather_samples[weather])
+                for weather in ExperimenterWeather
+            }
+            self.summaries = {
+                weather: MetricSummary.from_values(sample)
+                for weather, sample in self.weather_samples.items()
+            }
+            return
+        if summaries is not None:
+            self.summaries = {
+                weather: summaries[weather] for weather in ExperimenterWeather
+            }
+            return
+
+        # `parent_dir` may also be a pack or a tar/zip archive
+        source = source if source is not None else open_source(parent_dir)
+        self.summaries = {weather: MetricSummary() for weather in ExperimenterWeather}
+        samples = {weather: [] for weather in ExperimenterWeather}
+        for label, _, image in source.labeled_images():
+            if label not in self.summaries:
+                continue
+            result = img_proc.process_image(image)
+            if result is None:
+                continue
+            self.summaries[label].update(result)
+            if keep_samples:
+                samples[label].append(result)
+
+        if keep_samples:
+            self.weather_samples = {
+                weather: np.array(sample) for weather, sample in samples.items()
+            }
 
     def check_test_res(
         self, pval: np.floating, alpha: np.floating = np.float32(0.05)
@@ -67,11 +117,14 @@ class Experimenter:
 
     def analyze_pair_samples(
         self,
-        main_sample: np.typing.ArrayLike,
-        other_sample: np.typing.ArrayLike,
+        main_sample: Union[np.typing.ArrayLike, MetricSummary],
+        other_sample: Union[np.typing.ArrayLike, MetricSummary],
         mode: ExperimenterCompareMode,
     ) -> bool:
-        analyzer = SampleAnalyzer(main_sample, other_sample, mode)
+        if isinstance(main_sample, MetricSummary):
+            analyzer = SketchSampleAnalyzer(main_sample, other_sample, mode)
+        else:
+            analyzer = SampleAnalyzer(main_sample, other_sample, mode)
         passed = True
 
         if analyzer.is_normal():
@@ -115,12 +168,16 @@ class Experimenter:
     ):
         print(f"\n# Analyze result for proc '{self.img_proc.__class__.__name__}'")
         passed = True
+        # Without the samples the tests run on the sketches
+        samples = (
+            self.weather_samples if self.weather_samples is not None else self.summaries
+        )
         for other_weather in ExperimenterWeather:
             if other_weather != main_weather:
                 print(f"\n## Analyze '{main_weather}' {mode} '{other_weather}'")
                 passed &= self.analyze_pair_samples(
-                    self.weather_samples[main_weather],
-                    self.weather_samples[other_weather],
+                    samples[main_weather],
+                    samples[other_weather],
                     mode,
                 )
         print("\n## Conclusion")
@@ -228,3 +285,149 @@ class SampleAnalyzer:
         return stats.ttest_ind(
             self.sample1, self.sample2, alternative=self.mode, equal_var=False
         )
+
+
+class SketchTestResult(NamedTuple):
+    statistic: float
+    pvalue: float
+
+
+class SketchSampleAnalyzer:
+    """
+    Class for performing the SampleAnalyzer tests on two MetricSummary sketches.
+
+    The t-test and the D'Agostino-Pearson normality test only depend on the
+    moments and are exact. The Mann-Whitney U and Kolmogorov-Smirnov statistics
+    are computed from the quantile sketches (exact below `k` values per sample)
+    with asymptotic p-values. The Shapiro-Wilk test needs the raw values and is
+    not available.
+    """
+
+    def __init__(
+        self,
+        summary1: MetricSummary,
+        summary2: MetricSummary,
+        mode: ExperimenterCompareMode,
+    ):
+        self.summary1 = summary1
+        self.summary2 = summary2
+        self.mode = mode
+
+    @staticmethod
+    def normaltest(summary: MetricSummary) -> SketchTestResult:
+        """
+        D'Agostino-Pearson test from the skewness and kurtosis of the moments,
+        as `scipy.stats.normaltest`.
+        """
+        n = summary.count
+        moments = summary.moments
+
+        y = moments.skewness * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+        beta2 = (
+            3.0
+            * (n**2 + 27 * n - 70)
+            * (n + 1)
+            * (n + 3)
+            / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        )
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = y if y != 0 else 1
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        mean = 3.0 * (n - 1) / (n + 1)
+        variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) ** 2 * (n + 3) * (n + 5))
+        x = (moments.kurtosis - mean) / np.sqrt(variance)
+        sqrtbeta1 = (
+            6.0
+            * (n * n - 5 * n + 2)
+            / ((n + 7) * (n + 9))
+            * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+        )
+        a = 6.0 + 8.0 / sqrtbeta1 * (2.0 / sqrtbeta1 + np.sqrt(1 + 4.0 / sqrtbeta1**2))
+        term1 = 1 - 2 / (9.0 * a)
+        denom = 1 + x * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denom) * ((1 - 2.0 / a) / abs(denom)) ** (1 / 3.0)
+        z_kurtosis = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+        k2 = z_skew**2 + z_kurtosis**2
+        return SketchTestResult(float(k2), float(stats.chi2.sf(k2, 2)))
+
+    def is_normal(self) -> bool:
+        """
+        Checks if both samples are normally distributed by the D'Agostino-Pearson test.
+
+        Returns:
+            True if the p-value for both samples is greater than 0.05,
+            False otherwise (also for fewer than 20 values).
+        """
+        alpha = 0.05
+        for summary in (self.summary1, self.summary2):
+            if summary.count < 20 or summary.moments.m2 == 0:
+                return False
+            if not self.normaltest(summary).pvalue > alpha:
+                return False
+        return True
+
+    def mannwhitneyu(self) -> SketchTestResult:
+        """
+        Performs the Mann-Whitney U test with the normal approximation
+        (with continuity correction, without tie correction).
+        """
+        n1, n2 = self.summary1.count, self.summary2.count
+        values, weights = self.summary1.quantiles.weighted_items()
+        other, other_weights = self.summary2.quantiles.weighted_items()
+        cumulative = np.concatenate([[0], np.cumsum(other_weights)])
+        below = cumulative[np.searchsorted(other, values, side="left")]
+        not_above = cumulative[np.searchsorted(other, values, side="right")]
+        u1 = float(np.sum(weights * (below + not_above) / 2))
+
+        mu = n1 * n2 / 2
+        sigma = np.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+        if self.mode == ExperimenterCompareMode.GREATER:
+            u = u1
+        else:
+            u = n1 * n2 - u1
+        pvalue = stats.norm.sf((u - mu - 0.5) / sigma)
+        return SketchTestResult(u1, float(pvalue))
+
+    def ks_2samp(self) -> SketchTestResult:
+        """
+        Performs the one-sided two-sample Kolmogorov-Smirnov test on the sketch CDFs
+        with the asymptotic p-value `exp(-2 n D^2)`.
+        """
+        xs = np.concatenate(
+            [
+                self.summary1.quantiles.weighted_items()[0],
+                self.summary2.quantiles.weighted_items()[0],
+            ]
+        )
+        difference = self.summary1.quantiles.cdf(xs) - self.summary2.quantiles.cdf(xs)
+        # As in SampleAnalyzer.ks_2samp, the alternative is the inverted mode
+        if self.mode.invert() == ExperimenterCompareMode.GREATER:
+            d = max(float(difference.max()), 0.0)
+        else:
+            d = max(float(-difference.min()), 0.0)
+        n1, n2 = self.summary1.count, self.summary2.count
+        pvalue = np.exp(-2 * n1 * n2 / (n1 + n2) * d**2)
+        return SketchTestResult(d, float(min(pvalue, 1.0)))
+
+    def t_test(self):
+        """
+        Performs Welch's t-test from the means and variances.
+
+        Returns:
+            The result of the scipy.stats.ttest_ind_from_stats function.
+        """
+        m1, m2 = self.summary1.moments, self.summary2.moments
+        return stats.ttest_ind_from_stats(
+            m1.mean,
+            m1.std(ddof=1),
+            m1.count,
+            m2.mean,
+            m2.std(ddof=1),
+            m2.count,
+            equal_var=False,
+            alternative=self.mode,
+        )
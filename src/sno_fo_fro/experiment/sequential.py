@@ -0,0 +1,220 @@
+from statistics import NormalDist
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+from scipy import stats
+
+from sno_fo_fro.dataset import ImageSource, LabeledImage, open_source
+from sno_fo_fro.experiment.experimenter import (
+    ExperimenterCompareMode,
+    ExperimenterWeather,
+)
+from sno_fo_fro.image_processor import ImageProcessor
+
+
+def obrien_fleming_spending(t: float, alpha: float) -> float:
+    """
+    Lan-DeMets alpha spending function of O'Brien-Fleming type (one-sided).
+
+    Almost nothing is spent at the first looks, so a decision early on needs
+    overwhelming evidence, and the whole alpha is spent at `t = 1`.
+
+    Args:
+        t: The information fraction (share of the maximal sample size), 0..1.
+        alpha: The overall significance level.
+
+    Returns:
+        The cumulative type I error allowed up to `t`.
+    """
+    if t <= 0:
+        return 0.0
+    t = min(t, 1.0)
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    return 2 * (1 - NormalDist().cdf(z / np.sqrt(t)))
+
+
+class PairDecision(NamedTuple):
+    """
+    The sequential decision for the comparison of the main weather with another one.
+
+    Attributes:
+        passed: True if the one-sided alternative was accepted.
+        look: The look the decision was made at.
+        pvalue: The Mann-Whitney p-value at that look.
+        threshold: The nominal level it was compared with.
+    """
+
+    passed: bool
+    look: int
+    pvalue: float
+    threshold: float
+
+
+class SequentialResult(NamedTuple):
+    """
+    Outcome of a sequential hypothesis check.
+
+    Attributes:
+        passed: True if the hypothesis is accepted.
+        looks: The number of interim analyses performed.
+        images_processed: The number of images actually processed.
+        images_total: The number of images of the involved classes.
+        decisions: The decision for every other weather.
+    """
+
+    passed: bool
+    looks: int
+    images_processed: int
+    images_total: int
+    decisions: Dict[ExperimenterWeather, PairDecision]
+
+    @property
+    def fraction(self) -> float:
+        return self.images_processed / max(self.images_total, 1)
+
+
+class SequentialExperimenter:
+    """
+    Checks hypotheses like Experimenter, but stops processing images as soon as
+    the outcome is clear.
+
+    Images are drawn in random, class-balanced order and a one-sided
+    Mann-Whitney U test of the main weather against every other weather is
+    repeated after each batch (a group-sequential design). The nominal level of
+    a look is the increment of an O'Brien-Fleming spending function, so by the
+    union bound the type I error over all looks stays below alpha. A comparison
+    stops for futility when the same boundary is crossed in the reverse direction.
+    """
+
+    def __init__(
+        self,
+        img_proc: ImageProcessor[np.floating],
+        parent_dir: str = "weather-data",
+        source: Optional[ImageSource] = None,
+        alpha: float = 0.05,
+        look_every: int = 50,
+        seed: Optional[int] = 0,
+    ):
+        """
+        Initializes the SequentialExperimenter.
+
+        Args:
+            img_proc: The processor computing the checked metric.
+            parent_dir: The dataset (directory, pack or archive).
+            source: The dataset, overrides `parent_dir`.
+            alpha: The overall significance level of every comparison.
+            look_every: The number of images drawn per class between two looks.
+            seed: The seed of the draw order.
+        """
+        self.img_proc = img_proc
+        self.source = source if source is not None else open_source(parent_dir)
+        self.alpha = alpha
+        self.look_every = look_every
+        self.seed = seed
+
+    def _draw(
+        self, draws: Iterator[LabeledImage], sample: List[float], count: int
+    ) -> int:
+        processed = 0
+        for _, image in draws:
+            processed += 1
+            value = self.img_proc.process_image(image)
+            if value is not None:
+                sample.append(float(value))
+            if processed == count:
+                break
+        return processed
+
+    def run(
+        self, main_weather: ExperimenterWeather, mode: ExperimenterCompareMode
+    ) -> SequentialResult:
+        """
+        Checks the hypothesis that the metric of `main_weather` is `mode` than
+        the metric of every other weather.
+
+        Returns:
+            The decision together with the number of images it cost.
+        """
+        rng = np.random.default_rng(self.seed)
+        others = [w for w in ExperimenterWeather if w != main_weather]
+        weathers = [main_weather, *others]
+        draws = {w: self.source.shuffled_images(w, rng) for w in weathers}
+        counts = {w: self.source.count(w) for w in weathers}
+        samples: Dict[ExperimenterWeather, List[float]] = {w: [] for w in weathers}
+        taken = {w: 0 for w in weathers}
+        exhausted = set()
+
+        decisions: Dict[ExperimenterWeather, PairDecision] = {}
+        spent = {w: 0.0 for w in others}
+        look = 0
+        while len(decisions) < len(others):
+            look += 1
+            undecided = [w for w in others if w not in decisions]
+            for weather in [main_weather, *undecided]:
+                drawn = self._draw(draws[weather], samples[weather], self.look_every)
+                taken[weather] += drawn
+                if drawn < self.look_every or taken[weather] >= counts[weather]:
+                    exhausted.add(weather)
+
+            for other in undecided:
+                main_sample, other_sample = samples[main_weather], samples[other]
+                # The last look is when one of the two classes is exhausted
+                final = main_weather in exhausted or other in exhausted
+                n_max = min(counts[main_weather], counts[other])
+                n = min(len(main_sample), len(other_sample))
+                t = 1.0 if final else n / max(n_max, 1)
+                cumulative = obrien_fleming_spending(t, self.alpha)
+                threshold = cumulative - spent[other]
+                spent[other] = cumulative
+                if n < 2:
+                    if final:
+                        decisions[other] = PairDecision(False, look, 1.0, threshold)
+                    continue
+
+                pvalue = stats.mannwhitneyu(
+                    main_sample, other_sample, alternative=mode
+                ).pvalue
+                reverse = stats.mannwhitneyu(
+                    main_sample, other_sample, alternative=mode.invert()
+                ).pvalue
+                if pvalue < threshold:
+                    decisions[other] = PairDecision(True, look, pvalue, threshold)
+                elif reverse < threshold or final:
+                    decisions[other] = PairDecision(False, look, pvalue, threshold)
+
+            # One failed comparison rejects the hypothesis
+            if any(not d.passed for d in decisions.values()):
+                break
+
+        return SequentialResult(
+            passed=len(decisions) == len(others)
+            and all(d.passed for d in decisions.values()),
+            looks=look,
+            images_processed=sum(taken.values()),
+            images_total=sum(counts.values()),
+            decisions=decisions,
+        )
+
+    def analyze_samples(
+        self, main_weather: ExperimenterWeather, mode: ExperimenterCompareMode
+    ) -> SequentialResult:
+        name = self.img_proc.__class__.__name__
+        print(f"\n# Sequential analysis for proc '{name}'")
+        result = self.run(main_weather, mode)
+        for other, decision in result.decisions.items():
+            status = "passed" if decision.passed else "failed"
+            print(
+                f"\n## '{main_weather}' {mode} '{other}': {status} at look "
+                f"{decision.look} (Mann-Whitney p = {decision.pvalue:.3g}, "
+                f"boundary {decision.threshold:.3g})"
+            )
+        print("\n## Conclusion")
+        print(
+            f"Processed {result.images_processed} of {result.images_total} images "
+            f"({result.fraction:.0%}) in {result.looks} looks."
+        )
+        if result.passed:
+            print(f"The hypothesis of ImageProcessor {name} is accepted.")
+        else:
+            print(f"The hypothesis of ImageProcessor {name} is rejected.")
+        return result
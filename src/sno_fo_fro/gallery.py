@@ -0,0 +1,441 @@
+import heapq
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+from PyQt5.QtCore import (
+    QAbstractListModel,
+    QModelIndex,
+    QPoint,
+    QRect,
+    QSize,
+    Qt,
+    QTimer,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QColor, QFont, QImage
+from PyQt5.QtWidgets import (
+    QLabel,
+    QListView,
+    QStyledItemDelegate,
+    QVBoxLayout,
+    QWidget,
+)
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.classifier import ImageClassifier
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS
+from sno_fo_fro.scheduler import image_size
+
+THUMBNAIL_SIZE = 160
+LABEL_ROLE = Qt.UserRole + 1
+BADGE_COLORS = {
+    "snow": QColor(70, 130, 220),
+    "fog": QColor(120, 120, 120),
+    "fogsmog": QColor(120, 120, 120),
+    "frost": QColor(40, 170, 170),
+}
+
+
+def list_images(dir_path: str) -> List[str]:
+    """
+    Returns the paths of the images directly inside a folder, sorted by name.
+    """
+    with os.scandir(dir_path) as entries:
+        return sorted(
+            entry.path
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+
+
+def load_thumbnail(path: str, size: int = THUMBNAIL_SIZE) -> Optional[QImage]:
+    """
+    Decodes an image at reduced resolution and scales it to fit a square.
+
+    For JPEG images the decoder itself skips the fine detail
+    (IMREAD_REDUCED_COLOR_2/4/8), so large photos are never decoded in full.
+
+    Returns:
+        The thumbnail, or None if the image cannot be read.
+    """
+    flag = cv2.IMREAD_COLOR
+    try:
+        shape = image_size(path)
+    except OSError:
+        return None
+    if shape is not None:
+        for factor, reduced in (
+            (8, cv2.IMREAD_REDUCED_COLOR_8),
+            (4, cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_COLOR_2),
+        ):
+            if min(shape) // factor >= size:
+                flag = reduced
+                break
+
+    image = cv2.imread(path, flag)
+    if image is None:
+        return None
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w, 1.0)
+    if scale < 1.0:
+        image = cv2.resize(
+            image,
+            (max(1, round(w * scale)), max(1, round(h * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    h, w = rgb.shape[:2]
+    # copy() detaches the QImage from the numpy buffer
+    return QImage(rgb.data, w, h, rgb.strides[0], QImage.Format_RGB888).copy()
+
+
+class ThumbnailCache:
+    """
+    A bounded LRU of decoded thumbnails, so memory does not grow with the folder.
+    """
+
+    def __init__(self, capacity: int = 512):
+        self.capacity = capacity
+        self._images: OrderedDict[str, QImage] = OrderedDict()
+
+    def get(self, path: str) -> Optional[QImage]:
+        image = self._images.get(path)
+        if image is not None:
+            self._images.move_to_end(path)
+        return image
+
+    def put(self, path: str, image: QImage):
+        self._images[path] = image
+        self._images.move_to_end(path)
+        while len(self._images) > self.capacity:
+            self._images.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+class PriorityWorker(threading.Thread):
+    """
+    A background thread handling keys in the order of their priority.
+
+    Submitting a key again changes its priority; superseded heap entries are
+    skipped when popped. Lower priorities are handled first.
+    """
+
+    def __init__(self, handler: Callable[[List[str]], None], batch_size: int = 1):
+        """
+        Initializes the PriorityWorker.
+
+        Args:
+            handler: Called from the worker thread with the next batch of keys.
+            batch_size: The maximal number of keys handled by one call.
+        """
+        super().__init__(daemon=True)
+        self.handler = handler
+        self.batch_size = batch_size
+        self._heap = []
+        self._priorities: Dict[str, float] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def submit(self, key: str, priority: float):
+        with self._condition:
+            if self._priorities.get(key) == priority:
+                return
+            self._priorities[key] = priority
+            heapq.heappush(self._heap, (priority, next(self._counter), key))
+            self._condition.notify()
+
+    def cancel(self, key: str):
+        with self._condition:
+            self._priorities.pop(key, None)
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._priorities)
+
+    def _next_batch(self) -> List[str]:
+        with self._condition:
+            while not self._stopped and not self._priorities:
+                self._condition.wait()
+            batch = []
+            while self._heap and len(batch) < self.batch_size:
+                priority, _, key = heapq.heappop(self._heap)
+                if self._priorities.get(key) == priority:
+                    del self._priorities[key]
+                    batch.append(key)
+            return batch
+
+    def run(self):
+        while not self._stopped:
+            batch = self._next_batch()
+            if batch:
+                self.handler(batch)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+
+class GalleryModel(QAbstractListModel):
+    """
+    A list model of the images of a folder.
+
+    Thumbnails are decoded lazily when the view asks for them and classes
+    arrive from a background queue; both are delivered through queued signals.
+    """
+
+    thumbnailReady = pyqtSignal(str, QImage)
+    classified = pyqtSignal(str, str)
+
+    def __init__(
+        self,
+        paths: List[str],
+        classifier: ImageClassifier,
+        cache_capacity: int = 512,
+        batch_size: int = 8,
+    ):
+        super().__init__()
+        self.paths = paths
+        self.rows = {path: row for row, path in enumerate(paths)}
+        self.classifier = classifier
+        self.cache = ThumbnailCache(cache_capacity)
+        self.labels: Dict[str, str] = {}
+        self._requests = itertools.count()
+        self._loading = set()
+        # Paths that cannot be decoded, so that repaints do not retry them
+        self._failed = set()
+        self._epoch = 0
+
+        self.thumbnailReady.connect(self._on_thumbnail)
+        self.classified.connect(self._on_classified)
+
+        self.thumbnails = PriorityWorker(self._load_thumbnails)
+        self.classification = PriorityWorker(self._classify, batch_size)
+        # Until the view reports what is visible, classify in folder order
+        for row, path in enumerate(paths):
+            self.classification.submit(path, row)
+        self.thumbnails.start()
+        self.classification.start()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.ToolTipRole:
+            return path
+        if role == Qt.DecorationRole:
+            image = self.cache.get(path)
+            if image is None and path not in self._loading and path not in self._failed:
+                # Most recent requests first: after fast scrolling the
+                # thumbnails now on screen are decoded before the skipped ones
+                self._loading.add(path)
+                self.thumbnails.submit(path, -next(self._requests))
+            return image
+        if role == LABEL_ROLE:
+            return self.labels.get(path)
+        return None
+
+    def prioritize(self, first: int, last: int):
+        """
+        Moves the classification of the visible rows to the front of the queue,
+        followed by their neighbours, and drops the pending thumbnails of rows
+        scrolled out of view.
+        """
+        self._epoch += 1
+        base = -self._epoch * len(self.paths)
+        span = last - first + 1
+        start, stop = max(0, first - span), min(len(self.paths), last + span + 1)
+        for row in range(start, stop):
+            path = self.paths[row]
+            if path in self.labels:
+                continue
+            distance = (
+                0 if first <= row <= last else min(abs(row - first), abs(row - last))
+            )
+            self.classification.submit(path, base + distance)
+
+        for path in list(self._loading):
+            if not start <= self.rows[path] < stop:
+                self.thumbnails.cancel(path)
+                self._loading.discard(path)
+
+    def _load_thumbnails(self, paths: List[str]):
+        for path in paths:
+            image = load_thumbnail(path)
+            self.thumbnailReady.emit(path, image if image is not None else QImage())
+
+    def _classify(self, paths: List[str]):
+        analyzed = []
+        for path in paths:
+            try:
+                analyzed.append((path, ImageAnalyzer.process_image_by_path(path)))
+            except Exception as e:
+                print(f"Failed to analyze {path}: {e}")
+                self.classified.emit(path, "error")
+        if not analyzed:
+            return
+        try:
+            predictions = self.classifier.predict([metrics for _, metrics in analyzed])
+        except Exception as e:
+            print(f"Failed to classify: {e}")
+            predictions = [None] * len(analyzed)
+        for (path, _), prediction in zip(analyzed, predictions):
+            self.classified.emit(path, prediction.label if prediction else "error")
+
+    def _on_thumbnail(self, path: str, image: QImage):
+        self._loading.discard(path)
+        if image.isNull():
+            self._failed.add(path)
+        else:
+            self.cache.put(path, image)
+        index = self.index(self.rows[path])
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def _on_classified(self, path: str, label: str):
+        self.labels[path] = label
+        index = self.index(self.rows[path])
+        self.dataChanged.emit(index, index, [LABEL_ROLE])
+
+    def stop(self):
+        self.thumbnails.stop()
+        self.classification.stop()
+
+
+class BadgeDelegate(QStyledItemDelegate):
+    """
+    Paints the predicted class as a badge in the corner of a thumbnail.
+    """
+
+    def sizeHint(self, option, index) -> QSize:
+        # The same size with or without a decoded thumbnail
+        return QSize(THUMBNAIL_SIZE + 10, THUMBNAIL_SIZE + 30)
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        label = index.data(LABEL_ROLE)
+        if not label:
+            return
+
+        painter.save()
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        width = painter.fontMetrics().horizontalAdvance(label) + 10
+        height = painter.fontMetrics().height() + 4
+        rect = QRect(
+            option.rect.right() - width - 4, option.rect.top() + 4, width, height
+        )
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(BADGE_COLORS.get(label.lower(), QColor(200, 80, 60)))
+        painter.drawRoundedRect(rect, 4, 4)
+        painter.setPen(Qt.white)
+        painter.drawText(rect, Qt.AlignCenter, label)
+        painter.restore()
+
+
+class GalleryView(QWidget):
+    """
+    A window with a virtualized thumbnail grid of a folder, classified in the background.
+    """
+
+    imageActivated = pyqtSignal(str)
+    closed = pyqtSignal()
+
+    def __init__(self, dir_path: str, classifier: ImageClassifier):
+        super().__init__()
+        self.setWindowTitle(f"sno-fo-fro: {dir_path}")
+        self.setGeometry(150, 150, 1000, 700)
+
+        self.model = GalleryModel(list_images(dir_path), classifier)
+        self.list_view = QListView(self)
+        self.list_view.setViewMode(QListView.IconMode)
+        self.list_view.setResizeMode(QListView.Adjust)
+        self.list_view.setMovement(QListView.Static)
+        self.list_view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.list_view.setGridSize(QSize(THUMBNAIL_SIZE + 20, THUMBNAIL_SIZE + 40))
+        # Lets the view lay out thousands of items without querying each of them
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setLayoutMode(QListView.Batched)
+        self.list_view.setItemDelegate(BadgeDelegate(self.list_view))
+        self.list_view.setModel(self.model)
+        self.list_view.activated.connect(
+            lambda index: self.imageActivated.emit(self.model.paths[index.row()])
+        )
+
+        self.status_label = QLabel(self)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.list_view)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        # Reprioritizes once scrolling settles instead of on every pixel
+        self.scroll_timer = QTimer(self)
+        self.scroll_timer.setSingleShot(True)
+        self.scroll_timer.setInterval(100)
+        self.scroll_timer.timeout.connect(self.prioritize_visible)
+        # (valueChanged passes the position, which start() would take as the interval)
+        self.list_view.verticalScrollBar().valueChanged.connect(
+            lambda _: self.scroll_timer.start()
+        )
+
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_status)
+        self.status_timer.start(500)
+
+    def visible_rows(self) -> Optional[Tuple[int, int]]:
+        """
+        Returns the first and last visible row, probing the viewport at half-grid steps.
+        """
+        viewport = self.list_view.viewport().rect()
+        grid = self.list_view.gridSize()
+        rows = [
+            index.row()
+            for y in range(0, viewport.height(), max(1, grid.height() // 2))
+            for x in range(0, viewport.width(), max(1, grid.width() // 2))
+            if (index := self.list_view.indexAt(QPoint(x, y))).isValid()
+        ]
+        if not rows:
+            return None
+        return min(rows), max(rows)
+
+    def prioritize_visible(self):
+        visible = self.visible_rows()
+        if visible is not None:
+            self.model.prioritize(*visible)
+
+    def update_status(self):
+        total = self.model.rowCount()
+        self.status_label.setText(
+            f"{len(self.model.labels)} / {total} classified, "
+            f"{len(self.model.cache)} thumbnails cached"
+        )
+
+    def showEvent(self, a0):
+        super().showEvent(a0)
+        self.scroll_timer.start()
+
+    def resizeEvent(self, a0):
+        super().resizeEvent(a0)
+        self.scroll_timer.start()
+
+    def closeEvent(self, a0):
+        self.model.stop()
+        self.status_timer.stop()
+        self.scroll_timer.stop()
+        super().closeEvent(a0)
+        self.closed.emit()
@@ -0,0 +1,421 @@
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import h2o
+
+from sno_fo_fro.models import ModelRegistry
+
+STATE_FORMAT = "sno-fo-fro-h2o-backend/1"
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), f"sno-fo-fro-h2o-{os.getuid()}")
+DEFAULT_PORT = 54321
+
+
+class BackendInfo(NamedTuple):
+    """
+    The shared backend as recorded in its state file.
+
+    Attributes:
+        url: The URL of the H2O REST API.
+        pid: The process id of the JVM.
+        started_at: The start time (seconds since the epoch).
+    """
+
+    url: str
+    pid: int
+    started_at: float
+
+
+def jar_path() -> str:
+    """
+    Returns the h2o.jar of the installed h2o package (or `H2O_JAR_PATH`).
+    """
+    own_jar = os.getenv("H2O_JAR_PATH")
+    if own_jar:
+        return own_jar
+    return os.path.join(os.path.dirname(h2o.__file__), "backend", "bin", "h2o.jar")
+
+
+def launch_jvm(
+    port: int, log_path: str, nthreads: int = -1, max_mem_size: Optional[str] = None
+) -> subprocess.Popen:
+    """
+    Starts an H2O JVM in its own session, so that it outlives the starting process.
+    """
+    cmd = ["java"]
+    if max_mem_size:
+        cmd.append(f"-Xmx{max_mem_size}")
+    cmd += [
+        "-jar",
+        jar_path(),
+        "-name",
+        f"sno-fo-fro-{port}",
+        "-ip",
+        "127.0.0.1",
+        "-port",
+        str(port),
+        "-nthreads",
+        str(nthreads),
+    ]
+    with open(log_path, "a") as log:
+        return subprocess.Popen(
+            cmd, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+
+
+def is_healthy(url: str, timeout: float = 2.0) -> bool:
+    """
+    Checks that the H2O cloud at `url` answers and that all its nodes are healthy.
+    """
+    try:
+        with urllib.request.urlopen(f"{url}/3/Cloud", timeout=timeout) as response:
+            cloud = json.load(response)
+    except (OSError, ValueError):
+        return False
+    return bool(cloud.get("cloud_healthy")) and bool(cloud.get("consensus"))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        # Reaps the backend if this process started it
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedH2OBackend:
+    """
+    One local H2O backend shared by all processes of the user on this host.
+
+    The first process that needs the backend starts the JVM and records it in
+    a state file; the other processes find it there and attach to it. Starting,
+    loading models and stopping are serialized by a file lock, so concurrent
+    workers never start a second JVM or load a model twice. Models are loaded
+    on the server once and looked up by their model id afterwards.
+
+    Within a process, the h2o client keeps one connection (with a pooled HTTP
+    session) that all classifiers reuse.
+    """
+
+    def __init__(
+        self,
+        state_dir: str = DEFAULT_STATE_DIR,
+        port: int = DEFAULT_PORT,
+        nthreads: int = -1,
+        max_mem_size: Optional[str] = None,
+        startup_timeout: float = 120.0,
+        launcher: Optional[Callable[[int, str], Any]] = None,
+        health_check: Callable[[str], bool] = is_healthy,
+        connector: Optional[Callable[[str], Any]] = None,
+        check_interval: float = 30.0,
+    ):
+        """
+        Initializes the SharedH2OBackend (nothing is started until it is used).
+
+        Args:
+            state_dir: The directory of the state file, the lock and the JVM log.
+            port: The port of a backend started by this client.
+            nthreads: The number of threads of a started backend (-1: all CPUs).
+            max_mem_size: The maximal heap of a started backend (e.g. "4g").
+            startup_timeout: Seconds to wait for a started backend to become healthy.
+            launcher: The function starting a backend for a port and a log path
+                (default starts the JVM of the h2o package).
+            health_check: The function checking a backend by its URL.
+            connector: The function connecting the h2o client to a URL.
+            check_interval: Seconds an attached backend is trusted without
+                checking its health again; failed calls check it at once.
+        """
+        self.state_dir = state_dir
+        self.port = port
+        self.startup_timeout = startup_timeout
+        self.launcher = (
+            launcher
+            if launcher is not None
+            else lambda port, log_path: launch_jvm(
+                port, log_path, nthreads, max_mem_size
+            )
+        )
+        self.health_check = health_check
+        self.connector = (
+            connector
+            if connector is not None
+            else lambda url: h2o.connect(url=url, verbose=False)
+        )
+        self.check_interval = check_interval
+        self._connected: Optional[BackendInfo] = None
+        self._checked_at = 0.0
+        self._models: Dict[str, Any] = {}
+        self._registries: List[ModelRegistry] = []
+        os.makedirs(state_dir, exist_ok=True)
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.state_dir, "backend.json")
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.state_dir, "h2o.log")
+
+    @contextlib.contextmanager
+    def lock(self) -> Iterator[None]:
+        """
+        Holds the lock of the backend across all processes on this host.
+        """
+        with open(os.path.join(self.state_dir, "lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_state(self) -> Optional[BackendInfo]:
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("format") != STATE_FORMAT:
+            return None
+        return BackendInfo(state["url"], state["pid"], state["started_at"])
+
+    def _write_state(self, info: BackendInfo):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format": STATE_FORMAT, **info._asdict()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def discover(self) -> Optional[BackendInfo]:
+        """
+        Returns the recorded backend if it is healthy.
+        """
+        info = self._read_state()
+        if info is not None and self.health_check(info.url):
+            return info
+        return None
+
+    def _start(self) -> BackendInfo:
+        url = f"http://127.0.0.1:{self.port}"
+        # A backend that answers on the port but was not recorded is adopted
+        if self.health_check(url):
+            info = BackendInfo(url, 0, time.time())
+            self._write_state(info)
+            return info
+
+        process = self.launcher(self.port, self.log_path)
+        deadline = time.time() + self.startup_timeout
+        while not self.health_check(url):
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"H2O backend exited during startup, see {self.log_path}"
+                )
+            if time.time() > deadline:
+                process.terminate()
+                raise TimeoutError("H2O backend did not start within the timeout")
+            time.sleep(0.5)
+        info = BackendInfo(url, process.pid, time.time())
+        self._write_state(info)
+        print(f"Started shared H2O backend at {url} (pid {process.pid})")
+        return info
+
+    def ensure(self) -> BackendInfo:
+        """
+        Returns a healthy backend, starting one if there is none.
+        """
+        info = self.discover()
+        if info is not None:
+            return info
+        with self.lock():
+            # Another process may have started it while we were waiting
+            return self.discover() or self._start()
+
+    def connect(self) -> BackendInfo:
+        """
+        Attaches this process to the shared backend (once, unless it was restarted).
+
+        The state file and the health of the backend are only looked at again
+        after `check_interval` seconds.
+        """
+        if (
+            self._connected is not None
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return self._connected
+        info = self.ensure()
+        if self._connected != info:
+            self.connector(info.url)
+            # Models of a previous backend are gone with it
+            self._forget_models()
+            self._connected = info
+        self._checked_at = time.monotonic()
+        return info
+
+    def is_healthy(self) -> bool:
+        return self._connected is not None and self.health_check(self._connected.url)
+
+    def reconnect(self) -> BackendInfo:
+        """
+        Attaches again after the backend died or was restarted.
+        """
+        self._connected = None
+        return self.connect()
+
+    def call[T](self, function: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Runs a client call, retrying once on a fresh connection if the backend
+        is not healthy any more.
+        """
+        self.connect()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            if self.is_healthy():
+                raise
+            print("H2O backend is not healthy, reconnecting")
+            self.reconnect()
+            return function(*args, **kwargs)
+
+    def _forget_models(self):
+        self._models.clear()
+        for registry in self._registries:
+            registry.clear()
+
+    @staticmethod
+    def model_id(path: str) -> str:
+        # Saved models are named after their model id
+        return os.path.basename(os.path.normpath(path))
+
+    def load_model(self, path: str) -> Any:
+        """
+        Returns a model loaded on the server once for all clients.
+        """
+        self.connect()
+        model_id = self.model_id(path)
+        model = self._models.get(model_id)
+        if model is not None:
+            return model
+        with self.lock():
+            try:
+                model = h2o.get_model(model_id)
+            except Exception:
+                model = h2o.load_model(path)
+        self._models[model_id] = model
+        return model
+
+    def registry(self, root: Optional[str] = None, capacity: int = 3) -> ModelRegistry:
+        """
+        Returns a registry loading the models through the shared backend.
+
+        Evicted models stay on the server, since other clients may use them.
+        """
+        kwargs = {} if root is None else {"root": root}
+        registry = ModelRegistry(
+            loader=self.load_model,
+            unloader=lambda model: None,
+            capacity=capacity,
+            **kwargs,
+        )
+        self._registries.append(registry)
+        return registry
+
+    def shutdown(self, timeout: float = 30.0):
+        """
+        Stops the shared backend for all clients and removes its state.
+        """
+        with self.lock():
+            info = self._read_state()
+            if info is None:
+                return
+            try:
+                with urllib.request.urlopen(
+                    urllib.request.Request(f"{info.url}/3/Shutdown", method="POST"),
+                    timeout=5,
+                ):
+                    pass
+            except OSError:
+                # The REST API does not answer, stop the process instead
+                if info.pid and _pid_alive(info.pid):
+                    os.kill(info.pid, signal.SIGTERM)
+            if info.pid:
+                deadline = time.time() + timeout
+                while _pid_alive(info.pid) and time.time() < deadline:
+                    time.sleep(0.2)
+                if _pid_alive(info.pid):
+                    os.kill(info.pid, signal.SIGKILL)
+            os.remove(self.state_path)
+            self._connected = None
+            self._forget_models()
+
+
+_shared_backend: Optional[SharedH2OBackend] = None
+
+
+def get_shared_backend() -> SharedH2OBackend:
+    """
+    Returns the process-wide client of the shared backend.
+    """
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = SharedH2OBackend()
+    return _shared_backend
+
+
+_shared_registries: Dict[int, ModelRegistry] = {}
+
+
+def get_shared_registry(backend: SharedH2OBackend) -> ModelRegistry:
+    """
+    Returns the process-wide registry of the models in `pretrained/` loaded
+    through a shared backend.
+    """
+    registry = _shared_registries.get(id(backend))
+    if registry is None:
+        registry = _shared_registries[id(backend)] = backend.registry()
+    return registry
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Manage the shared H2O backend.")
+    parser.add_argument("command", choices=("start", "status", "stop"))
+    parser.add_argument("--state-dir", default=DEFAULT_STATE_DIR)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-mem-size", help="maximal JVM heap, e.g. 4g")
+    args = parser.parse_args(argv)
+
+    backend = SharedH2OBackend(
+        args.state_dir, args.port, max_mem_size=args.max_mem_size
+    )
+    if args.command == "start":
+        info = backend.ensure()
+        print(f"H2O backend at {info.url} (pid {info.pid})")
+    elif args.command == "status":
+        info = backend.discover()
+        if info is None:
+            print("No healthy H2O backend")
+            return 1
+        print(f"H2O backend at {info.url} (pid {info.pid}) is healthy")
+    elif args.command == "stop":
+        backend.shutdown()
+        print("H2O backend stopped")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.h2o_backend start|status|stop
+if __name__ == "__main__":
+    sys.exit(main())
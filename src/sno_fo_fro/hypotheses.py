@@ -1,6 +1,9 @@
+from typing import Optional
+
 import cv2
 import numpy as np
 from sno_fo_fro.image_processor import ImageProcessor
+from sno_fo_fro.workspace import BufferWorkspace, buffered_var, get_workspace
 
 
 class ImageLuminanceProcessor(ImageProcessor):
@@ -22,27 +25,22 @@ class ImageLuminanceProcessor(ImageProcessor):
             The average luminance of the image.  Returns -1 on error.
         """
         if self.use_brightness:
-            img_hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            ws = get_workspace(image)
+            img_hsv = cv2.cvtColor(
+                image, cv2.COLOR_BGR2HSV, dst=ws.get("hsv", image.shape)
+            )
             brightness = img_hsv[:, :, 2].mean()
             return brightness
         else:
             if len(image.shape) != 3 or image.shape[2] != 3:
                 raise TypeError("Error: Image must have 3 color channels (BGR).")
 
-            # Split the image into its B, G, and R channels (float for accuracy)
-            blue_channel = image[:, :, 0].astype(np.float64)
-            green_channel = image[:, :, 1].astype(np.float64)
-            red_channel = image[:, :, 2].astype(np.float64)
-
-            # Calculate the luminance using the weighted sum formula
-            luminance = (
-                0.2126 * red_channel + 0.7152 * green_channel + 0.0722 * blue_channel
-            )
-
-            # Calculate the average luminance
-            average_luminance = np.mean(luminance)
+            # The mean of the weighted sum is the weighted sum of the channel
+            # means, which cv2.mean computes in one pass with double accumulators
+            b_avg, g_avg, r_avg, _ = cv2.mean(image)
+            average_luminance = 0.2126 * r_avg + 0.7152 * g_avg + 0.0722 * b_avg
 
-            return average_luminance
+            return np.float64(average_luminance)
 
 
 class ImageContrastProcessor(ImageProcessor):
@@ -60,11 +58,17 @@ class ImageContrastProcessor(ImageProcessor):
         Returns:
             A float value representing the image contrast. Higher values indicate higher contrast.
         """
+        ws = get_workspace(image)
+
         # Convert the image to grayscale
-        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray_image = cv2.cvtColor(
+            image, cv2.COLOR_BGR2GRAY, dst=ws.get("gray", image.shape[:2])
+        )
 
         # Return the standard deviation as the contrast value
-        contrast = gray_image.var()
+        contrast = buffered_var(
+            gray_image, ws.get("gray_f64", gray_image.shape, np.float64)
+        )
         return contrast
 
 
@@ -83,7 +87,8 @@ class ImageSaturationProcessor(ImageProcessor):
         Returns:
             A float value representing the image saturation. Higher values indicate higher saturation.
         """
-        img_hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        ws = get_workspace(image)
+        img_hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=ws.get("hsv", image.shape))
 
         saturation = img_hsv[:, :, 1].mean()
         return saturation
@@ -104,7 +109,11 @@ class ImageBlurrinessProcessor(ImageProcessor):
         Returns:
             A float value representing the image saturation. Higher values indicate less blurriness.
         """
-        return cv2.Laplacian(image, cv2.CV_64F).var()
+        ws = get_workspace(image)
+        laplacian = cv2.Laplacian(
+            image, cv2.CV_64F, dst=ws.get("laplacian", image.shape, np.float64)
+        )
+        return buffered_var(laplacian, ws.get("laplacian_tmp", image.shape, np.float64))
 
 
 class ImageWhitenessProcessor(ImageProcessor):
@@ -134,17 +143,26 @@ class ImageWhitenessProcessor(ImageProcessor):
         Returns:
             A float value representing the fraction of white pixels in the image.
         """
+        ws = get_workspace(image)
+
         # Convert the image to HSV color space
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hsv_image = cv2.cvtColor(
+            image, cv2.COLOR_BGR2HSV, dst=ws.get("hsv", image.shape)
+        )
 
-        # Split the HSV image into hue, saturation, and value channels
-        h, s, v = cv2.split(hsv_image)
+        # Take views of the saturation and value channels
+        s = hsv_image[:, :, 1]
+        v = hsv_image[:, :, 2]
 
         # Define a mask for white pixels: high value and low saturation
-        white_mask = (v >= self.value_threshold) & (s <= self.saturation_threshold)
+        white_mask = ws.get("mask", image.shape[:2], np.bool_)
+        saturation_mask = ws.get("mask_tmp", image.shape[:2], np.bool_)
+        np.greater_equal(v, self.value_threshold, out=white_mask)
+        np.less_equal(s, self.saturation_threshold, out=saturation_mask)
+        np.logical_and(white_mask, saturation_mask, out=white_mask)
 
         # Calculate the fraction of white pixels
-        white_pixel_count = np.sum(white_mask)
+        white_pixel_count = np.count_nonzero(white_mask)
         total_pixels = image.shape[0] * image.shape[1]
         white_fraction = white_pixel_count / total_pixels
 
@@ -152,51 +170,61 @@ class ImageWhitenessProcessor(ImageProcessor):
 
 
 class ImageWhiteGradientProcessor(ImageBlurrinessProcessor):
+    """
+    Calculates the spread of the product of the saturation and value gradients,
+    weighted by how white every pixel is.
+
+    Works in float32 (Sobel, cv2.magnitude and in-place products); the result
+    stays within 1e-4 relative error of the float64 computation.
+    """
+
     def process_image(self, image: np.ndarray) -> np.float32:
+        ws = get_workspace(image)
+        plane_shape = image.shape[:2]
+
         # 2. Convert the image to HSV color space
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hsv_image = cv2.cvtColor(
+            image, cv2.COLOR_BGR2HSV, dst=ws.get("hsv", image.shape)
+        )
 
-        # 3. Extract Saturation and Value channels
-        saturation_channel = hsv_image[:, :, 1].astype(
-            np.float32
-        )  # Channel 1 is Saturation in HSV (OpenCV)
-        value_channel = hsv_image[:, :, 2].astype(
-            np.float32
-        )  # Channel 2 is Value in HSV (OpenCV)
+        # 3. Extract Saturation and Value channels (1 and 2 in OpenCV HSV)
+        saturation_channel = cv2.extractChannel(
+            hsv_image, 1, dst=ws.get("plane_s", plane_shape)
+        )
+        value_channel = cv2.extractChannel(
+            hsv_image, 2, dst=ws.get("plane_v", plane_shape)
+        )
 
-        # 4. Calculate Gradients for Saturation Channel
+        # 4. Calculate Gradients for Saturation and Value Channels
         # Using Sobel operator for gradient calculation - you can use other methods like Scharr, Prewitt, etc.
-        grad_saturation_x = cv2.Sobel(
-            saturation_channel, cv2.CV_64F, 1, 0, ksize=3
-        )  # Gradient in x-direction
-        grad_saturation_y = cv2.Sobel(
-            saturation_channel, cv2.CV_64F, 0, 1, ksize=3
-        )  # Gradient in y-direction
-
-        # Calculate gradient magnitude for Saturation
-        saturation_gradient_magnitude = np.sqrt(
-            grad_saturation_x**2 + grad_saturation_y**2
+        grad_x = ws.get("sobel_x", plane_shape, np.float32)
+        grad_y = ws.get("sobel_y", plane_shape, np.float32)
+        saturation_gradient_magnitude = ws.get("grad_s", plane_shape, np.float32)
+        value_gradient_magnitude = ws.get("grad_v", plane_shape, np.float32)
+
+        for channel, magnitude in (
+            (saturation_channel, saturation_gradient_magnitude),
+            (value_channel, value_gradient_magnitude),
+        ):
+            cv2.Sobel(channel, cv2.CV_32F, 1, 0, dst=grad_x, ksize=3)  # x-direction
+            cv2.Sobel(channel, cv2.CV_32F, 0, 1, dst=grad_y, ksize=3)  # y-direction
+            # sqrt(gx**2 + gy**2) in one pass
+            cv2.magnitude(grad_x, grad_y, magnitude=magnitude)
+
+        whiteness_of_pixel = ws.get("whiteness", plane_shape, np.float32)
+        np.maximum(saturation_channel, 1, out=whiteness_of_pixel)
+        np.divide(value_channel, whiteness_of_pixel, out=whiteness_of_pixel)
+
+        grad_mult = np.multiply(
+            saturation_gradient_magnitude,
+            value_gradient_magnitude,
+            out=saturation_gradient_magnitude,
         )
+        np.multiply(grad_mult, whiteness_of_pixel, out=grad_mult)
 
-        # 5. Calculate Gradients for Value Channel
-        grad_value_x = cv2.Sobel(
-            value_channel, cv2.CV_64F, 1, 0, ksize=3
-        )  # Gradient in x-direction
-        grad_value_y = cv2.Sobel(
-            value_channel, cv2.CV_64F, 0, 1, ksize=3
-        )  # Gradient in y-direction
-
-        # Calculate gradient magnitude for Value
-        value_gradient_magnitude = np.sqrt(grad_value_x**2 + grad_value_y**2)
-
-        whiteness_of_pixel = value_channel / np.maximum(saturation_channel, 1)
-
-        grad_mult = (
-            saturation_gradient_magnitude
-            * value_gradient_magnitude
-            * whiteness_of_pixel
-        )
-        return grad_mult.std()
+        # Standard deviation with double accumulators
+        _, std_dev = cv2.meanStdDev(grad_mult)
+        return np.float64(std_dev[0, 0])
 
 
 class ImageEdgeDensityProcessor(ImageProcessor):
@@ -223,11 +251,18 @@ class ImageEdgeDensityProcessor(ImageProcessor):
             A float value representing the density of edges in the image.
         """
 
+        ws = get_workspace(image)
+
         # Apply Canny edge detection
-        edges = cv2.Canny(image, self.low_threshold, self.high_threshold)
+        edges = cv2.Canny(
+            image,
+            self.low_threshold,
+            self.high_threshold,
+            edges=ws.get("edges", image.shape[:2]),
+        )
 
         # Count the number of edge pixels
-        edge_count = np.sum(edges > 0)
+        edge_count = np.count_nonzero(edges)
 
         # Calculate total number of pixels
         total_pixels = image.size
@@ -258,21 +293,78 @@ class ImageColdnessProcessor(ImageProcessor):
         if len(image.shape) != 3 or image.shape[2] != 3:
             raise ValueError("Input image must be a BGR color image.")
 
-        # Split the image into its color channels (Blue, Green, Red)
-        b, g, r = cv2.split(image)
-
-        # Calculate the average intensity of each channel
-        b_avg = b.mean()
-        g_avg = g.mean()
-        r_avg = r.mean()
+        # Calculate the average intensity of each channel (Blue, Green, Red)
+        # in one pass, without splitting the image into separate planes
+        # (as NumPy scalars, so that a black image gives NaN instead of raising)
+        b_avg, g_avg, r_avg = np.float64(cv2.mean(image)[:3])
 
         # Define a "coldness" score based on the ratio of blue to red
         # You can adjust the formula to better suit your definition of "coldness"
-        coldness_score = (b_avg - r_avg) / max(b_avg + r_avg + g_avg, 0)
+        with np.errstate(invalid="ignore"):
+            coldness_score = (b_avg - r_avg) / max(b_avg + r_avg + g_avg, 0)
 
         return np.float32(coldness_score)
 
 
+def tile_laplacian_variances(
+    image: np.ndarray, segment_size: int, workspace: Optional[BufferWorkspace] = None
+) -> np.ndarray:
+    """
+    Computes the variance of the Laplacian of every segment of an image, as if
+    `cv2.Laplacian` ran on each segment separately (with its own reflected border).
+
+    All segments are gathered into one mosaic in which every segment carries a
+    one-pixel reflect-101 border of its own, so a single Laplacian pass gives the
+    exact per-segment result. The Laplacian is computed in int16 and the variances
+    from exact integer sums.
+
+    Args:
+        image: The input image as a NumPy array (OpenCV format).
+        segment_size: The side of the square segments.
+        workspace: The workspace bound to `image` that holds the squares of the
+            Laplacian (None allocates them; a workspace not bound to the shape
+            would keep a buffer for every shape it sees).
+
+    Returns:
+        A (rows, columns) array with the variance of every segment; segments
+        start every `segment_size` pixels and the last, possibly partial one is skipped.
+    """
+    h, w = image.shape[:2]
+    size = segment_size
+    starts_y = np.arange(0, h - size, size)
+    starts_x = np.arange(0, w - size, size)
+    if len(starts_y) == 0 or len(starts_x) == 0:
+        return np.zeros((len(starts_y), len(starts_x)))
+
+    # Offsets -1..size inside a segment, reflected at the segment borders
+    offsets = np.abs(np.arange(-1, size + 1))
+    offsets[-1] = size - 2
+    rows = (starts_y[:, None] + offsets[None, :]).ravel()
+    cols = (starts_x[:, None] + offsets[None, :]).ravel()
+    mosaic = image.take(rows, axis=0).take(cols, axis=1)
+
+    ny, nx, padded = len(starts_y), len(starts_x), size + 2
+    laplacian = cv2.Laplacian(mosaic, cv2.CV_16S)
+    squares = np.multiply(
+        laplacian,
+        laplacian,
+        out=None
+        if workspace is None
+        else workspace.get("segment_squares", laplacian.shape, np.int32),
+        dtype=np.int32,
+    )
+
+    # Sum the inner rows of every segment, then the inner columns and channels
+    sums = []
+    for values in (laplacian, squares):
+        row_sums = values.reshape(ny, padded, -1)[:, 1:-1].sum(axis=1, dtype=np.int64)
+        row_sums = row_sums.reshape(ny, nx, padded, -1)[:, :, 1:-1]
+        sums.append(row_sums.sum(axis=(2, 3)))
+    total, total_squares = sums
+    count = size * size * (image.shape[2] if image.ndim == 3 else 1)
+    return (total_squares - total * total / count) / count
+
+
 class ImageSegmentsSharpnessProcessor(ImageProcessor):
     def __init__(
         self,
@@ -285,28 +377,12 @@ class ImageSegmentsSharpnessProcessor(ImageProcessor):
         self.high_threshold = high_threshold
 
     def process_image(self, image: np.ndarray) -> np.float32:
-        high_blur_c = 0
-        low_blur_c = 0
-        mid_blur_c = 0
-
-        h, w, _ = image.shape
-
-        for x in range(0, h - self.segment_size, self.segment_size):
-            for y in range(0, w - self.segment_size, self.segment_size):
-                blur = cv2.Laplacian(
-                    image[x : x + self.segment_size, y : y + self.segment_size],
-                    cv2.CV_64F,
-                ).var()
-                # print(blur)
-
-                if blur > self.high_threshold:
-                    high_blur_c += 1
-                elif blur < self.low_threshold:
-                    low_blur_c += 1
-                else:
-                    mid_blur_c += 1
-
-        # print(f"#####\nh: {high_blur_c}\nl: {low_blur_c}\nm: {mid_blur_c}")
+        blur = tile_laplacian_variances(image, self.segment_size, get_workspace(image))
+
+        high_blur_c = int(np.count_nonzero(blur > self.high_threshold))
+        low_blur_c = int(np.count_nonzero(blur < self.low_threshold))
+        mid_blur_c = blur.size - high_blur_c - low_blur_c
+
         return np.float32(
             2 * min(high_blur_c, low_blur_c) / (mid_blur_c + high_blur_c + low_blur_c)
         )
@@ -318,14 +394,35 @@ class ImageBrightSpotsProcessor(ImageProcessor):
         self.threshold_value = threshold_value
 
     def process_image(self, image: np.ndarray) -> float:
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        V = hsv_image[:, :, 2]
-        local_avg = cv2.blur(V, (self.kernel_size, self.kernel_size))
-
-        bright_spots_mask = (
-            V.astype(np.float32) - local_avg.astype(np.float32)
-        ) > self.threshold_value
-        count_bright_pixels = np.sum(bright_spots_mask)
+        ws = get_workspace(image)
+        plane_shape = image.shape[:2]
+
+        hsv_image = cv2.cvtColor(
+            image, cv2.COLOR_BGR2HSV, dst=ws.get("hsv", image.shape)
+        )
+        V = cv2.extractChannel(hsv_image, 2, dst=ws.get("plane_v", plane_shape))
+        local_avg = cv2.blur(
+            V,
+            (self.kernel_size, self.kernel_size),
+            dst=ws.get("local_avg", plane_shape),
+        )
+
+        mask = ws.get("mask", plane_shape, np.bool_)
+        if self.threshold_value >= 0:
+            # Negative differences saturate to 0 in uint8 and never pass
+            # a non-negative threshold, so the result is exact
+            difference = cv2.subtract(
+                V, local_avg, dst=ws.get("difference", plane_shape)
+            )
+        else:
+            difference = cv2.subtract(
+                V,
+                local_avg,
+                dst=ws.get("difference_signed", plane_shape, np.int16),
+                dtype=cv2.CV_16S,
+            )
+        bright_spots_mask = np.greater(difference, self.threshold_value, out=mask)
+        count_bright_pixels = np.count_nonzero(bright_spots_mask)
 
         total_pixels = image.shape[0] * image.shape[1]
         bright_spots_ratio = float(count_bright_pixels) / float(total_pixels)
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
 import os
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple
 import cv2
 import numpy as np
 
+if TYPE_CHECKING:
+    from sno_fo_fro.dataset import ImageSource
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
 
 class ImageProcessor[T](ABC):
     """
@@ -30,12 +35,46 @@ class ImageProcessor[T](ABC):
             print(f"Error: Could not read image at {path}")
         return self.process_image(img)
 
+    def process_images(self, images: Iterable[Tuple[str, np.ndarray]]) -> Dict[str, T]:
+        """
+        Processes already decoded images, e.g. those of an ImageSource.
+
+        Args:
+            images: (path, image) pairs.
+
+        Returns:
+            The result of every image by its path.
+        """
+        results = {}
+        for path, image in images:
+            result = self.process_image(image)
+            if result is not None:
+                results[path] = result
+
+        return results
+
+    def process_source(self, source: "ImageSource") -> Dict[str, Dict[str, T]]:
+        """
+        Processes all images of a dataset in one pass over its storage.
+
+        Args:
+            source: The dataset (directory, pack or archive).
+
+        Returns:
+            The results by label, then by image path.
+        """
+        results = {label: {} for label in source.labels()}
+        for label, path, image in source.labeled_images():
+            result = self.process_image(image)
+            if result is not None:
+                results[label][path] = result
+
+        return results
+
     def process_images_in_dir(self, dir_path: str) -> Dict[str, T]:
         results = {}
         for filename in os.listdir(dir_path):
-            if filename.lower().endswith(
-                (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
-            ):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
                 image_path = os.path.join(dir_path, filename)
                 result = self.process_image_by_path(image_path)
                 if result is not None:
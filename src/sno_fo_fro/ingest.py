@@ -0,0 +1,385 @@
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import signal
+import sys
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.classifier import (
+    PATH_TO_MODEL,
+    H2OMLClassifier,
+    ImageClassifier,
+    MockImageClassifier,
+)
+from sno_fo_fro.h2o_backend import get_shared_backend
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS, ImageProcessor
+
+# (st_ctime_ns, path): the order in which files arrived in the watched directories
+FileKey = Tuple[int, str]
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+
+class DirectoryWatcher:
+    """
+    Blocks until something changes in the watched directories.
+
+    Uses inotify through libc when it is available and falls back to plain
+    polling otherwise. The watcher is only a wake-up signal: callers rescan the
+    directories after every wake-up.
+    """
+
+    def __init__(self, dir_paths: List[str], poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        try:
+            self._fd = self._init_inotify(dir_paths)
+        except (OSError, AttributeError) as e:
+            print(f"inotify is not available ({e}), falling back to polling")
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    @staticmethod
+    def _init_inotify(dir_paths: List[str]) -> int:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        for dir_path in dir_paths:
+            if libc.inotify_add_watch(fd, os.fsencode(dir_path), mask) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), f"cannot watch {dir_path}")
+        return fd
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits for a change or until the timeout expires.
+
+        Args:
+            timeout: The maximal waiting time in seconds.
+
+        Returns:
+            True if a change notification was received.
+        """
+        if self._fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return False
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self._fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class HighWaterMark:
+    """
+    Persisted record of the processed files.
+
+    Files are ordered by (change time, path). Everything at or below `mark` is
+    processed; files above it that were processed out of order (because an
+    earlier file was still being written) are kept in `done` until the mark can
+    move past them. The state therefore stays small, and a restart never
+    rescans processed files.
+    """
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self.mark: FileKey = (0, "")
+        self.done: Dict[str, int] = {}
+        if os.path.exists(state_path):
+            with open(state_path, "r") as f:
+                state = json.load(f)
+            self.mark = (state["mark"][0], state["mark"][1])
+            self.done = state["done"]
+
+    def is_processed(self, key: FileKey) -> bool:
+        return key <= self.mark or self.done.get(key[1]) == key[0]
+
+    def commit(self, key: FileKey, oldest_pending: Optional[FileKey]):
+        """
+        Records a processed file and advances the mark as far as possible.
+
+        Args:
+            key: The key of the processed file.
+            oldest_pending: The smallest key of a file that is seen but not processed yet.
+        """
+        self.done[key[1]] = key[0]
+        movable = [
+            (ctime, path)
+            for path, ctime in self.done.items()
+            if oldest_pending is None or (ctime, path) < oldest_pending
+        ]
+        if movable:
+            self.mark = max(max(movable), self.mark)
+            for _, path in movable:
+                del self.done[path]
+        self.save()
+
+    def save(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"mark": list(self.mark), "done": self.done}, f)
+        os.replace(tmp_path, self.state_path)
+
+
+class IngestDaemon:
+    """
+    Watches drop directories and classifies every new image exactly once.
+
+    A file is picked up when its size and modification time have not changed
+    for `settle_seconds`, so partially written files are never decoded. Results
+    are appended as JSON lines to `output_path`.
+    """
+
+    def __init__(
+        self,
+        dir_paths: List[str],
+        classifier: ImageClassifier,
+        state_path: str = "ingest-state.json",
+        output_path: str = "ingest-results.jsonl",
+        analyzer: ImageProcessor = ImageAnalyzer,
+        settle_seconds: float = 2.0,
+        poll_interval: float = 1.0,
+        report_interval: float = 30.0,
+    ):
+        """
+        Initializes the IngestDaemon.
+
+        Args:
+            dir_paths: The directories to watch (not recursive).
+            classifier: The classifier applied to the metrics of every image.
+            state_path: The file with the persisted high-water mark.
+            output_path: The JSON lines file the results are appended to.
+            analyzer: The processor computing the metrics passed to the classifier.
+            settle_seconds: How long a file must stay unchanged before it is processed.
+            poll_interval: The rescan interval when inotify is not available.
+            report_interval: How often throughput and backlog are printed, in seconds.
+        """
+        self.dir_paths = dir_paths
+        self.classifier = classifier
+        self.analyzer = analyzer
+        self.output_path = output_path
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+
+        self.high_water_mark = HighWaterMark(state_path)
+        self.watcher = DirectoryWatcher(dir_paths, poll_interval)
+
+        # path -> (key, size, mtime_ns, monotonic time the file was last seen changing)
+        self._pending: Dict[str, Tuple[FileKey, int, int, float]] = {}
+        # Watched directories that could not be read at the last scan
+        self._unavailable: Set[str] = set()
+        self._stopped = False
+        self.processed = 0
+        self.failed = 0
+        self._window_start = time.monotonic()
+        self._window_processed = 0
+
+    def stop(self):
+        self._stopped = True
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending)
+
+    def scan(self):
+        """
+        Rescans the watched directories and updates the set of pending files.
+
+        A directory that cannot be read (e.g. an unmounted share) is skipped
+        until it is back; the others are still watched.
+        """
+        now = time.monotonic()
+        for dir_path in self.dir_paths:
+            try:
+                self._scan_dir(dir_path, now)
+            except OSError as e:
+                if dir_path not in self._unavailable:
+                    print(f"Cannot read {dir_path} ({e}), retrying")
+                    self._unavailable.add(dir_path)
+                continue
+            if dir_path in self._unavailable:
+                print(f"{dir_path} is readable again")
+                self._unavailable.discard(dir_path)
+
+    def _scan_dir(self, dir_path: str, now: float):
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                key = (stat.st_ctime_ns, entry.path)
+                if self.high_water_mark.is_processed(key):
+                    continue
+
+                previous = self._pending.get(entry.path)
+                if previous is None or previous[1:3] != (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                ):
+                    self._pending[entry.path] = (
+                        key,
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        now,
+                    )
+
+    def ready_files(self) -> List[FileKey]:
+        now = time.monotonic()
+        return sorted(
+            key
+            for key, _, _, changed_at in self._pending.values()
+            if now - changed_at >= self.settle_seconds
+        )
+
+    def process_file(self, key: FileKey) -> dict:
+        path = key[1]
+        started = time.perf_counter()
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError(f"Could not read image at {path}")
+        metrics = self.analyzer.process_image(image)
+        # `classify` may return display text, `predict` always gives the label
+        prediction = self.classifier.predict([metrics])[0]
+        return {
+            "path": path,
+            "class": str(prediction.label),
+            "probabilities": prediction.probabilities,
+            "metrics": {name: float(value) for name, value in metrics.items()},
+            "seconds": time.perf_counter() - started,
+            "processed_at": time.time(),
+        }
+
+    def run_once(self) -> int:
+        """
+        Rescans the directories and processes every settled file.
+
+        Returns:
+            The number of processed files.
+        """
+        self.scan()
+        count = 0
+        with open(self.output_path, "a") as out:
+            for key in self.ready_files():
+                if self._stopped:
+                    break
+                try:
+                    record = self.process_file(key)
+                    self.processed += 1
+                except Exception as e:
+                    record = {"path": key[1], "error": str(e)}
+                    self.failed += 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+
+                del self._pending[key[1]]
+                oldest = min(
+                    (pending[0] for pending in self._pending.values()), default=None
+                )
+                self.high_water_mark.commit(key, oldest)
+                count += 1
+        self._window_processed += count
+        return count
+
+    def report(self):
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        throughput = self._window_processed / elapsed if elapsed > 0 else 0.0
+        print(
+            f"processed: {self.processed}, failed: {self.failed}, "
+            f"backlog: {self.backlog}, throughput: {throughput:.2f} images/s"
+        )
+        self._window_start = now
+        self._window_processed = 0
+
+    def run_forever(self):
+        mode = "inotify" if self.watcher.uses_inotify else "polling"
+        print(f"Watching {', '.join(self.dir_paths)} ({mode})")
+        last_report = time.monotonic()
+        try:
+            while not self._stopped:
+                self.run_once()
+                if time.monotonic() - last_report >= self.report_interval:
+                    self.report()
+                    last_report = time.monotonic()
+                # Wake up early enough to pick up files that are settling
+                timeout = self.settle_seconds if self._pending else self.poll_interval
+                self.watcher.wait(timeout)
+        finally:
+            self.watcher.close()
+            self.report()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Watch directories and classify new images as they arrive."
+    )
+    parser.add_argument("dirs", nargs="+", help="directories to watch")
+    parser.add_argument("--state", default="ingest-state.json")
+    parser.add_argument("--output", default="ingest-results.jsonl")
+    parser.add_argument("--model", default=PATH_TO_MODEL)
+    parser.add_argument("--mock", action="store_true", help="use the mock classifier")
+    parser.add_argument(
+        "--shared-h2o",
+        action="store_true",
+        help="use the H2O backend shared with other processes (see h2o_backend)",
+    )
+    parser.add_argument("--settle", type=float, default=2.0)
+    parser.add_argument("--poll", type=float, default=1.0)
+    parser.add_argument("--report", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    backend = get_shared_backend() if args.shared_h2o else None
+    classifier = (
+        MockImageClassifier()
+        if args.mock
+        else H2OMLClassifier(args.model, backend=backend)
+    )
+    daemon = IngestDaemon(
+        args.dirs,
+        classifier,
+        state_path=args.state,
+        output_path=args.output,
+        settle_seconds=args.settle,
+        poll_interval=args.poll,
+        report_interval=args.report,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.ingest <drop_dir> [<drop_dir> ...]
+if __name__ == "__main__":
+    sys.exit(main())
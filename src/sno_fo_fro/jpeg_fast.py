@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.analyzer import CombinedImageProcessor, ImageAnalyzer
+from sno_fo_fro.image_processor import ImageProcessor
+from sno_fo_fro.scheduler import image_size
+
+CALIBRATION_FORMAT = "sno-fo-fro-jpeg-calibration/1"
+DEFAULT_CALIBRATION_PATH = "jpeg_calibration.json"
+
+# Scale factor -> flag of the scaled JPEG decoder (1/8 keeps only the DC terms)
+REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# Below this shorter side the reduced image is too small to be worth it
+MIN_REDUCED_SIDE = 128
+# Metrics driven by high-frequency energy; they shrink roughly by a power of
+# the scale factor and are calibrated in log space
+LOG_METRICS = (
+    "BLURRINESS",
+    "WHITE_GRADIENT",
+    "EDGE_DENSITY",
+    "SEGMENTS_SHARPNESS",
+)
+
+
+def is_jpeg(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(2) == b"\xff\xd8"
+
+
+class MetricCalibration:
+    """
+    A linear map from a metric computed on a reduced image to its full-resolution value,
+    optionally fitted in log space (`log1p`).
+    """
+
+    def __init__(self, slope: float = 1.0, intercept: float = 0.0, log: bool = False):
+        self.slope = slope
+        self.intercept = intercept
+        self.log = log
+
+    @classmethod
+    def fit(
+        cls, reduced: np.ndarray, full: np.ndarray, log: bool
+    ) -> "MetricCalibration":
+        x = np.log1p(np.maximum(reduced, 0)) if log else np.asarray(reduced, float)
+        y = np.log1p(np.maximum(full, 0)) if log else np.asarray(full, float)
+        if len(x) < 2 or np.std(x) == 0:
+            return cls(1.0, float(np.mean(y - x)), log)
+        slope, intercept = np.polyfit(x, y, 1)
+        return cls(float(slope), float(intercept), log)
+
+    def apply(self, value: float) -> float:
+        if self.log:
+            mapped = self.slope * np.log1p(max(value, 0.0)) + self.intercept
+            return float(np.expm1(mapped))
+        return float(self.slope * value + self.intercept)
+
+    def to_dict(self) -> Dict:
+        return {"slope": self.slope, "intercept": self.intercept, "log": self.log}
+
+
+class JpegCalibration:
+    """
+    The calibrations of all metrics for every scale factor.
+    """
+
+    def __init__(self, factors: Dict[int, Dict[str, MetricCalibration]]):
+        self.factors = factors
+
+    def apply(self, metrics: Dict[str, float], factor: int) -> Dict[str, float]:
+        calibrations = self.factors[factor]
+        return {
+            name: calibrations[name].apply(value) if name in calibrations else value
+            for name, value in metrics.items()
+        }
+
+    def save(self, path: str):
+        data = {
+            "format": CALIBRATION_FORMAT,
+            "factors": {
+                str(factor): {name: c.to_dict() for name, c in metrics.items()}
+                for factor, metrics in self.factors.items()
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "JpegCalibration":
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("format") != CALIBRATION_FORMAT:
+            raise ValueError(f"Not a JPEG calibration file: {path}")
+        return cls(
+            {
+                int(factor): {
+                    name: MetricCalibration(**values)
+                    for name, values in metrics.items()
+                }
+                for factor, metrics in data["factors"].items()
+            }
+        )
+
+
+def decode_reduced(path: str, factor: int) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Decodes a JPEG with the scaled decoder, which skips most of the inverse DCT.
+
+    The factor is lowered for small images; other formats and images too small
+    to reduce are decoded in full.
+
+    Returns:
+        The image (None if unreadable) and the factor actually used.
+    """
+    shape = image_size(path) if is_jpeg(path) else None
+    if shape is not None:
+        while factor > 1 and min(shape) // factor < MIN_REDUCED_SIDE:
+            factor //= 2
+        if factor in REDUCED_FLAGS:
+            return cv2.imread(path, REDUCED_FLAGS[factor]), factor
+    return cv2.imread(path), 1
+
+
+class JpegFastAnalyzer(ImageProcessor[Dict[str, float]]):
+    """
+    Estimates the ImageAnalyzer metrics of JPEG files from a scaled decode.
+
+    The metrics are computed on the 1/2, 1/4 or 1/8 size image produced by the
+    JPEG decoder itself and mapped back to full-resolution values with a
+    JpegCalibration. Decoded images given to `process_image` are analyzed exactly.
+    """
+
+    def __init__(
+        self,
+        calibration: Optional[JpegCalibration] = None,
+        factor: int = 4,
+        reference: CombinedImageProcessor = ImageAnalyzer,
+    ):
+        """
+        Initializes the JpegFastAnalyzer.
+
+        Args:
+            calibration: The calibration of the reduced metrics
+                (None returns uncalibrated estimates).
+            factor: The preferred scale factor (2, 4 or 8).
+            reference: The processor whose metrics are estimated.
+        """
+        if factor not in REDUCED_FLAGS:
+            raise ValueError(f"Unsupported scale factor: {factor}")
+        if calibration is not None:
+            missing = [
+                f for f in REDUCED_FLAGS if f <= factor and f not in calibration.factors
+            ]
+            if missing:
+                raise ValueError(f"Calibration has no scale factors {missing}")
+        self.calibration = calibration
+        self.factor = factor
+        self.reference = reference
+
+    def decode(self, path: str) -> Tuple[Optional[np.ndarray], int]:
+        return decode_reduced(path, self.factor)
+
+    def process_reduced(self, image: np.ndarray, factor: int) -> Dict[str, float]:
+        """
+        Computes the metrics of an image decoded by `decode` with the given factor.
+        """
+        metrics = {
+            name: float(value)
+            for name, value in self.reference.process_image(image).items()
+        }
+        if factor == 1 or self.calibration is None:
+            return metrics
+        return self.calibration.apply(metrics, factor)
+
+    def process_image(self, image: np.ndarray) -> Dict[str, float]:
+        return self.process_reduced(image, 1)
+
+    def process_image_by_path(self, path: str) -> Dict[str, float]:
+        image, factor = self.decode(path)
+        if image is None:
+            print(f"Error: Could not read image at {path}")
+        return self.process_reduced(image, factor)
+
+
+def calibrate(
+    paths: List[str],
+    factors: Tuple[int, ...] = tuple(REDUCED_FLAGS),
+    reference: CombinedImageProcessor = ImageAnalyzer,
+) -> Tuple[JpegCalibration, Dict[int, Dict[str, Dict[str, float]]]]:
+    """
+    Fits the calibration of every metric against the full-resolution values.
+
+    Args:
+        paths: JPEG images representative of the inputs.
+        factors: The scale factors to calibrate.
+        reference: The processor whose metrics are estimated.
+
+    Returns:
+        The calibration and a report with, per factor and metric, the median
+        relative error before and after calibration and the timings.
+    """
+    full_rows = []
+    reduced_rows = {factor: [] for factor in factors}
+    timings = {1: 0.0, **{factor: 0.0 for factor in factors}}
+    for path in paths:
+        started = time.perf_counter()
+        full_rows.append(reference.process_image_by_path(path))
+        timings[1] += time.perf_counter() - started
+        for factor in factors:
+            started = time.perf_counter()
+            image = cv2.imread(path, REDUCED_FLAGS[factor])
+            reduced_rows[factor].append(reference.process_image(image))
+            timings[factor] += time.perf_counter() - started
+
+    names = list(full_rows[0])
+    full = {name: np.array([row[name] for row in full_rows], float) for name in names}
+    calibrations = {}
+    report = {}
+    for factor in factors:
+        calibrations[factor] = {}
+        report[factor] = {"speedup": {"value": timings[1] / max(timings[factor], 1e-9)}}
+        for name in names:
+            reduced = np.array([row[name] for row in reduced_rows[factor]], float)
+            calibration = MetricCalibration.fit(
+                reduced, full[name], name in LOG_METRICS
+            )
+            calibrated = np.array([calibration.apply(v) for v in reduced])
+            scale = np.maximum(np.abs(full[name]), 1e-9)
+            calibrations[factor][name] = calibration
+            report[factor][name] = {
+                "raw_error": float(np.median(np.abs(reduced - full[name]) / scale)),
+                "calibrated_error": float(
+                    np.median(np.abs(calibrated - full[name]) / scale)
+                ),
+            }
+    return JpegCalibration(calibrations), report
+
+
+def _walk(inputs: List[str]) -> List[str]:
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                paths.extend(os.path.join(root, name) for name in sorted(files))
+        else:
+            paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Calibrate the JPEG fast path against the full-resolution metrics."
+    )
+    parser.add_argument("inputs", nargs="+", help="JPEG files or directories")
+    parser.add_argument("--output", default=DEFAULT_CALIBRATION_PATH)
+    parser.add_argument("--factors", type=int, nargs="+", default=list(REDUCED_FLAGS))
+    args = parser.parse_args(argv)
+
+    paths = [path for path in _walk(args.inputs) if is_jpeg(path)]
+    if len(paths) < 2:
+        parser.error("at least two JPEG images are required")
+    calibration, report = calibrate(paths, tuple(args.factors))
+    calibration.save(args.output)
+
+    for factor, metrics in report.items():
+        speedup = metrics.pop("speedup")["value"]
+        print(f"1/{factor}: {speedup:.1f}x faster")
+        for name, errors in metrics.items():
+            print(
+                f"  {name:>18}: median relative error "
+                f"{errors['raw_error']:.3f} -> {errors['calibrated_error']:.3f}"
+            )
+    print(f"Calibration on {len(paths)} images saved to {args.output}")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.jpeg_fast weather-data --output jpeg_calibration.json
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 4096
+
+
+class MetricTable(Mapping[str, Dict[str, float]]):
+    """
+    The metrics of many images in columnar, array-backed storage.
+
+    Every metric is a float32 column and the paths are one UTF-8 buffer with
+    offsets (the layout of an Arrow string column), so an image costs a few
+    bytes per metric plus the length of its path instead of two dicts of
+    Python objects. Rows are appended into fixed-size chunks; the chunks are
+    joined into one matrix on the first read, which the pandas, Arrow and
+    NumPy views then share without copying.
+
+    For compatibility with the dict results of the other processors, the table
+    is also a read-only mapping from path to the metrics of the image.
+    """
+
+    def __init__(self, columns: Sequence[str], chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        """
+        Initializes an empty MetricTable.
+
+        Args:
+            columns: The metric names.
+            chunk_rows: The number of rows allocated at once.
+        """
+        self.columns = list(columns)
+        self.chunk_rows = chunk_rows
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        # Fortran order keeps every column of a chunk contiguous
+        self._chunks: List[np.ndarray] = []
+        self._filled = 0
+        self._rows = 0
+        self._path_data = bytearray()
+        self._path_offsets = np.zeros(chunk_rows + 1, dtype=np.int64)
+        self._index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_rows(
+        cls,
+        columns: Sequence[str],
+        rows: Iterable[Tuple[str, Mapping[str, float]]],
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    ) -> "MetricTable":
+        """
+        Builds a table from (path, metrics) pairs.
+        """
+        table = cls(columns, chunk_rows)
+        for path, metrics in rows:
+            table.append(path, metrics)
+        return table
+
+    def _next_row(self) -> np.ndarray:
+        if not self._chunks or self._filled == len(self._chunks[-1]):
+            self._chunks.append(
+                np.empty((self.chunk_rows, len(self.columns)), np.float32, order="F")
+            )
+            self._filled = 0
+        return self._chunks[-1][self._filled]
+
+    def _append_path(self, path: str):
+        if self._rows + 1 >= len(self._path_offsets):
+            self._path_offsets = np.resize(
+                self._path_offsets, 2 * len(self._path_offsets)
+            )
+        self._path_data += path.encode("utf-8")
+        self._path_offsets[self._rows + 1] = len(self._path_data)
+        if self._index is not None:
+            self._index[path] = self._rows
+
+    def append(self, path: str, metrics: Mapping[str, float]):
+        """
+        Appends the metrics of an image; missing metrics are stored as NaN.
+        """
+        row = self._next_row()
+        row[:] = np.nan
+        for name, value in metrics.items():
+            row[self._positions[name]] = value
+        self._append_path(path)
+        self._filled += 1
+        self._rows += 1
+
+    def append_values(self, path: str, values: Sequence[float]):
+        """
+        Appends the metrics of an image given in column order.
+        """
+        self._next_row()[:] = values
+        self._append_path(path)
+        self._filled += 1
+        self._rows += 1
+
+    def extend(self, other: "MetricTable"):
+        """
+        Appends all rows of a table with the same columns.
+        """
+        if other.columns != self.columns:
+            raise ValueError("Tables have different columns")
+        for path, values in zip(other.paths, other.to_numpy()):
+            self.append_values(path, values)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __getitem__(self, path: str) -> Dict[str, float]:
+        if self._index is None:
+            self._index = {p: i for i, p in enumerate(self.paths)}
+        return self.row(self._index[path])
+
+    def __repr__(self) -> str:
+        return f"MetricTable({len(self)} rows, columns={self.columns})"
+
+    def row(self, i: int) -> Dict[str, float]:
+        """
+        Returns the metrics of the i-th image as a dict.
+        """
+        values = self.to_numpy()[i]
+        return {name: float(value) for name, value in zip(self.columns, values)}
+
+    def path(self, i: int) -> str:
+        start, end = self._path_offsets[i], self._path_offsets[i + 1]
+        return self._path_data[start:end].decode("utf-8")
+
+    @property
+    def paths(self) -> List[str]:
+        return [self.path(i) for i in range(self._rows)]
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        Returns the (images, metrics) float32 matrix, e.g. as classifier input.
+
+        Every column of the matrix is contiguous. The matrix is a view of the
+        table's storage: later appends go into new chunks and leave it intact.
+        """
+        if not self._chunks:
+            return np.empty((0, len(self.columns)), np.float32, order="F")
+        if len(self._chunks) > 1 or self._filled < len(self._chunks[0]):
+            filled = self._chunks[:-1] + [self._chunks[-1][: self._filled]]
+            self._chunks = [np.asfortranarray(np.concatenate(filled))]
+            self._filled = self._rows
+        return self._chunks[0]
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns the values of one metric (a view, not a copy).
+        """
+        return self.to_numpy()[:, self._positions[name]]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the stored rows.
+        """
+        return (
+            self._rows * len(self.columns) * np.dtype(np.float32).itemsize
+            + len(self._path_data)
+            + (self._rows + 1) * self._path_offsets.itemsize
+        )
+
+    def to_pandas(self, with_paths: bool = False) -> pd.DataFrame:
+        """
+        Returns the metrics as a DataFrame sharing the table's matrix.
+
+        Args:
+            with_paths: Add a "path" column (which is copied into Python strings).
+        """
+        df = pd.DataFrame(self.to_numpy(), columns=self.columns, copy=False)
+        if with_paths:
+            df.insert(0, "path", self.paths)
+        return df
+
+    def to_arrow(self):
+        """
+        Returns a pyarrow Table with a "path" column followed by the metrics.
+
+        The metric columns are passed to Arrow without copying, the path
+        buffer is copied once (the table may still grow). Requires the optional
+        `pyarrow` package.
+        """
+        import pyarrow as pa
+
+        matrix = self.to_numpy()
+        offsets = self._path_offsets[: self._rows + 1]
+        paths = pa.LargeStringArray.from_buffers(
+            self._rows,
+            pa.py_buffer(offsets),
+            pa.py_buffer(bytes(self._path_data)),
+        )
+        arrays = [paths] + [pa.array(matrix[:, i]) for i in range(len(self.columns))]
+        return pa.Table.from_arrays(arrays, names=["path", *self.columns])
@@ -0,0 +1,355 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from enum import StrEnum
+from typing import Any, Callable, Dict, List, Optional
+
+import h2o
+import numpy as np
+import pandas as pd
+
+PRETRAINED_DIR = "pretrained"
+
+
+class EnsembleMode(StrEnum):
+    """
+    Enum for specifying how the probabilities of several models are combined.
+
+    MEAN: Averages the class probabilities of all models.
+    STACKED: Feeds the probabilities into a meta-model fitted on held-out data.
+    """
+
+    MEAN = "mean"
+    STACKED = "stacked"
+
+
+class StackingCombiner:
+    """
+    Multinomial logistic regression over the concatenated class probabilities
+    of several models, fitted with plain gradient descent.
+    """
+
+    def __init__(self, l2: float = 1e-3, iterations: int = 500, step: float = 0.5):
+        self.l2 = l2
+        self.iterations = iterations
+        self.step = step
+        self.classes: List[str] = []
+        self.weights: Optional[np.ndarray] = None
+
+    def fit(self, features: np.ndarray, labels: List[str]) -> "StackingCombiner":
+        """
+        Fits the meta-model.
+
+        Args:
+            features: A (rows, models * classes) matrix of model probabilities.
+            labels: The true class label of every row.
+
+        Returns:
+            The fitted combiner.
+        """
+        self.classes = sorted(set(labels))
+        targets = np.zeros((len(labels), len(self.classes)))
+        targets[np.arange(len(labels)), [self.classes.index(y) for y in labels]] = 1
+
+        x = self._with_bias(features)
+        self.weights = np.zeros((x.shape[1], len(self.classes)))
+        for _ in range(self.iterations):
+            gradient = x.T @ (self._softmax(x @ self.weights) - targets) / len(x)
+            self.weights -= self.step * (gradient + self.l2 * self.weights)
+        return self
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        if self.weights is None:
+            raise RuntimeError("StackingCombiner is not fitted.")
+        return self._softmax(self._with_bias(features) @ self.weights)
+
+    @staticmethod
+    def _with_bias(features: np.ndarray) -> np.ndarray:
+        return np.hstack([features, np.ones((len(features), 1))])
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class ModelRegistry:
+    """
+    Discovers the pretrained models and keeps the loaded ones in a bounded LRU.
+
+    Every model is loaded at most once while it stays in the cache; evicted
+    models are also removed from the H2O backend to free its memory. The cache
+    is shared by threads (e.g. the workers of the admission service), so it is
+    guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        root: str = PRETRAINED_DIR,
+        capacity: int = 3,
+        loader: Callable[[str], Any] = h2o.load_model,
+        unloader: Optional[Callable[[Any], None]] = None,
+    ):
+        """
+        Initializes the ModelRegistry.
+
+        Args:
+            root: The directory with the saved models.
+            capacity: The maximal number of models kept loaded at the same time.
+            loader: The function loading a model from its path.
+            unloader: The function releasing an evicted model
+                (default removes it from the H2O backend).
+        """
+        self.root = root
+        self.capacity = capacity
+        self.loader = loader
+        self.unloader = unloader if unloader is not None else self._remove_from_h2o
+        self._models: OrderedDict[str, Any] = OrderedDict()
+        self.load_seconds: Dict[str, float] = {}
+        # Reentrant: a loader attaching to a restarted backend clears the cache
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _remove_from_h2o(model: Any):
+        try:
+            h2o.remove(model)
+        except Exception as e:
+            print(f"Could not remove model from H2O: {e}")
+
+    def discover(self) -> List[str]:
+        """
+        Returns the names of the models saved in the registry directory.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root) if not name.startswith(".")
+        )
+
+    def resolve(self, name: str) -> str:
+        """
+        Returns the path of a model given by its name or by its path.
+        """
+        if os.path.exists(name):
+            return os.path.normpath(name)
+        return os.path.normpath(os.path.join(self.root, name))
+
+    def get(self, name: str) -> Any:
+        """
+        Returns a loaded model, loading it on first use.
+
+        Args:
+            name: The model name in the registry directory or a path to a model.
+
+        Returns:
+            The loaded model.
+        """
+        path = self.resolve(name)
+        # Held while loading, so that concurrent callers load a model only once
+        with self._lock:
+            model = self._models.get(path)
+            if model is not None:
+                self._models.move_to_end(path)
+                return model
+
+            started = time.perf_counter()
+            model = self.loader(path)
+            self.load_seconds[path] = time.perf_counter() - started
+            self._models[path] = model
+            while len(self._models) > self.capacity:
+                _, evicted = self._models.popitem(last=False)
+                self.unloader(evicted)
+            return model
+
+    @property
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._models)
+
+    def clear(self):
+        """
+        Forgets the loaded models without unloading them (e.g. after the
+        backend holding them was restarted).
+        """
+        with self._lock:
+            self._models.clear()
+
+    def predict_proba(
+        self, rows: pd.DataFrame, names: List[str]
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Scores the rows with several models, uploading the rows only once.
+
+        Args:
+            rows: The metrics table (one row per image).
+            names: The models to score with.
+
+        Returns:
+            A mapping from model name to a frame of class probabilities.
+        """
+        frame = h2o.H2OFrame(rows)
+        result = {}
+        for name in names:
+            predictions = self.get(name).predict(frame).as_data_frame()
+            result[name] = predictions.drop(columns=["predict"])
+        return result
+
+    def ensemble_proba(
+        self,
+        rows: pd.DataFrame,
+        names: List[str],
+        mode: EnsembleMode = EnsembleMode.MEAN,
+        combiner: Optional[StackingCombiner] = None,
+    ) -> pd.DataFrame:
+        """
+        Computes ensemble class probabilities of several models.
+
+        Args:
+            rows: The metrics table (one row per image).
+            names: The models of the ensemble.
+            mode: How the probabilities of the models are combined.
+            combiner: The fitted meta-model, required for EnsembleMode.STACKED.
+
+        Returns:
+            A frame with one column per class and a "predict" column.
+        """
+        per_model = self.predict_proba(rows, names)
+        classes = sorted(per_model[names[0]].columns)
+
+        if mode == EnsembleMode.STACKED:
+            if combiner is None:
+                raise ValueError("Stacked ensemble requires a fitted combiner.")
+            probabilities = combiner.predict_proba(
+                self._stack(per_model, names, classes)
+            )
+            classes = combiner.classes
+        else:
+            probabilities = np.mean(
+                [per_model[name][classes].to_numpy() for name in names], axis=0
+            )
+
+        result = pd.DataFrame(probabilities, columns=classes)
+        result.insert(0, "predict", [classes[i] for i in probabilities.argmax(axis=1)])
+        return result
+
+    def fit_stacking(
+        self,
+        table: pd.DataFrame,
+        names: List[str],
+        label_column: str = "class_label",
+    ) -> StackingCombiner:
+        """
+        Fits the stacking meta-model on a held-out metrics table.
+        """
+        rows = table.drop(columns=[label_column])
+        per_model = self.predict_proba(rows, names)
+        classes = sorted(per_model[names[0]].columns)
+        return StackingCombiner().fit(
+            self._stack(per_model, names, classes), list(table[label_column])
+        )
+
+    @staticmethod
+    def _stack(
+        per_model: Dict[str, pd.DataFrame], names: List[str], classes: List[str]
+    ) -> np.ndarray:
+        return np.hstack([per_model[name][classes].to_numpy() for name in names])
+
+    def compare(
+        self,
+        table: pd.DataFrame,
+        names: Optional[List[str]] = None,
+        label_column: str = "class_label",
+    ) -> pd.DataFrame:
+        """
+        Compares the throughput and accuracy of the models on a held-out table.
+
+        Args:
+            table: The metrics table with the true labels (e.g. `metrics_table.csv`).
+            names: The models to compare (default all discovered models).
+            label_column: The column with the true labels.
+
+        Returns:
+            A frame with load time, scoring throughput, accuracy and log loss per model,
+            plus a row for the mean ensemble.
+        """
+        names = names if names is not None else self.discover()
+        rows = table.drop(columns=[label_column])
+        labels = table[label_column].to_numpy()
+        frame = h2o.H2OFrame(rows)
+
+        report = []
+        per_model = {}
+        for name in names:
+            model = self.get(name)
+            started = time.perf_counter()
+            predictions = model.predict(frame).as_data_frame()
+            elapsed = time.perf_counter() - started
+            per_model[name] = predictions.drop(columns=["predict"])
+            report.append(
+                {
+                    "model": name,
+                    "load_seconds": self.load_seconds.get(self.resolve(name), 0.0),
+                    "rows_per_second": len(rows) / elapsed if elapsed > 0 else 0.0,
+                    **self._quality(per_model[name], labels),
+                }
+            )
+
+        if len(names) > 1:
+            classes = sorted(per_model[names[0]].columns)
+            mean = pd.DataFrame(
+                np.mean(
+                    [per_model[name][classes].to_numpy() for name in names], axis=0
+                ),
+                columns=classes,
+            )
+            report.append({"model": "ensemble:mean", **self._quality(mean, labels)})
+
+        return pd.DataFrame(report).set_index("model")
+
+    @staticmethod
+    def _quality(probabilities: pd.DataFrame, labels: np.ndarray) -> Dict[str, float]:
+        classes = list(probabilities.columns)
+        values = probabilities.to_numpy()
+        predicted = np.array(classes)[values.argmax(axis=1)]
+        true_index = np.array([classes.index(label) for label in labels])
+        true_probability = values[np.arange(len(labels)), true_index]
+        return {
+            "accuracy": float(np.mean(predicted == labels)),
+            "log_loss": float(-np.mean(np.log(np.clip(true_probability, 1e-15, 1)))),
+        }
+
+
+_default_registry: Optional[ModelRegistry] = None
+
+
+def get_default_registry() -> ModelRegistry:
+    """
+    Returns the process-wide registry of the models in `pretrained/`.
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = ModelRegistry()
+    return _default_registry
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Compare the pretrained models on a held-out metrics table."
+    )
+    parser.add_argument("table", help="CSV produced by generate_csv")
+    parser.add_argument("--models", nargs="*", help="model names (default all)")
+    parser.add_argument("--root", default=PRETRAINED_DIR)
+    args = parser.parse_args(argv)
+
+    h2o.init()
+    registry = ModelRegistry(args.root)
+    print(registry.compare(pd.read_csv(args.table), args.models).to_string())
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.models metrics_table.csv
+if __name__ == "__main__":
+    sys.exit(main())
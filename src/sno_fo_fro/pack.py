@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.dataset import (
+    ARCHIVE_EXTENSIONS,
+    DEFAULT_LABELS,
+    ArchiveSource,
+    DirectorySource,
+    ImageSource,
+    LabeledImage,
+)
+
+PACK_FORMAT = "sno-fo-fro-pack/1"
+# Every image starts on a cache line
+ALIGNMENT = 64
+
+
+def index_path(pack_path: str) -> str:
+    return f"{pack_path}.json"
+
+
+def build_pack(
+    source: ImageSource,
+    pack_path: str,
+    size: Optional[Tuple[int, int]] = None,
+) -> int:
+    """
+    Decodes every image of a dataset once into a single raw uint8 file.
+
+    The pixels are written to `pack_path` and the index (offset, shape, path
+    and label of every image) to `<pack_path>.json`. Both files are replaced
+    atomically.
+
+    Args:
+        source: The dataset to pack.
+        pack_path: The path of the pack.
+        size: The canonical (height, width) the images are resized to
+            (None keeps the original sizes).
+
+    Returns:
+        The number of packed images.
+    """
+    entries = []
+    offset = 0
+    tmp_path = f"{pack_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for label, path, image in source.labeled_images():
+            if size is not None and image.shape[:2] != tuple(size):
+                image = cv2.resize(
+                    image, (size[1], size[0]), interpolation=cv2.INTER_AREA
+                )
+            image = np.ascontiguousarray(image)
+            f.write(image.tobytes())
+            entries.append(
+                {
+                    "path": path,
+                    "label": label,
+                    "offset": offset,
+                    "shape": list(image.shape),
+                }
+            )
+            offset += image.nbytes
+            padding = -offset % ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+
+    index = {
+        "format": PACK_FORMAT,
+        "size": list(size) if size is not None else None,
+        "labels": source.labels(),
+        "entries": entries,
+    }
+    with open(f"{tmp_path}.json", "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, pack_path)
+    os.replace(f"{tmp_path}.json", index_path(pack_path))
+    return len(entries)
+
+
+class DatasetPack(ImageSource):
+    """
+    A dataset read from a pack written by `build_pack`.
+
+    The pack is memory-mapped: the images are read-only views into the page
+    cache, so iterating the dataset costs no decoding and no copies.
+    """
+
+    def __init__(self, pack_path: str):
+        with open(index_path(pack_path), "r") as f:
+            index = json.load(f)
+        if index.get("format") != PACK_FORMAT:
+            raise ValueError(f"Not a dataset pack: {pack_path}")
+
+        self.pack_path = pack_path
+        self.size = index["size"]
+        self.entries: List[Dict] = index["entries"]
+        self._labels: List[str] = index["labels"]
+        if os.path.getsize(pack_path) > 0:
+            self._data = np.memmap(pack_path, dtype=np.uint8, mode="r")
+        else:
+            self._data = np.zeros(0, dtype=np.uint8)
+
+    @staticmethod
+    def is_pack(path: str) -> bool:
+        return os.path.isfile(path) and os.path.isfile(index_path(path))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def labels(self) -> List[str]:
+        return self._labels
+
+    def image(self, i: int) -> np.ndarray:
+        entry = self.entries[i]
+        shape = tuple(entry["shape"])
+        start = entry["offset"]
+        return self._data[start : start + int(np.prod(shape))].reshape(shape)
+
+    def images(self, label: str) -> Iterator[LabeledImage]:
+        for i, entry in enumerate(self.entries):
+            if entry["label"] == label:
+                yield entry["path"], self.image(i)
+
+    def count(self, label: str) -> int:
+        return sum(1 for entry in self.entries if entry["label"] == label)
+
+    def shuffled_images(
+        self, label: str, rng: np.random.Generator
+    ) -> Iterator[LabeledImage]:
+        indices = [i for i, entry in enumerate(self.entries) if entry["label"] == label]
+        for i in rng.permutation(indices):
+            yield self.entries[i]["path"], self.image(int(i))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Decode a dataset once into a memory-mapped pack."
+    )
+    parser.add_argument(
+        "input_dir",
+        help="dataset with one subdirectory per label, or a tar/zip archive",
+    )
+    parser.add_argument("pack", help="output pack file")
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs=2,
+        metavar=("HEIGHT", "WIDTH"),
+        help="resize all images to a canonical size",
+    )
+    parser.add_argument("--labels", nargs="+", default=list(DEFAULT_LABELS))
+    args = parser.parse_args(argv)
+
+    if args.input_dir.lower().endswith(ARCHIVE_EXTENSIONS):
+        source = ArchiveSource(args.input_dir, args.labels)
+    else:
+        source = DirectorySource(args.input_dir, args.labels)
+    count = build_pack(source, args.pack, args.size)
+    size_mb = os.path.getsize(args.pack) / 2**20
+    print(f"Packed {count} images ({size_mb:.0f} MB) into {args.pack}")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.pack weather-data weather.pack [--size 480 640]
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+from abc import ABC, abstractmethod
+from statistics import NormalDist
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.hypotheses import (
+    ImageBrightSpotsProcessor,
+    ImageColdnessProcessor,
+    ImageLuminanceProcessor,
+    ImageSaturationProcessor,
+    ImageWhitenessProcessor,
+)
+from sno_fo_fro.image_processor import ImageProcessor
+
+
+class SampleEstimate(NamedTuple):
+    """
+    Estimate of a metric together with its confidence interval.
+
+    Attributes:
+        value: The point estimate.
+        low: Lower bound of the confidence interval.
+        high: Upper bound of the confidence interval.
+        samples: Number of sampled pixels the estimate is based on.
+        total: Number of pixels in the image.
+    """
+
+    value: float
+    low: float
+    high: float
+    samples: int
+    total: int
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+    @property
+    def exact(self) -> bool:
+        return self.samples >= self.total
+
+
+class PixelMetric(ABC):
+    """
+    Per-pixel formulation of a mean-type metric.
+
+    The metric value over the image is `mean(numerator) / mean(denominator)`,
+    where both terms are evaluated independently for every pixel. Metrics without
+    a denominator are plain means; metrics with `proportion = True` only produce
+    zeros and ones. `target_error` is the default half-width of the confidence
+    interval, in the units of the metric.
+    """
+
+    proportion: bool = False
+    target_error: float = 1.0
+
+    @abstractmethod
+    def evaluate(
+        self, image: np.ndarray, ys: np.ndarray, xs: np.ndarray
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Evaluates the metric terms at the given pixel coordinates.
+
+        Args:
+            image: The input image as a NumPy array (OpenCV BGR format).
+            ys: Row indices of the sampled pixels.
+            xs: Column indices of the sampled pixels.
+
+        Returns:
+            Float arrays with the numerator and the denominator (or None) per pixel.
+        """
+
+
+def _hsv_pixels(image: np.ndarray, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    pixels = np.ascontiguousarray(image[ys, xs]).reshape(-1, 1, 3)
+    return cv2.cvtColor(pixels, cv2.COLOR_BGR2HSV).reshape(-1, 3)
+
+
+class SaturationPixelMetric(PixelMetric):
+    def evaluate(self, image, ys, xs):
+        return _hsv_pixels(image, ys, xs)[:, 1].astype(np.float64), None
+
+
+class BrightnessPixelMetric(PixelMetric):
+    def evaluate(self, image, ys, xs):
+        return _hsv_pixels(image, ys, xs)[:, 2].astype(np.float64), None
+
+
+class LuminancePixelMetric(PixelMetric):
+    def evaluate(self, image, ys, xs):
+        pixels = image[ys, xs].astype(np.float64)
+        return pixels @ np.array([0.0722, 0.7152, 0.2126]), None
+
+
+class ColdnessPixelMetric(PixelMetric):
+    target_error = 0.002
+
+    def evaluate(self, image, ys, xs):
+        pixels = image[ys, xs].astype(np.float64)
+        return pixels[:, 0] - pixels[:, 2], pixels.sum(axis=1)
+
+
+class WhitenessPixelMetric(PixelMetric):
+    proportion = True
+    target_error = 0.005
+
+    def __init__(self, value_threshold: float, saturation_threshold: float):
+        self.value_threshold = value_threshold
+        self.saturation_threshold = saturation_threshold
+
+    def evaluate(self, image, ys, xs):
+        hsv = _hsv_pixels(image, ys, xs)
+        white = (hsv[:, 2] >= self.value_threshold) & (
+            hsv[:, 1] <= self.saturation_threshold
+        )
+        return white.astype(np.float64), None
+
+
+class BrightSpotsPixelMetric(PixelMetric):
+    """
+    Evaluates the bright spot test of a pixel from its own neighbourhood only,
+    reproducing the box filter of `cv2.blur` (including the reflected border).
+    """
+
+    proportion = True
+    target_error = 0.005
+
+    def __init__(self, kernel_size: int, threshold_value: float):
+        self.kernel_size = kernel_size
+        self.threshold_value = threshold_value
+
+    def evaluate(self, image, ys, xs):
+        h, w = image.shape[:2]
+        offsets = np.arange(self.kernel_size) - self.kernel_size // 2
+        rows = _reflect_101(ys[:, None] + offsets, h)
+        cols = _reflect_101(xs[:, None] + offsets, w)
+
+        # The HSV value channel is the maximum of the B, G and R channels
+        window_v = image[rows[:, :, None], cols[:, None, :]].max(axis=-1)
+        local_avg = np.rint(window_v.mean(axis=(1, 2)))
+
+        v = image[ys, xs].max(axis=-1).astype(np.float64)
+        return ((v - local_avg) > self.threshold_value).astype(np.float64), None
+
+
+def _reflect_101(index: np.ndarray, size: int) -> np.ndarray:
+    if size == 1:
+        return np.zeros_like(index)
+    period = 2 * (size - 1)
+    index = np.abs(index) % period
+    return np.where(index >= size, period - index, index)
+
+
+def pixel_metric_for(processor: ImageProcessor) -> PixelMetric:
+    """
+    Returns the per-pixel formulation of a supported hypothesis processor.
+
+    Args:
+        processor: One of the mean-type processors from `sno_fo_fro.hypotheses`.
+
+    Returns:
+        The matching PixelMetric configured with the processor parameters.
+
+    Raises:
+        TypeError: If the processor does not compute a mean or a proportion.
+    """
+    if isinstance(processor, ImageSaturationProcessor):
+        return SaturationPixelMetric()
+    if isinstance(processor, ImageLuminanceProcessor):
+        if processor.use_brightness:
+            return BrightnessPixelMetric()
+        return LuminancePixelMetric()
+    if isinstance(processor, ImageColdnessProcessor):
+        return ColdnessPixelMetric()
+    if isinstance(processor, ImageWhitenessProcessor):
+        return WhitenessPixelMetric(
+            processor.value_threshold, processor.saturation_threshold
+        )
+    if isinstance(processor, ImageBrightSpotsProcessor):
+        return BrightSpotsPixelMetric(processor.kernel_size, processor.threshold_value)
+    raise TypeError(
+        f"Processor {processor.__class__.__name__} has no sampling estimator."
+    )
+
+
+class SamplingImageProcessor(ImageProcessor[SampleEstimate]):
+    """
+    Estimates a mean-type metric from a stratified sample of pixels instead of
+    scanning the whole image.
+
+    The image is split into a grid of strata and every round draws one random
+    pixel from each stratum. Rounds are repeated until the confidence interval is
+    narrower than the target error or `max_samples` is reached. Images that are
+    not larger than the sample budget are evaluated exactly.
+    """
+
+    def __init__(
+        self,
+        metric: PixelMetric,
+        target_error: Optional[float] = None,
+        confidence: float = 0.95,
+        batch_size: int = 1024,
+        max_samples: int = 16384,
+        seed: int = 0,
+    ):
+        """
+        Initializes the SamplingImageProcessor.
+
+        Args:
+            metric: The per-pixel formulation of the estimated metric.
+            target_error: The maximal half-width of the confidence interval,
+                in the units of the metric (default `metric.target_error`).
+            confidence: The confidence level of the interval.
+            batch_size: The number of strata, i.e. pixels drawn per round.
+            max_samples: The maximal number of sampled pixels per image.
+            seed: The seed of the pixel sampler; equal seeds give equal estimates.
+        """
+        self.metric = metric
+        self.target_error = (
+            target_error if target_error is not None else metric.target_error
+        )
+        self.confidence = confidence
+        self.batch_size = batch_size
+        self.max_samples = max_samples
+        self.seed = seed
+        self._z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    @classmethod
+    def for_processor(cls, processor: ImageProcessor, **kwargs):
+        """
+        Creates a sampling estimator of the metric computed by `processor`.
+        """
+        return cls(pixel_metric_for(processor), **kwargs)
+
+    def process_image(self, image: np.ndarray) -> SampleEstimate:
+        """
+        Estimates the metric of the input image.
+
+        Args:
+            image: The input image as a NumPy array (OpenCV BGR format).
+
+        Returns:
+            A SampleEstimate with the value and its confidence interval.
+        """
+        h, w = image.shape[:2]
+        total = h * w
+        if total <= self.max_samples:
+            ys, xs = np.divmod(np.arange(total), w)
+            num, den = self.metric.evaluate(image, ys, xs)
+            value = self._ratio(num, den)
+            return SampleEstimate(value, value, value, total, total)
+
+        rng = np.random.default_rng(self.seed)
+        row_edges, col_edges = self._strata(h, w)
+        nums, dens = [], []
+        samples = 0
+        while True:
+            ys = row_edges[:-1, None] + (
+                rng.random((len(row_edges) - 1, len(col_edges) - 1))
+                * np.diff(row_edges)[:, None]
+            ).astype(np.intp)
+            xs = col_edges[None, :-1] + (
+                rng.random(ys.shape) * np.diff(col_edges)[None, :]
+            ).astype(np.intp)
+            num, den = self.metric.evaluate(image, ys.ravel(), xs.ravel())
+            nums.append(num)
+            if den is not None:
+                dens.append(den)
+            samples += num.size
+
+            estimate = self._interval(
+                np.concatenate(nums), np.concatenate(dens) if dens else None, total
+            )
+            if estimate.half_width <= self.target_error or samples >= self.max_samples:
+                return estimate
+
+    def _strata(self, h: int, w: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = int(np.clip(round(np.sqrt(self.batch_size * h / w)), 1, h))
+        cols = int(np.clip(self.batch_size // rows, 1, w))
+        row_edges = np.linspace(0, h, rows + 1).astype(np.intp)
+        col_edges = np.linspace(0, w, cols + 1).astype(np.intp)
+        return row_edges, col_edges
+
+    @staticmethod
+    def _ratio(num: np.ndarray, den: Optional[np.ndarray]) -> float:
+        if den is None:
+            return float(num.mean())
+        return float(num.mean() / den.mean())
+
+    def _interval(
+        self, num: np.ndarray, den: Optional[np.ndarray], total: int
+    ) -> SampleEstimate:
+        n = num.size
+        value = self._ratio(num, den)
+        fpc = max(1 - n / total, 0)
+
+        if self.metric.proportion:
+            # Wilson score interval, so that rare events do not collapse to zero width
+            z2 = self._z**2
+            center = (value + z2 / (2 * n)) / (1 + z2 / n)
+            half = (
+                self._z
+                * np.sqrt(value * (1 - value) / n * fpc + z2 / (4 * n**2))
+                / (1 + z2 / n)
+            )
+            return SampleEstimate(
+                value, float(center - half), float(center + half), n, total
+            )
+
+        if den is None:
+            variance = num.var(ddof=1) / n
+        else:
+            # Delta method for the ratio of means
+            residuals = num - value * den
+            variance = residuals.var(ddof=1) / (n * den.mean() ** 2)
+        half = float(self._z * np.sqrt(variance * fpc))
+        return SampleEstimate(value, value - half, value + half, n, total)
@@ -0,0 +1,215 @@
+import math
+import os
+import struct
+from typing import List, NamedTuple, Optional, Tuple
+
+import cv2
+
+# Images below this size are processed fastest single-threaded, one per core
+SMALL_IMAGE_PIXELS = 4_000_000
+# Above this size one image keeps several cores busy with OpenCV's own threads
+LARGE_IMAGE_PIXELS = 16_000_000
+
+
+class SchedulePlan(NamedTuple):
+    """
+    How a batch of images is spread over the available CPUs.
+
+    Attributes:
+        workers: The number of worker processes.
+        cv_threads: The number of OpenCV threads inside every worker.
+        strategy: A short name of the chosen strategy.
+        reason: A human-readable explanation of the decision.
+    """
+
+    workers: int
+    cv_threads: int
+    strategy: str
+    reason: str
+
+    def describe(self) -> str:
+        return (
+            f"schedule: {self.strategy}, {self.workers} workers x "
+            f"{self.cv_threads} OpenCV threads ({self.reason})"
+        )
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    # cgroup v2
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may actually use.
+
+    Takes the CPU affinity mask and the cgroup CPU quota (containers) into
+    account, not only the number of cores of the host.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, cpus)
+
+
+def image_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Reads the (height, width) of a JPEG or PNG image from its header without
+    decoding the pixels.
+
+    Returns:
+        The size, or None if the format is not recognized or the header is
+        truncated.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if (
+            len(head) == 24
+            and head[:8] == b"\x89PNG\r\n\x1a\n"
+            and head[12:16] == b"IHDR"
+        ):
+            width, height = struct.unpack(">II", head[16:24])
+            return height, width
+        if head[:2] != b"\xff\xd8":
+            return None
+
+        # Walk the JPEG markers up to the start of frame
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] == 0xFF:
+                # Fill byte before the actual marker
+                f.seek(-1, os.SEEK_CUR)
+                continue
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack(">H", length_bytes)[0]
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                height, width = struct.unpack(">xHH", frame)
+                return height, width
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def typical_pixels(paths: List[str], sample: int = 16) -> int:
+    """
+    Estimates the median number of pixels per image from a sample of the paths.
+    """
+    if not paths:
+        return 0
+    step = max(1, len(paths) // sample)
+    sizes = []
+    for path in paths[::step][:sample]:
+        try:
+            size = image_size(path)
+        except OSError:
+            continue
+        if size is None:
+            image = cv2.imread(path)
+            size = image.shape[:2] if image is not None else None
+        if size is not None:
+            sizes.append(size[0] * size[1])
+    if not sizes:
+        return 0
+    return sorted(sizes)[len(sizes) // 2]
+
+
+def plan_schedule(
+    image_count: int, pixels_per_image: int, cpus: Optional[int] = None
+) -> SchedulePlan:
+    """
+    Chooses between many single-threaded workers and few multi-threaded ones.
+
+    OpenCV parallelizes cvtColor, Sobel, Laplacian, Canny and blur internally,
+    so worker processes and OpenCV threads compete for the same cores. Small
+    images are cheapest with one single-threaded worker per core. Large images
+    (or fewer images than cores) give every worker several OpenCV threads.
+
+    Args:
+        image_count: The number of images to process.
+        pixels_per_image: The typical number of pixels of an image.
+        cpus: The number of usable CPUs (default `available_cpus()`).
+
+    Returns:
+        The chosen SchedulePlan.
+    """
+    cpus = cpus if cpus is not None else available_cpus()
+    image_count = max(1, image_count)
+
+    if pixels_per_image < SMALL_IMAGE_PIXELS:
+        threads = 1
+    elif pixels_per_image < LARGE_IMAGE_PIXELS:
+        threads = 2
+    else:
+        threads = 4
+    threads = min(threads, cpus)
+    workers = max(1, cpus // threads)
+
+    megapixels = pixels_per_image / 1e6
+    if image_count < workers:
+        workers = image_count
+        threads = max(1, cpus // workers)
+        return SchedulePlan(
+            workers,
+            threads,
+            "intra-op",
+            f"{image_count} images for {cpus} CPUs, ~{megapixels:.1f} MP each",
+        )
+    if threads == 1:
+        return SchedulePlan(
+            workers,
+            threads,
+            "one-image-per-core",
+            f"{image_count} small images (~{megapixels:.1f} MP) on {cpus} CPUs",
+        )
+    return SchedulePlan(
+        workers,
+        threads,
+        "mixed",
+        f"{image_count} large images (~{megapixels:.1f} MP) on {cpus} CPUs",
+    )
+
+
+def plan_for_paths(paths: List[str], cpus: Optional[int] = None) -> SchedulePlan:
+    """
+    Chooses a schedule for the given images, sampling their sizes.
+    """
+    return plan_schedule(len(paths), typical_pixels(paths), cpus)
+
+
+def init_worker(cv_threads: int):
+    """
+    Applies the OpenCV thread count of a plan; used as the initializer of worker processes.
+    """
+    cv2.setNumThreads(cv_threads)
@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.classifier import (
+    PATH_TO_MODEL,
+    H2OMLClassifier,
+    ImageClassifier,
+    MockImageClassifier,
+)
+from sno_fo_fro.h2o_backend import get_shared_backend
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS
+
+PERCENTILES = (50, 95, 99)
+
+
+def synthetic_corpus(
+    output_dir: str, count: int = 50, size=(480, 640), seed: int = 0
+) -> List[str]:
+    """
+    Writes JPEG images with smooth colour fields, noise and sharp shapes.
+
+    Args:
+        output_dir: The directory the images are written to.
+        count: The number of images.
+        size: The (height, width) of the images.
+        seed: The seed of the generator.
+
+    Returns:
+        The paths of the written images.
+    """
+    rng = np.random.default_rng(seed)
+    h, w = size
+    paths = []
+    for i in range(count):
+        coarse = rng.integers(0, 256, (max(h // 32, 1), max(w // 32, 1), 3), np.uint8)
+        image = cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC)
+        for _ in range(10):
+            center = (int(rng.integers(0, w)), int(rng.integers(0, h)))
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            cv2.circle(image, center, int(rng.integers(3, 40)), color, -1)
+        noise = rng.normal(0, 8, image.shape)
+        image = np.clip(image + noise, 0, 255).astype(np.uint8)
+
+        path = os.path.join(output_dir, f"synthetic_{i:05d}.jpg")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def folder_corpus(dir_path: str) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(dir_path):
+        for filename in sorted(files):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, filename))
+    return paths
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Samples the CPU utilisation and the resident memory of the process.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples: List[Dict[str, float]] = []
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def rss_bytes() -> int:
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            import resource
+
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def run(self):
+        started = time.monotonic()
+        last_wall, last_cpu = started, self._cpu_seconds()
+        while not self._stop_event.wait(self.interval):
+            wall, cpu = time.monotonic(), self._cpu_seconds()
+            self.samples.append(
+                {
+                    "t": wall - started,
+                    "cpu_percent": 100 * (cpu - last_cpu) / (wall - last_wall),
+                    "rss_mb": self.rss_bytes() / 2**20,
+                }
+            )
+            last_wall, last_cpu = wall, cpu
+
+    @staticmethod
+    def _cpu_seconds() -> float:
+        times = os.times()
+        return times.user + times.system
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ClassifyPathBenchmark:
+    """
+    Replays a corpus through the decode -> ImageAnalyzer -> classifier path
+    and records the latency of every stage.
+
+    With `rate` the requests are issued open-loop at a fixed rate, and the
+    latency includes the time a request waited for a free worker. Without it,
+    `concurrency` workers issue requests back to back.
+    """
+
+    def __init__(
+        self,
+        classifier: ImageClassifier,
+        concurrency: int = 1,
+        rate: Optional[float] = None,
+    ):
+        self.classifier = classifier
+        self.concurrency = concurrency
+        self.rate = rate
+
+    def _classify(self, path: str) -> Dict[str, float]:
+        timings = {}
+        started = time.perf_counter()
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError("Could not read image")
+        timings["decode"] = time.perf_counter() - started
+
+        mark = time.perf_counter()
+        metrics = ImageAnalyzer.process_image(image)
+        timings["analyze"] = time.perf_counter() - mark
+
+        if isinstance(self.classifier, H2OMLClassifier):
+            mark = time.perf_counter()
+            frame = self.classifier.to_frame([metrics])
+            timings["to_frame"] = time.perf_counter() - mark
+            mark = time.perf_counter()
+            self.classifier.predict_frame(frame)
+            timings["predict"] = time.perf_counter() - mark
+        else:
+            mark = time.perf_counter()
+            self.classifier.predict([metrics])
+            timings["predict"] = time.perf_counter() - mark
+
+        timings["service"] = time.perf_counter() - started
+        return timings
+
+    def run(self, paths: List[str], requests: int) -> Dict:
+        """
+        Issues `requests` classifications, cycling through the corpus.
+
+        Failed requests are counted, but not included in the percentiles.
+
+        Returns:
+            The run report with per-stage percentiles, throughput and resource samples.
+        """
+        results: List[Dict[str, float]] = []
+        errors: Dict[str, int] = {}
+        lock = threading.Lock()
+
+        def task(path: str, scheduled: float):
+            try:
+                timings = self._classify(path)
+            except Exception as e:
+                with lock:
+                    errors[str(e)] = errors.get(str(e), 0) + 1
+                return
+            timings["total"] = time.perf_counter() - scheduled
+            with lock:
+                results.append(timings)
+
+        sampler = ResourceSampler()
+        sampler.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            if self.rate is None:
+                iterators = [
+                    iter(range(i, requests, self.concurrency))
+                    for i in range(self.concurrency)
+                ]
+
+                def worker(indices):
+                    for i in indices:
+                        task(paths[i % len(paths)], time.perf_counter())
+
+                for future in [pool.submit(worker, it) for it in iterators]:
+                    future.result()
+            else:
+                futures = []
+                for i in range(requests):
+                    scheduled = started + i / self.rate
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    futures.append(pool.submit(task, paths[i % len(paths)], scheduled))
+                for future in futures:
+                    future.result()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+        stages = {}
+        for stage in dict.fromkeys(stage for r in results for stage in r):
+            values = np.array([r[stage] for r in results if stage in r]) * 1000
+            stages[stage] = {
+                f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES
+            }
+            stages[stage]["mean_ms"] = float(values.mean())
+
+        return {
+            "requests": len(results),
+            "failed": sum(errors.values()),
+            "errors": errors,
+            "elapsed_seconds": elapsed,
+            "throughput": len(results) / elapsed if elapsed > 0 else 0.0,
+            "stages": stages,
+            "resources": sampler.samples,
+        }
+
+
+def run_metadata(args: argparse.Namespace) -> Dict:
+    try:
+        version = metadata.version("sno-fo-fro")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = "unknown"
+    return {
+        "label": args.label,
+        "version": version,
+        "revision": revision,
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "classifier": "mock" if args.mock else args.model,
+    }
+
+
+def print_report(report: Dict):
+    meta = report["meta"]
+    print(f"Run '{meta['label']}' ({meta['version']} @ {meta['revision']})")
+    print(f"  requests: {report['requests']}, throughput: {report['throughput']:.2f}/s")
+    for error, count in report.get("errors", {}).items():
+        print(f"  failed: {count} x {error}")
+    for stage, values in report["stages"].items():
+        cells = ", ".join(f"{k}: {v:.1f}" for k, v in values.items())
+        print(f"  {stage:>9}: {cells}")
+    if report["resources"]:
+        cpu = [s["cpu_percent"] for s in report["resources"]]
+        rss = [s["rss_mb"] for s in report["resources"]]
+        print(f"  cpu: mean {np.mean(cpu):.0f}%, max {max(cpu):.0f}%")
+        print(f"  rss: max {max(rss):.0f} MB")
+
+
+def compare_reports(base_path: str, new_path: str):
+    with open(base_path, "r") as f:
+        base = json.load(f)
+    with open(new_path, "r") as f:
+        new = json.load(f)
+
+    print(f"{base['meta']['label']} -> {new['meta']['label']}")
+    change = (
+        100 * (new["throughput"] / base["throughput"] - 1)
+        if base["throughput"] > 0
+        else 0.0
+    )
+    print(
+        f"  throughput: {base['throughput']:.2f} -> {new['throughput']:.2f} ({change:+.1f}%)"
+    )
+    for stage, values in new["stages"].items():
+        if stage not in base["stages"]:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            old, cur = base["stages"][stage][key], values[key]
+            change = 100 * (cur / old - 1) if old > 0 else 0.0
+            print(f"  {stage:>9} {key}: {old:.1f} -> {cur:.1f} ({change:+.1f}%)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Latency and throughput benchmark of the classify path."
+    )
+    parser.add_argument("--corpus", help="folder with images (default synthetic)")
+    parser.add_argument("--synthetic-count", type=int, default=50)
+    parser.add_argument("--synthetic-size", type=int, nargs=2, default=(480, 640))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--rate", type=float, help="target requests per second")
+    parser.add_argument("--model", default=PATH_TO_MODEL)
+    parser.add_argument("--mock", action="store_true", help="use the mock classifier")
+    parser.add_argument(
+        "--shared-h2o",
+        action="store_true",
+        help="use the H2O backend shared with other processes (see h2o_backend)",
+    )
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output-dir", default="benchmarks")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two saved runs"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    backend = get_shared_backend() if args.shared_h2o else None
+    classifier = (
+        MockImageClassifier()
+        if args.mock
+        else H2OMLClassifier(args.model, backend=backend)
+    )
+    benchmark = ClassifyPathBenchmark(classifier, args.concurrency, args.rate)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.corpus:
+            paths = folder_corpus(args.corpus)
+        else:
+            paths = synthetic_corpus(
+                tmp_dir, args.synthetic_count, tuple(args.synthetic_size)
+            )
+        if not paths:
+            parser.error(f"no images in {args.corpus}")
+        # Warm up: loads the model and fills the per-thread buffers
+        try:
+            benchmark._classify(paths[0])
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+        report = benchmark.run(paths, args.requests)
+
+    report["meta"] = run_metadata(args)
+    if isinstance(classifier, H2OMLClassifier):
+        report["model_load_seconds"] = classifier.registry.load_seconds
+    print_report(report)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(
+        args.output_dir,
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{args.label}.json",
+    )
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_path}")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.scripts.benchmark --concurrency 4
+# rye run python -m src.sno_fo_fro.scripts.benchmark --compare <base.json> <new.json>
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import os
+from sno_fo_fro.dataset import ImageSource, open_source
 from sno_fo_fro.image_processor import ImageProcessor
-from typing import List
+from sno_fo_fro.sketch import MetricSummary
+from typing import List, Union
 import matplotlib.pyplot as plt
-import numpy as np
 from sno_fo_fro.hypotheses import (
     ImageSegmentsSharpnessProcessor,
 )
@@ -47,6 +48,29 @@ class FolderProcessor:
                 f"Processed {len(results)} images in {folder_path}. Results saved to {output_path}"
             )
 
+    def process_source(self, source: ImageSource, output_dir: str = "results"):
+        """
+        Processes the images of every class of a dataset (e.g. a pack or an archive) and saves
+        the results to one text file per class.
+
+        Args:
+            source: The dataset.
+            output_dir: The directory where the output text files will be saved.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        for label, results in self.processor.process_source(source).items():
+            results = results.values()
+
+            output_path = os.path.join(output_dir, f"{label}.txt")
+            with open(output_path, "w") as f:
+                for result in results:
+                    f.write(f"{result}\n")
+
+            print(
+                f"Processed {len(results)} images of {label}. Results saved to {output_path}"
+            )
+
 
 class HistogramBuilder:
     """
@@ -89,23 +113,27 @@ class HistogramBuilder:
 
         for i, folder_name in enumerate(folder_names):
             filepath = os.path.join(processor_dir, f"{folder_name}.txt")
+            # One pass in constant memory, whatever the number of images
+            summary = MetricSummary()
             with open(filepath, "r") as f:
-                data = [float(line.strip()) for line in f if line.strip()]
+                for lines in iter(lambda: f.readlines(1 << 20), []):
+                    summary.update([float(line) for line in lines if line.strip()])
 
-            if not data:
+            if summary.count == 0:
                 print(f"No data found in {filepath}. Skipping.")
                 continue
 
             # Plot histogram on the corresponding subplot
             ax = axes[i]
-            ax.hist(data, bins=bins, edgecolor="black")
+            counts, edges = summary.histogram_counts(bins)
+            ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor="black")
             ax.set_title(f"{folder_name}")
             ax.set_xlabel("Value")
             ax.set_ylabel("Frequency")
             ax.grid(True)
 
             # Print statistics
-            self.print_statistics(data, (processor_name), folder_name)
+            self.print_statistics(summary, processor_name, folder_name)
 
         # Set overall title and adjust layout
         fig.suptitle(f"Histograms for {processor_name}", fontsize=16)
@@ -116,21 +144,27 @@ class HistogramBuilder:
         # plt.show()
 
     def print_statistics(
-        self, data: List[float], processor_name: str, folder_name: str
+        self,
+        data: Union[List[float], MetricSummary],
+        processor_name: str,
+        folder_name: str,
     ):
         """
         Calculates and prints basic statistics for the given data.
 
         Args:
-            data: A list of numerical data.
+            data: A list of numerical data or its summary.
             processor_name: The name of the processor.
             folder_name: The name of the folder.
         """
-        mean = np.mean(data)
-        min_val = np.min(data)
-        max_val = np.max(data)
-        std_dev = np.std(data)
-        median = np.median(data)
+        if not isinstance(data, MetricSummary):
+            data = MetricSummary.from_values(data)
+        statistics = data.statistics()
+        mean = statistics["mean"]
+        min_val = statistics["min"]
+        max_val = statistics["max"]
+        std_dev = statistics["std"]
+        median = statistics["median"]
 
         print(f"Statistics for {processor_name} on {folder_name}:")
         print(f"  Mean: {mean:.4f}")
@@ -150,11 +184,8 @@ if __name__ == "__main__":
     parent_dir = "weather-data"
     if len(sys.argv) > 1:
         parent_dir = sys.argv[1]
-    subs = ["fogsmog", "frost", "snow"]
-    target_dirs = [os.path.join(parent_dir, sub_dir) for sub_dir in subs]
-
     dir_proc = FolderProcessor(img_proc)
-    dir_proc.process_folders(target_dirs, outputfolder)
+    dir_proc.process_source(open_source(parent_dir), outputfolder)
 
     hd = HistogramBuilder()
     hd.build_histograms_for_processor(outputfolder)
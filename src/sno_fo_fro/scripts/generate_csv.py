@@ -1,17 +1,17 @@
-import os
+import sys
 import pandas as pd
 from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.dataset import open_source
 
 
 def generate_csv(input_dir="weather-data", output_file="metrics_table.csv"):
     class_directories = {"snow": "snow", "fogsmog": "fogsmog", "frost": "frost"}
+    # `input_dir` may also be a pack or a tar/zip archive
+    results = ImageAnalyzer.process_source(open_source(input_dir))
 
     all_dfs = []
     for class_label, subdir in class_directories.items():
-        dir_path = os.path.join(input_dir, subdir)
-        metrics = ImageAnalyzer.process_images_in_dir(dir_path).values()
-
-        df = pd.DataFrame(metrics)
+        df = results[subdir].to_pandas()
         df["class_label"] = class_label
         all_dfs.append(df)
 
@@ -23,4 +23,4 @@ def generate_csv(input_dir="weather-data", output_file="metrics_table.csv"):
 
 
 if __name__ == "__main__":
-    generate_csv()
+    generate_csv(*sys.argv[1:2])
@@ -0,0 +1,368 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS, ImageProcessor
+from sno_fo_fro.scheduler import available_cpus, init_worker, plan_for_paths
+from sno_fo_fro.sketch import MetricSummary
+
+PARTIAL_FORMAT = "sno-fo-fro-partial/2"
+DEFAULT_LABELS = ("snow", "fogsmog", "frost")
+
+# (path, label)
+ManifestEntry = Tuple[str, str]
+
+
+def build_manifest(
+    input_dir: str = "weather-data", labels: Tuple[str, ...] = DEFAULT_LABELS
+) -> List[ManifestEntry]:
+    """
+    Lists the images of a dataset with one subdirectory per label.
+
+    Returns:
+        The (path, label) entries sorted by path.
+    """
+    entries = []
+    for label in labels:
+        dir_path = os.path.join(input_dir, label)
+        for filename in os.listdir(dir_path):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                entries.append((os.path.join(dir_path, filename), label))
+    return sorted(entries)
+
+
+def write_manifest(entries: List[ManifestEntry], manifest_path: str):
+    with open(manifest_path, "w") as f:
+        for path, label in entries:
+            f.write(f"{label}\t{path}\n")
+
+
+def read_manifest(manifest_path: str) -> Tuple[List[ManifestEntry], str]:
+    """
+    Reads a manifest written by `write_manifest`.
+
+    Returns:
+        The entries and the digest identifying the manifest content.
+    """
+    with open(manifest_path, "rb") as f:
+        content = f.read()
+    entries = []
+    for line in content.decode().splitlines():
+        if line:
+            label, path = line.split("\t", 1)
+            entries.append((path, label))
+    return entries, hashlib.sha256(content).hexdigest()
+
+
+def shard_of(path: str, shard_count: int) -> int:
+    """
+    Assigns a path to a shard by its hash; stable across processes and hosts.
+    """
+    digest = hashlib.sha1(path.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def partial_path(output_dir: str, shard_index: int, shard_count: int) -> str:
+    return os.path.join(output_dir, f"part-{shard_index:05d}-of-{shard_count:05d}.json")
+
+
+def _read_partial(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r") as f:
+            partial = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if partial.get("format") != PARTIAL_FORMAT:
+        return None
+    return partial
+
+
+def _as_metrics(result) -> Dict[str, float]:
+    if isinstance(result, dict):
+        return {name: float(value) for name, value in result.items()}
+    return {"VALUE": float(result)}
+
+
+def run_shard(
+    manifest_path: str,
+    shard_index: int,
+    shard_count: int,
+    output_dir: str,
+    processor: ImageProcessor = ImageAnalyzer,
+    force: bool = False,
+) -> str:
+    """
+    Processes the images of one shard and writes a self-describing partial result.
+
+    The partial result is written atomically. Re-running a shard whose partial
+    result for the same manifest already exists does nothing unless `force` is set.
+
+    Args:
+        manifest_path: The manifest of the whole dataset.
+        shard_index: The index of the shard to process.
+        shard_count: The total number of shards.
+        output_dir: The directory with the partial results (e.g. on a shared filesystem).
+        processor: The processor computing the metrics.
+        force: Recompute the shard even if its partial result exists.
+
+    Returns:
+        The path of the partial result.
+    """
+    entries, digest = read_manifest(manifest_path)
+    output_path = partial_path(output_dir, shard_index, shard_count)
+    existing = _read_partial(output_path)
+    if not force and existing is not None and existing["manifest_digest"] == digest:
+        print(f"Shard {shard_index}/{shard_count} is already done: {output_path}")
+        return output_path
+
+    started = time.time()
+    rows = []
+    # metric -> label -> summary of the shard
+    summaries: Dict[str, Dict[str, MetricSummary]] = {}
+    for path, label in entries:
+        if shard_of(path, shard_count) != shard_index:
+            continue
+        row = {"path": path, "label": label}
+        try:
+            row["metrics"] = _as_metrics(processor.process_image_by_path(path))
+        except Exception as e:
+            row["error"] = str(e)
+        else:
+            for metric, value in row["metrics"].items():
+                by_label = summaries.setdefault(metric, {})
+                by_label.setdefault(label, MetricSummary()).update(value)
+        rows.append(row)
+
+    partial = {
+        "format": PARTIAL_FORMAT,
+        "manifest_digest": digest,
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "processor": processor.__class__.__name__,
+        "host": platform.node(),
+        "pid": os.getpid(),
+        "started_at": started,
+        "finished_at": time.time(),
+        "rows": rows,
+        "summaries": {
+            metric: {label: summary.to_dict() for label, summary in by_label.items()}
+            for metric, by_label in summaries.items()
+        },
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = f"{output_path}.{platform.node()}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(partial, f)
+    os.replace(tmp_path, output_path)
+    print(f"Shard {shard_index}/{shard_count}: {len(rows)} images -> {output_path}")
+    return output_path
+
+
+def run_local(
+    manifest_path: str,
+    shard_count: int,
+    output_dir: str,
+    jobs: Optional[int] = None,
+    processor: ImageProcessor = ImageAnalyzer,
+    force: bool = False,
+) -> List[str]:
+    """
+    Runs all shards on this machine in a pool of local processes.
+
+    Without `jobs`, the number of processes and of OpenCV threads per process
+    is chosen from the size of the images and the usable CPUs. With fewer
+    shards than planned workers, the CPUs of the missing workers go to the
+    OpenCV threads of the others.
+    """
+    cv_threads = None
+    if jobs is None:
+        entries, _ = read_manifest(manifest_path)
+        cpus = available_cpus()
+        plan = plan_for_paths([path for path, _ in entries], cpus)
+        jobs, cv_threads = plan.workers, plan.cv_threads
+        if shard_count < jobs:
+            jobs = shard_count
+            cv_threads = max(1, cpus // jobs)
+        print(plan._replace(workers=jobs, cv_threads=cv_threads).describe())
+
+    initializer, initargs = None, ()
+    if cv_threads is not None:
+        initializer, initargs = init_worker, (cv_threads,)
+    with ProcessPoolExecutor(jobs, initializer=initializer, initargs=initargs) as pool:
+        futures = [
+            pool.submit(
+                run_shard,
+                manifest_path,
+                index,
+                shard_count,
+                output_dir,
+                processor,
+                force,
+            )
+            for index in range(shard_count)
+        ]
+        return [future.result() for future in futures]
+
+
+class MergedResult:
+    """
+    The combined partial results of all shards.
+
+    Attributes:
+        table: The metrics table in manifest order, in the layout of `generate_csv`.
+        samples: The values per metric and per label, as used by `Experimenter`.
+        summary: The count, mean, median, min, max and std per metric and label.
+        errors: The images that failed, as (path, error) pairs.
+        summaries: The merged sketches per metric and per label, as used by
+            `Experimenter` without the samples.
+    """
+
+    def __init__(
+        self,
+        table: pd.DataFrame,
+        samples: Dict[str, Dict[str, np.ndarray]],
+        summary: pd.DataFrame,
+        errors: List[Tuple[str, str]],
+        summaries: Optional[Dict[str, Dict[str, MetricSummary]]] = None,
+    ):
+        self.table = table
+        self.samples = samples
+        self.summary = summary
+        self.errors = errors
+        self.summaries = summaries if summaries is not None else {}
+
+
+def missing_shards(manifest_path: str, shard_count: int, output_dir: str) -> List[int]:
+    """
+    Returns the shards without a valid partial result for the manifest.
+    """
+    _, digest = read_manifest(manifest_path)
+    missing = []
+    for index in range(shard_count):
+        partial = _read_partial(partial_path(output_dir, index, shard_count))
+        if partial is None or partial["manifest_digest"] != digest:
+            missing.append(index)
+    return missing
+
+
+def merge(manifest_path: str, shard_count: int, output_dir: str) -> MergedResult:
+    """
+    Combines the partial results of all shards.
+
+    Raises:
+        ValueError: If a shard has no valid partial result for the manifest
+            (the message lists the shards to re-run).
+    """
+    missing = missing_shards(manifest_path, shard_count, output_dir)
+    if missing:
+        raise ValueError(f"Missing or stale shards: {missing}")
+
+    entries, _ = read_manifest(manifest_path)
+    rows_by_path = {}
+    summaries: Dict[str, Dict[str, MetricSummary]] = {}
+    for index in range(shard_count):
+        partial = _read_partial(partial_path(output_dir, index, shard_count))
+        for row in partial["rows"]:
+            rows_by_path[row["path"]] = row
+        for metric, by_label in partial["summaries"].items():
+            merged = summaries.setdefault(metric, {})
+            for label, data in by_label.items():
+                summary = MetricSummary.from_dict(data)
+                if label in merged:
+                    merged[label].merge(summary)
+                else:
+                    merged[label] = summary
+
+    records = []
+    errors = []
+    for path, label in entries:
+        row = rows_by_path[path]
+        if "error" in row:
+            errors.append((path, row["error"]))
+            continue
+        records.append({**row["metrics"], "class_label": label})
+
+    table = pd.DataFrame(records).fillna(0)
+    metric_names = [column for column in table.columns if column != "class_label"]
+
+    samples = {
+        metric: {
+            label: group[metric].to_numpy()
+            for label, group in table.groupby("class_label", sort=False)
+        }
+        for metric in metric_names
+    }
+    summary = table.groupby("class_label")[metric_names].agg(
+        ["count", "mean", "median", "min", "max", "std"]
+    )
+    return MergedResult(table, samples, summary, errors, summaries)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Process a dataset in independent shards and merge the results."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    manifest_cmd = commands.add_parser("manifest", help="list the dataset images")
+    manifest_cmd.add_argument("input_dir")
+    manifest_cmd.add_argument("manifest")
+
+    run_cmd = commands.add_parser("run", help="process one shard")
+    run_cmd.add_argument("manifest")
+    run_cmd.add_argument("--index", type=int, required=True)
+    run_cmd.add_argument("--count", type=int, required=True)
+    run_cmd.add_argument("--output-dir", default="shards")
+    run_cmd.add_argument("--force", action="store_true")
+
+    local_cmd = commands.add_parser("run-local", help="process all shards locally")
+    local_cmd.add_argument("manifest")
+    local_cmd.add_argument("--count", type=int, required=True)
+    local_cmd.add_argument("--jobs", type=int)
+    local_cmd.add_argument("--output-dir", default="shards")
+    local_cmd.add_argument("--force", action="store_true")
+
+    merge_cmd = commands.add_parser("merge", help="merge the partial results")
+    merge_cmd.add_argument("manifest")
+    merge_cmd.add_argument("--count", type=int, required=True)
+    merge_cmd.add_argument("--output-dir", default="shards")
+    merge_cmd.add_argument("--output", default="metrics_table.csv")
+    args = parser.parse_args(argv)
+
+    if args.command == "manifest":
+        entries = build_manifest(args.input_dir)
+        write_manifest(entries, args.manifest)
+        print(f"Manifest with {len(entries)} images saved: {args.manifest}")
+    elif args.command == "run":
+        run_shard(
+            args.manifest, args.index, args.count, args.output_dir, force=args.force
+        )
+    elif args.command == "run-local":
+        run_local(
+            args.manifest, args.count, args.output_dir, args.jobs, force=args.force
+        )
+    elif args.command == "merge":
+        result = merge(args.manifest, args.count, args.output_dir)
+        result.table.to_csv(args.output, index=False)
+        print(f"CSV file saved: {args.output}")
+        for path, error in result.errors:
+            print(f"Failed: {path}: {error}")
+        print(result.summary.to_string())
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.shard manifest weather-data manifest.tsv
+# rye run python -m src.sno_fo_fro.shard run manifest.tsv --index 0 --count 4
+# rye run python -m src.sno_fo_fro.shard merge manifest.tsv --count 4
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,423 @@
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SKETCH_FORMAT = "sno-fo-fro-summary/1"
+
+
+def _finite(values: Iterable[float]) -> np.ndarray:
+    # NaN (e.g. COLDNESS of a black image) has no place in an order or a sum
+    values = np.asarray(values, dtype=np.float64).ravel()
+    return values[np.isfinite(values)]
+
+
+class MomentSketch:
+    """
+    Count, mean, central moments up to the fourth, min and max of a stream.
+
+    Batches are combined with the pairwise update formulas of Chan and Pébay,
+    which stay numerically stable and make two sketches mergeable exactly.
+    Non-finite values are skipped.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sums of the powers of the deviations from the mean
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: Iterable[float]) -> "MomentSketch":
+        values = _finite(values)
+        if len(values) == 0:
+            return self
+        batch = MomentSketch()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        deviations = values - batch.mean
+        squares = deviations * deviations
+        batch.m2 = float(squares.sum())
+        batch.m3 = float((squares * deviations).sum())
+        batch.m4 = float((squares * squares).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        return self.merge(batch)
+
+    def merge(self, other: "MomentSketch") -> "MomentSketch":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        m2a, m2b = self.m2, other.m2
+        m3a, m3b = self.m3, other.m3
+
+        self.m4 = (
+            self.m4
+            + other.m4
+            + delta**4 * na * nb * (na * na - na * nb + nb * nb) / n**3
+            + 6 * delta**2 * (na * na * m2b + nb * nb * m2a) / n**2
+            + 4 * delta * (na * m3b - nb * m3a) / n
+        )
+        self.m3 = (
+            m3a
+            + m3b
+            + delta**3 * na * nb * (na - nb) / n**2
+            + 3 * delta * (na * m2b - nb * m2a) / n
+        )
+        self.m2 = m2a + m2b + delta**2 * na * nb / n
+        self.mean += delta * nb / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self, ddof: int = 0) -> float:
+        if self.count <= ddof:
+            return np.nan
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 0) -> float:
+        return float(np.sqrt(self.variance(ddof)))
+
+    @property
+    def skewness(self) -> float:
+        """
+        The biased sample skewness, as `scipy.stats.skew`.
+        """
+        if self.m2 == 0:
+            return np.nan
+        return float(np.sqrt(self.count) * self.m3 / self.m2**1.5)
+
+    @property
+    def kurtosis(self) -> float:
+        """
+        The biased sample kurtosis (Pearson's, 3 for a normal distribution).
+        """
+        if self.m2 == 0:
+            return np.nan
+        return float(self.count * self.m4 / self.m2**2)
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "m3": self.m3,
+            "m4": self.m4,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MomentSketch":
+        sketch = cls()
+        sketch.__dict__.update(data)
+        if sketch.count == 0:
+            sketch.min, sketch.max = np.inf, -np.inf
+        return sketch
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang and Liberty).
+
+    Values are kept in a hierarchy of compactors; an item of level `h` stands
+    for `2 ** h` values. A full compactor is sorted and every other item (from a
+    random offset) is promoted to the next level. The capacity of the levels
+    decreases geometrically from the top, so the memory is O(k) regardless of
+    the stream length and the rank error is about 1.7 / k. Streams shorter than
+    `k` are kept exactly. Non-finite values are skipped.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """
+        Initializes the KLLSketch.
+
+        Args:
+            k: The accuracy parameter (capacity of the top compactor).
+            seed: The seed of the random offsets of the compactions.
+        """
+        self.k = k
+        self.count = 0
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _size(self) -> int:
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+            compactor.sort()
+            # An odd item out stays on its level
+            last = compactor.pop() if len(compactor) % 2 else None
+            offset = self._rng.randint(0, 1)
+            self.compactors[level + 1].extend(compactor[offset::2])
+            compactor.clear()
+            if last is not None:
+                compactor.append(last)
+            if self._size() < self._max_size():
+                break
+
+    def update(self, values: Iterable[float]) -> "KLLSketch":
+        values = _finite(values).tolist()
+        start = 0
+        while start < len(values):
+            free = max(self._max_size() - self._size(), 1)
+            chunk = values[start : start + free]
+            self.compactors[0].extend(chunk)
+            self.count += len(chunk)
+            start += len(chunk)
+            if self._size() >= self._max_size():
+                self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def weighted_items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the retained values (sorted) and the number of values each stands for.
+        """
+        values = np.concatenate(
+            [np.asarray(c, dtype=np.float64) for c in self.compactors]
+        )
+        weights = np.concatenate(
+            [
+                np.full(len(c), 2**level, dtype=np.int64)
+                for level, c in enumerate(self.compactors)
+            ]
+        )
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def rank(self, x: float, inclusive: bool = False) -> float:
+        """
+        Estimates the number of values below `x` (or not above it, if inclusive).
+        """
+        values, weights = self.weighted_items()
+        side = "right" if inclusive else "left"
+        return float(weights[: np.searchsorted(values, x, side=side)].sum())
+
+    def cdf(self, xs: Iterable[float]) -> np.ndarray:
+        """
+        Estimates the share of values not above each of `xs`.
+        """
+        values, weights = self.weighted_items()
+        cumulative = np.concatenate([[0], np.cumsum(weights)])
+        ranks = cumulative[np.searchsorted(values, np.asarray(xs), side="right")]
+        return ranks / max(cumulative[-1], 1)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return np.nan
+        values, weights = self.weighted_items()
+        cumulative = np.cumsum(weights)
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(values[min(index, len(values) - 1)])
+
+    def to_dict(self) -> Dict:
+        return {"k": self.k, "count": self.count, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "KLLSketch":
+        sketch = cls(data["k"])
+        sketch.count = data["count"]
+        sketch.compactors = [list(c) for c in data["compactors"]]
+        return sketch
+
+
+class FixedHistogram:
+    """
+    Histogram with fixed, equal-width bins, plus counts of the values out of range.
+    """
+
+    def __init__(self, low: float, high: float, bins: int = 20):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def update(self, values: Iterable[float]) -> "FixedHistogram":
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.underflow += int((values < self.low).sum())
+        self.overflow += int((values > self.high).sum())
+        counts, _ = np.histogram(values, self.bins, (self.low, self.high))
+        self.counts += counts
+        return self
+
+    def merge(self, other: "FixedHistogram") -> "FixedHistogram":
+        if (self.low, self.high, self.bins) != (other.low, other.high, other.bins):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            "low": self.low,
+            "high": self.high,
+            "bins": self.bins,
+            "counts": self.counts.tolist(),
+            "underflow": self.underflow,
+            "overflow": self.overflow,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FixedHistogram":
+        histogram = cls(data["low"], data["high"], data["bins"])
+        histogram.counts = np.asarray(data["counts"], dtype=np.int64)
+        histogram.underflow = data["underflow"]
+        histogram.overflow = data["overflow"]
+        return histogram
+
+
+class MetricSummary:
+    """
+    Mergeable, serializable summary of the values of one metric in one class.
+
+    Combines a MomentSketch, a KLLSketch and, if the range of the metric is
+    known in advance, a FixedHistogram. Memory does not depend on the number
+    of values, so a dataset of any size is summarized in one pass. Non-finite
+    values are only counted (`non_finite`).
+    """
+
+    def __init__(
+        self,
+        k: int = 200,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+        bins: int = 20,
+    ):
+        """
+        Initializes the MetricSummary.
+
+        Args:
+            k: The accuracy parameter of the quantile sketch.
+            low: The lower bound of the fixed histogram (None: no fixed histogram).
+            high: The upper bound of the fixed histogram.
+            bins: The number of bins of the fixed histogram.
+        """
+        self.moments = MomentSketch()
+        self.quantiles = KLLSketch(k)
+        self.histogram = (
+            FixedHistogram(low, high, bins)
+            if low is not None and high is not None
+            else None
+        )
+        self.non_finite = 0
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], **kwargs) -> "MetricSummary":
+        return cls(**kwargs).update(values)
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    @property
+    def median(self) -> float:
+        return self.quantiles.quantile(0.5)
+
+    def update(self, values: Iterable[float]) -> "MetricSummary":
+        values = np.asarray(values, dtype=np.float64).ravel()
+        finite = _finite(values)
+        self.non_finite += len(values) - len(finite)
+        self.moments.update(finite)
+        self.quantiles.update(finite)
+        if self.histogram is not None:
+            self.histogram.update(finite)
+        return self
+
+    def merge(self, other: "MetricSummary") -> "MetricSummary":
+        self.non_finite += other.non_finite
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram.merge(other.histogram)
+        else:
+            self.histogram = None
+        return self
+
+    def histogram_counts(self, bins: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the counts and edges of a histogram of the values.
+
+        The fixed histogram is used when there is one; otherwise the counts of
+        `bins` equal-width bins between min and max are estimated from the
+        quantile sketch.
+        """
+        if self.histogram is not None:
+            return self.histogram.counts, self.histogram.edges
+        edges = np.linspace(self.moments.min, self.moments.max, bins + 1)
+        if self.count == 0:
+            return np.zeros(bins, dtype=np.int64), edges
+        values, weights = self.quantiles.weighted_items()
+        counts, _ = np.histogram(values, edges, weights=weights)
+        return counts, edges
+
+    def statistics(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.moments.mean,
+            "median": self.median,
+            "min": self.moments.min,
+            "max": self.moments.max,
+            "std": self.moments.std(),
+            "non_finite": self.non_finite,
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "format": SKETCH_FORMAT,
+            "moments": self.moments.to_dict(),
+            "quantiles": self.quantiles.to_dict(),
+            "histogram": self.histogram.to_dict() if self.histogram else None,
+            "non_finite": self.non_finite,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MetricSummary":
+        if data.get("format") != SKETCH_FORMAT:
+            raise ValueError("Not a metric summary")
+        summary = cls(data["quantiles"]["k"])
+        summary.moments = MomentSketch.from_dict(data["moments"])
+        summary.quantiles = KLLSketch.from_dict(data["quantiles"])
+        if data["histogram"] is not None:
+            summary.histogram = FixedHistogram.from_dict(data["histogram"])
+        summary.non_finite = data.get("non_finite", 0)
+        return summary
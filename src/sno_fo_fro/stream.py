@@ -0,0 +1,366 @@
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from sno_fo_fro.analyzer import (
+    METRIC_BRIGHT_SPOTS,
+    METRIC_EDGE_DENSITY,
+    METRIC_SEGMENTS_SHARPNESS,
+    METRIC_WHITENESS,
+    ImageAnalyzer,
+)
+from sno_fo_fro.hypotheses import tile_laplacian_variances
+from sno_fo_fro.image_processor import IMAGE_EXTENSIONS, ImageProcessor
+
+# The partial statistics kept for every tile
+(
+    _WHITE,
+    _SATURATION,
+    _BLUE,
+    _GREEN,
+    _RED,
+    _GRAY,
+    _GRAY_SQ,
+    _LAPLACIAN,
+    _LAPLACIAN_SQ,
+    _GRADIENT,
+    _GRADIENT_SQ,
+    _EDGES,
+    _BRIGHT,
+    _SEGMENTS_HIGH,
+    _SEGMENTS_LOW,
+    _SEGMENTS,
+) = range(16)
+_STATS = 16
+
+
+class StreamAnalyzer(ImageProcessor[Dict[str, float]]):
+    """
+    Computes the ImageAnalyzer metrics of consecutive frames of a fixed camera,
+    recomputing only the parts of the scene that changed.
+
+    The frame is split into square tiles, and for every tile the analyzer keeps
+    the partial sums the metrics are made of (pixel counts above thresholds,
+    channel sums, sums of squares of the gray level, the Laplacian and the
+    white gradient, Canny edges, bright spots and the sharpness classes of the
+    segments). A new frame is compared with the pixels the statistics were
+    computed from by block differencing; changed tiles and their neighbours
+    (whose filters reach into the changed tiles) are recomputed on the tile
+    plus a halo of surrounding pixels, and the metrics are summed up from the
+    tiles again.
+
+    The metrics equal those of ImageAnalyzer up to float rounding, except that
+    Canny hysteresis can follow an edge further than the halo, so the edge
+    density of recomputed tiles is approximate. Changes below
+    `change_threshold` are not picked up either. Both errors are reset by a
+    full analysis every `refresh_every` frames.
+    """
+
+    def __init__(
+        self,
+        tile_size: int = 80,
+        change_threshold: float = 2.0,
+        refresh_every: int = 100,
+        halo: int = 8,
+        full_fraction: float = 0.5,
+    ):
+        """
+        Initializes the StreamAnalyzer.
+
+        Args:
+            tile_size: The side of the tiles, a multiple of the segment size
+                of SEGMENTS_SHARPNESS.
+            change_threshold: The mean absolute difference of the pixels of a
+                tile (channels weighted like the gray level) above which the
+                tile counts as changed.
+            refresh_every: The number of frames between two full analyses.
+            halo: The pixels around a recomputed tile the filters may read,
+                at least the radius of the BRIGHT_SPOTS blur.
+            full_fraction: The share of changed tiles from which the whole
+                frame is analyzed at once.
+        """
+        segments = METRIC_SEGMENTS_SHARPNESS.img_proc
+        bright = METRIC_BRIGHT_SPOTS.img_proc
+        if tile_size % segments.segment_size:
+            raise ValueError(f"Tile size must be a multiple of {segments.segment_size}")
+        if not bright.kernel_size // 2 <= halo <= tile_size:
+            raise ValueError(
+                f"Halo must be between {bright.kernel_size // 2} and the tile size"
+            )
+        self.tile_size = tile_size
+        self.change_threshold = change_threshold
+        self.refresh_every = refresh_every
+        self.halo = halo
+        self.full_fraction = full_fraction
+        self.frames = 0
+        self.full_refreshes = 0
+        self.last_recomputed = 0.0
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the previous frames; the next frame is analyzed in full.
+        """
+        self._reference: Optional[np.ndarray] = None
+        self._stats: Optional[np.ndarray] = None
+        self._tile_pixels: Optional[np.ndarray] = None
+        self._since_refresh = 0
+
+    def _grid(self, shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        h, w = shape[:2]
+        return np.arange(0, h, self.tile_size), np.arange(0, w, self.tile_size)
+
+    @staticmethod
+    def _tile_sums(values: np.ndarray, rows: np.ndarray, cols: np.ndarray):
+        """
+        Sums the values of every tile (and over the channels) from the corners
+        of the integral image, exactly for integer values.
+        """
+        h, w = values.shape[:2]
+        integral = cv2.integral(values, sdepth=cv2.CV_64F)
+        corners = integral[np.append(rows, h)][:, np.append(cols, w)]
+        sums = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+        return sums if sums.ndim == 2 else sums.sum(axis=2)
+
+    def _block_stats(
+        self, frame: np.ndarray, ty0: int, ty1: int, tx0: int, tx1: int
+    ) -> np.ndarray:
+        """
+        Computes the statistics of the tiles [ty0, ty1) x [tx0, tx1).
+        """
+        h, w = frame.shape[:2]
+        size, halo = self.tile_size, self.halo
+        y0, y1 = ty0 * size, min(ty1 * size, h)
+        x0, x1 = tx0 * size, min(tx1 * size, w)
+        # At the frame borders the region ends where the frame does, so the
+        # filters see the same reflected border as on the whole frame
+        ry0, ry1 = max(y0 - halo, 0), min(y1 + halo, h)
+        rx0, rx1 = max(x0 - halo, 0), min(x1 + halo, w)
+        region = frame[ry0:ry1, rx0:rx1]
+        inner = (slice(y0 - ry0, y1 - ry0), slice(x0 - rx0, x1 - rx0))
+        rows = np.arange(0, y1 - y0, size)
+        cols = np.arange(0, x1 - x0, size)
+        stats = np.empty((len(rows), len(cols), _STATS))
+
+        def sums(values):
+            return self._tile_sums(values, rows, cols)
+
+        pixels = region[inner]
+        hsv = cv2.cvtColor(region, cv2.COLOR_BGR2HSV)
+        s_plane = np.ascontiguousarray(hsv[:, :, 1])
+        v_plane = np.ascontiguousarray(hsv[:, :, 2])
+        s, v = s_plane[inner], v_plane[inner]
+
+        whiteness = METRIC_WHITENESS.img_proc
+        white = (v >= whiteness.value_threshold) & (s <= whiteness.saturation_threshold)
+        stats[..., _WHITE] = sums(white.view(np.uint8))
+        stats[..., _SATURATION] = sums(s)
+        for channel in range(3):
+            stats[..., _BLUE + channel] = sums(pixels[:, :, channel])
+
+        # Squares of the gray levels and of the Laplacian are exact in float32
+        gray = cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY)
+        stats[..., _GRAY] = sums(gray)
+        stats[..., _GRAY_SQ] = sums(np.square(gray, dtype=np.float32))
+
+        laplacian = cv2.Laplacian(region, cv2.CV_16S)[inner]
+        stats[..., _LAPLACIAN] = sums(laplacian)
+        stats[..., _LAPLACIAN_SQ] = sums(np.square(laplacian, dtype=np.float32))
+
+        # The white gradient, in the float32 steps of ImageWhiteGradientProcessor
+        magnitudes = []
+        for plane in (s_plane, v_plane):
+            grad_x = cv2.Sobel(plane, cv2.CV_32F, 1, 0, ksize=3)
+            grad_y = cv2.Sobel(plane, cv2.CV_32F, 0, 1, ksize=3)
+            magnitudes.append(cv2.magnitude(grad_x, grad_y)[inner])
+        pixel_whiteness = v.astype(np.float32) / np.maximum(s, 1).astype(np.float32)
+        gradient = magnitudes[0] * magnitudes[1] * pixel_whiteness
+        stats[..., _GRADIENT] = sums(gradient)
+        stats[..., _GRADIENT_SQ] = sums(np.square(gradient, dtype=np.float64))
+
+        edges = METRIC_EDGE_DENSITY.img_proc
+        canny = cv2.Canny(region, edges.low_threshold, edges.high_threshold)
+        stats[..., _EDGES] = sums((canny[inner] != 0).view(np.uint8))
+
+        bright = METRIC_BRIGHT_SPOTS.img_proc
+        kernel = (bright.kernel_size, bright.kernel_size)
+        local_avg = cv2.blur(v_plane, kernel)
+        difference = cv2.subtract(v_plane, local_avg, dtype=cv2.CV_16S)[inner]
+        stats[..., _BRIGHT] = sums((difference > bright.threshold_value).view(np.uint8))
+
+        # Segments have their own borders; one more pixel keeps the last
+        # segment of every tile, as on the whole frame
+        segments = METRIC_SEGMENTS_SHARPNESS.img_proc
+        variances = tile_laplacian_variances(
+            frame[y0 : min(y1 + 1, h), x0 : min(x1 + 1, w)], segments.segment_size
+        )
+        tile_rows = np.arange(variances.shape[0]) * segments.segment_size // size
+        tile_cols = np.arange(variances.shape[1]) * segments.segment_size // size
+        index = (tile_rows[:, None], tile_cols[None, :])
+        for stat, mask in (
+            (_SEGMENTS_HIGH, variances > segments.high_threshold),
+            (_SEGMENTS_LOW, variances < segments.low_threshold),
+            (_SEGMENTS, np.ones(variances.shape, np.bool_)),
+        ):
+            counts = np.zeros((len(rows), len(cols)))
+            np.add.at(counts, index, mask)
+            stats[..., stat] = counts
+        return stats
+
+    def _changed_tiles(self, frame: np.ndarray) -> np.ndarray:
+        rows, cols = self._grid(frame.shape)
+        # Channel differences weighted like the gray level, so they cannot saturate
+        difference = cv2.cvtColor(
+            cv2.absdiff(frame, self._reference), cv2.COLOR_BGR2GRAY
+        )
+        return self._tile_sums(difference, rows, cols) > (
+            self.change_threshold * self._tile_pixels
+        )
+
+    def _refresh(self, frame: np.ndarray):
+        rows, cols = self._grid(frame.shape)
+        self._stats = self._block_stats(frame, 0, len(rows), 0, len(cols))
+        self._tile_pixels = self._tile_sums(
+            np.ones(frame.shape[:2], np.uint8), rows, cols
+        )
+        self._reference = frame.copy()
+        self._since_refresh = 0
+        self.full_refreshes += 1
+        self.last_recomputed = 1.0
+
+    def _update(self, frame: np.ndarray):
+        changed = self._changed_tiles(frame)
+        # The filters of the neighbouring tiles read the changed pixels too
+        dirty = cv2.dilate(changed.astype(np.uint8), np.ones((3, 3), np.uint8)) > 0
+        if dirty.mean() >= self.full_fraction:
+            self._refresh(frame)
+            return
+
+        size = self.tile_size
+        for ty in np.flatnonzero(dirty.any(axis=1)):
+            # One block per run of dirty tiles in the row
+            row = np.concatenate(([False], dirty[ty], [False]))
+            bounds = np.flatnonzero(row[1:] != row[:-1]).reshape(-1, 2)
+            for tx0, tx1 in bounds:
+                self._stats[ty, tx0:tx1] = self._block_stats(
+                    frame, ty, ty + 1, tx0, tx1
+                )[0]
+                area = (
+                    slice(ty * size, (ty + 1) * size),
+                    slice(tx0 * size, tx1 * size),
+                )
+                self._reference[area] = frame[area]
+        self._since_refresh += 1
+        self.last_recomputed = float(dirty.mean())
+
+    def _metrics(self, shape: Tuple[int, ...]) -> Dict[str, float]:
+        totals = self._stats.sum(axis=(0, 1))
+        n = shape[0] * shape[1]
+        channel_values = n * shape[2]
+
+        gray_mean = totals[_GRAY] / n
+        laplacian_mean = totals[_LAPLACIAN] / channel_values
+        gradient_mean = totals[_GRADIENT] / n
+        blue, green, red = (totals[c] / n for c in (_BLUE, _GREEN, _RED))
+        high, low = totals[_SEGMENTS_HIGH], totals[_SEGMENTS_LOW]
+        # NaN for a black frame, as in ImageColdnessProcessor
+        with np.errstate(invalid="ignore"):
+            coldness = (blue - red) / max(blue + red + green, 0)
+
+        # In the order and with the types of ImageAnalyzer
+        return {
+            "WHITENESS": np.float32(totals[_WHITE] / n),
+            "BLURRINESS": np.float64(
+                totals[_LAPLACIAN_SQ] / channel_values - laplacian_mean**2
+            ),
+            "CONTRAST": np.float64(totals[_GRAY_SQ] / n - gray_mean**2),
+            "SATURATION": np.float64(totals[_SATURATION] / n),
+            "WHITE_GRADIENT": np.float64(
+                np.sqrt(max(totals[_GRADIENT_SQ] / n - gradient_mean**2, 0.0))
+            ),
+            "COLDNESS": np.float32(coldness),
+            "EDGE_DENSITY": np.float32(totals[_EDGES] / channel_values),
+            "SEGMENTS_SHARPNESS": np.float32(
+                2 * min(high, low) / float(totals[_SEGMENTS])
+            ),
+            "BRIGHT_SPOTS": float(totals[_BRIGHT]) / float(n),
+        }
+
+    def process_image(self, image: np.ndarray) -> Dict[str, float]:
+        """
+        Analyzes the next frame of the stream.
+
+        Args:
+            image: The frame as a NumPy array (OpenCV BGR format).
+
+        Returns:
+            The metrics of the frame by name, as ImageAnalyzer returns them.
+        """
+        if len(image.shape) != 3 or image.shape[2] != 3:
+            raise ValueError("Input image must be a BGR color image.")
+        if (
+            self._reference is None
+            or self._reference.shape != image.shape
+            or self._since_refresh + 1 >= self.refresh_every
+        ):
+            self._refresh(image)
+        else:
+            self._update(image)
+        self.frames += 1
+        return self._metrics(image.shape)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Analyze the frames of a fixed camera incrementally and "
+        "compare the time with a full analysis of every frame."
+    )
+    parser.add_argument("frames", help="directory with the frames (in name order)")
+    parser.add_argument("--tile-size", type=int, default=80)
+    parser.add_argument("--threshold", type=float, default=2.0)
+    parser.add_argument("--refresh-every", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    paths = sorted(
+        os.path.join(args.frames, name)
+        for name in os.listdir(args.frames)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    analyzer = StreamAnalyzer(args.tile_size, args.threshold, args.refresh_every)
+    stream_seconds = full_seconds = 0.0
+    recomputed = []
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Error: Could not read image at {path}")
+            continue
+        started = time.perf_counter()
+        analyzer.process_image(frame)
+        stream_seconds += time.perf_counter() - started
+        recomputed.append(analyzer.last_recomputed)
+        started = time.perf_counter()
+        ImageAnalyzer.process_image(frame)
+        full_seconds += time.perf_counter() - started
+
+    if not recomputed:
+        print("No frames found")
+        return 1
+    print(
+        f"{len(recomputed)} frames, {np.mean(recomputed):.1%} of the tiles "
+        f"recomputed on average, {analyzer.full_refreshes} full analyses"
+    )
+    print(
+        f"Incremental: {stream_seconds / len(recomputed) * 1000:.1f} ms/frame, "
+        f"full: {full_seconds / len(recomputed) * 1000:.1f} ms/frame"
+    )
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.stream <frames_dir> [--tile-size 80]
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+import argparse
+import inspect
+import itertools
+import sys
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from sno_fo_fro.color_histogram import ColorHistogram
+from sno_fo_fro.dataset import ImageSource, open_source
+from sno_fo_fro.experiment.experimenter import (
+    ExperimenterCompareMode,
+    ExperimenterWeather,
+    SampleAnalyzer,
+)
+from sno_fo_fro.hypotheses import (
+    ImageBrightSpotsProcessor,
+    ImageEdgeDensityProcessor,
+    ImageSegmentsSharpnessProcessor,
+    ImageWhitenessProcessor,
+    tile_laplacian_variances,
+)
+from sno_fo_fro.image_processor import ImageProcessor
+
+
+class ParameterSweeper(ABC):
+    """
+    Abstract base class for evaluating a processor at every point of a
+    parameter grid, computing the expensive intermediates once per image.
+
+    The value at every grid point equals `processor_class(**point).process_image`.
+    """
+
+    processor_class: type
+    default_grid: Dict[str, Sequence]
+
+    def __init__(self, grid: Optional[Dict[str, Sequence]] = None):
+        """
+        Initializes the ParameterSweeper.
+
+        Args:
+            grid: The values of every swept constructor parameter
+                (default `default_grid`); the grid is their cartesian product.
+        """
+        self.grid = dict(grid if grid is not None else self.default_grid)
+        unknown = set(self.grid) - set(self.default_grid)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+        names = list(self.grid)
+        self.points: List[Dict[str, Any]] = [
+            dict(zip(names, values))
+            for values in itertools.product(*self.grid.values())
+        ]
+
+    def processor(self, point: Dict[str, Any]) -> ImageProcessor:
+        return self.processor_class(**point)
+
+    def _column(self, name: str) -> np.ndarray:
+        """
+        Returns the value of a parameter at every grid point, using the
+        processor default where the parameter is not swept.
+        """
+        default = inspect.signature(self.processor_class).parameters[name].default
+        return np.array([point.get(name, default) for point in self.points])
+
+    @abstractmethod
+    def evaluate(self, image: np.ndarray) -> np.ndarray:
+        """
+        Computes the metric of one image at every grid point.
+
+        Returns:
+            An array with one value per point of `points`.
+        """
+        pass
+
+
+class WhitenessSweeper(ParameterSweeper):
+    """
+    Sweeps the thresholds of ImageWhitenessProcessor from one ColorHistogram:
+    the white fraction for any thresholds is a lookup in its cumulative sums.
+    """
+
+    processor_class = ImageWhitenessProcessor
+    default_grid = {
+        "value_threshold": (160, 180, 200, 220, 240),
+        "saturation_threshold": (20, 35, 50, 65, 80),
+    }
+
+    def evaluate(self, image: np.ndarray) -> np.ndarray:
+        histogram = ColorHistogram.from_image(image, bright_kernels=())
+        return histogram.whiteness(
+            self._column("value_threshold"), self._column("saturation_threshold")
+        )
+
+
+class EdgeDensitySweeper(ParameterSweeper):
+    """
+    Sweeps the Canny thresholds of ImageEdgeDensityProcessor.
+
+    The Sobel derivatives are computed once. For every low threshold, Canny
+    with high == low yields all edge candidates; hysteresis keeps the
+    8-connected groups of candidates whose strongest gradient exceeds the high
+    threshold, so every high threshold only sums the sizes of those groups.
+    """
+
+    processor_class = ImageEdgeDensityProcessor
+    default_grid = {
+        "low_threshold": (25, 50, 100, 150),
+        "high_threshold": (100, 150, 200, 300),
+    }
+
+    def evaluate(self, image: np.ndarray) -> np.ndarray:
+        # The same derivatives cv2.Canny computes internally
+        dx = cv2.Sobel(
+            image, cv2.CV_16S, 1, 0, ksize=3, borderType=cv2.BORDER_REPLICATE
+        )
+        dy = cv2.Sobel(
+            image, cv2.CV_16S, 0, 1, ksize=3, borderType=cv2.BORDER_REPLICATE
+        )
+        pairs = [
+            # cv2.Canny swaps the thresholds if needed
+            (min(low, high), max(low, high))
+            for low, high in zip(
+                self._column("low_threshold"), self._column("high_threshold")
+            )
+        ]
+
+        # Non-maximum suppression does not depend on the thresholds: the
+        # candidates for any low threshold are the local maxima above it
+        lowest = min(low for low, _ in pairs)
+        maxima = np.flatnonzero(cv2.Canny(dx, dy, float(lowest), float(lowest)))
+        plane = image.shape[0] * image.shape[1]
+        magnitude = np.abs(dx.reshape(plane, -1)[maxima], dtype=np.int32)
+        magnitude += np.abs(dy.reshape(plane, -1)[maxima], dtype=np.int32)
+        # The L1 magnitude of the channel with the strongest gradient
+        magnitude = magnitude.max(axis=1)
+
+        groups = {}
+        values = []
+        for low, high in pairs:
+            if low not in groups:
+                above = magnitude > low
+                candidates = np.zeros(image.shape[:2], np.uint8)
+                candidates.flat[maxima[above]] = 255
+                count, labels, stats, _ = cv2.connectedComponentsWithStats(
+                    candidates, connectivity=8
+                )
+                strongest = np.zeros(count, np.int32)
+                np.maximum.at(strongest, labels.flat[maxima[above]], magnitude[above])
+                groups[low] = (strongest[1:], stats[1:, cv2.CC_STAT_AREA])
+            strongest, sizes = groups[low]
+            edge_count = sizes[strongest > high].sum()
+            values.append(edge_count / image.size)
+        return np.array(values, dtype=np.float32)
+
+
+class SegmentsSharpnessSweeper(ParameterSweeper):
+    """
+    Sweeps ImageSegmentsSharpnessProcessor: the segment variances are computed
+    once per segment size and every pair of thresholds only counts them.
+    """
+
+    processor_class = ImageSegmentsSharpnessProcessor
+    default_grid = {
+        "segment_size": (10, 20, 40),
+        "low_threshold": (250, 500, 750),
+        "high_threshold": (1000, 1500, 2000),
+    }
+
+    def evaluate(self, image: np.ndarray) -> np.ndarray:
+        sizes = self._column("segment_size")
+        variances = {
+            size: np.sort(tile_laplacian_variances(image, int(size)).ravel())
+            for size in np.unique(sizes)
+        }
+        values = []
+        for size, low, high in zip(
+            sizes, self._column("low_threshold"), self._column("high_threshold")
+        ):
+            blur = variances[size]
+            if blur.size == 0:
+                raise ZeroDivisionError("Image is smaller than one segment")
+            high_c = blur.size - np.searchsorted(blur, high, side="right")
+            low_c = np.searchsorted(blur, low, side="left")
+            values.append(2 * min(high_c, low_c) / blur.size)
+        return np.array(values, dtype=np.float32)
+
+
+class BrightSpotsSweeper(ParameterSweeper):
+    """
+    Sweeps ImageBrightSpotsProcessor: one box blur per kernel size and the
+    ColorHistogram of the differences serve every threshold.
+    """
+
+    processor_class = ImageBrightSpotsProcessor
+    default_grid = {
+        "kernel_size": (5, 9, 15, 25),
+        "threshold_value": (5, 10, 20, 30, 40),
+    }
+
+    def evaluate(self, image: np.ndarray) -> np.ndarray:
+        kernels = self._column("kernel_size")
+        histogram = ColorHistogram.from_image(image, np.unique(kernels))
+        return np.array(
+            [
+                histogram.bright_spots(threshold, int(kernel))
+                for kernel, threshold in zip(kernels, self._column("threshold_value"))
+            ]
+        )
+
+
+SWEEPERS = {
+    "whiteness": WhitenessSweeper,
+    "edge-density": EdgeDensitySweeper,
+    "segments-sharpness": SegmentsSharpnessSweeper,
+    "bright-spots": BrightSpotsSweeper,
+}
+
+
+def sweep(
+    sweeper: ParameterSweeper,
+    source: ImageSource,
+    main_weather: ExperimenterWeather,
+    mode: ExperimenterCompareMode,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """
+    Evaluates every grid point on a dataset and scores how well it separates
+    the main weather from the others.
+
+    Every image is decoded once and processed once per sweeper.
+
+    Args:
+        sweeper: The sweeper with the parameter grid.
+        source: The dataset.
+        main_weather: The weather the hypothesis is about.
+        mode: The expected direction of the main sample against the others.
+        alpha: The significance level.
+
+    Returns:
+        One row per grid point with its parameters, the largest Mann-Whitney and
+        Kolmogorov-Smirnov p-values over the other weathers, the smallest
+        effect size (probability that a main value beats another one) and
+        whether all tests passed; sorted from the best separation.
+    """
+    values = {weather: [] for weather in ExperimenterWeather}
+    for label, _, image in source.labeled_images():
+        if label in values:
+            values[label].append(sweeper.evaluate(image))
+    samples = {
+        weather: np.array(rows).reshape(len(rows), len(sweeper.points))
+        for weather, rows in values.items()
+    }
+
+    rows = []
+    for i, point in enumerate(sweeper.points):
+        mw_pvalues, ks_pvalues, effects = [], [], []
+        for other in ExperimenterWeather:
+            if other == main_weather:
+                continue
+            analyzer = SampleAnalyzer(
+                samples[main_weather][:, i], samples[other][:, i], mode
+            )
+            mw = analyzer.mannwhitneyu()
+            mw_pvalues.append(mw.pvalue)
+            ks_pvalues.append(analyzer.ks_2samp().pvalue)
+            effect = mw.statistic / (len(analyzer.sample1) * len(analyzer.sample2))
+            effects.append(
+                effect if mode == ExperimenterCompareMode.GREATER else 1 - effect
+            )
+        rows.append(
+            {
+                **point,
+                "mannwhitneyu_pvalue": max(mw_pvalues),
+                "ks_pvalue": max(ks_pvalues),
+                "effect_size": min(effects),
+                "passed": max(mw_pvalues) < alpha and max(ks_pvalues) < alpha,
+            }
+        )
+    return (
+        pd.DataFrame(rows)
+        .sort_values(["passed", "effect_size"], ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+def parse_grid(specs: List[str]) -> Dict[str, List[float]]:
+    """
+    Parses "name=v1,v2,..." parameter specifications.
+    """
+    grid = {}
+    for spec in specs:
+        name, values = spec.split("=", 1)
+        grid[name] = [
+            int(value) if value.lstrip("-").isdigit() else float(value)
+            for value in values.split(",")
+        ]
+    return grid
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Sweep processor parameters and score the class separation."
+    )
+    parser.add_argument("processor", choices=sorted(SWEEPERS))
+    parser.add_argument("weather", choices=[w.value for w in ExperimenterWeather])
+    parser.add_argument("mode", choices=[m.value for m in ExperimenterCompareMode])
+    parser.add_argument(
+        "--grid", nargs="*", default=[], help="parameters as name=v1,v2,..."
+    )
+    parser.add_argument("--source", default="weather-data", help="directory or pack")
+    parser.add_argument("--output", help="CSV file for the full table")
+    args = parser.parse_args(argv)
+
+    sweeper = SWEEPERS[args.processor](parse_grid(args.grid) or None)
+    table = sweep(
+        sweeper,
+        open_source(args.source),
+        ExperimenterWeather(args.weather),
+        ExperimenterCompareMode(args.mode),
+    )
+    print(table.head(20).to_string())
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"CSV file saved: {args.output}")
+
+
+# using: cd <project_dir>
+# rye run python -m src.sno_fo_fro.sweep whiteness snow greater --grid value_threshold=180,200,220
+if __name__ == "__main__":
+    sys.exit(main())
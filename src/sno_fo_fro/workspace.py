@@ -0,0 +1,110 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class BufferWorkspace:
+    """
+    Per-thread pool of preallocated arrays used as OpenCV `dst=` and NumPy `out=`
+    targets by the image processors.
+
+    Buffers are keyed by name, shape and dtype and are reused across calls. The
+    workspace is bound to the shape of the image being processed: when a
+    differently sized image arrives, every buffer is released so that a stream of
+    fixed-size frames settles into zero large allocations while a change of
+    resolution does not keep stale memory alive.
+    """
+
+    def __init__(self):
+        self._image_shape: Optional[Tuple[int, ...]] = None
+        self._buffers: Dict[Tuple[str, Tuple[int, ...], np.dtype], np.ndarray] = {}
+
+    def bind(self, image: np.ndarray) -> "BufferWorkspace":
+        """
+        Binds the workspace to the shape of the input image.
+
+        Args:
+            image: The image that is about to be processed.
+
+        Returns:
+            The workspace itself, so the call can be chained.
+        """
+        if image.shape != self._image_shape:
+            self.release()
+            self._image_shape = image.shape
+        return self
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Returns a buffer with the given name, shape and dtype, allocating it on first use.
+
+        The content of the returned array is undefined; callers must overwrite it.
+
+        Args:
+            name: Logical name of the buffer (e.g. "hsv", "sobel_x").
+            shape: Shape of the buffer.
+            dtype: NumPy dtype of the buffer.
+
+        Returns:
+            A C-contiguous array that stays owned by the workspace.
+        """
+        key = (name, tuple(shape), np.dtype(dtype))
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buffer
+        return buffer
+
+    def release(self):
+        """
+        Drops every buffer held by the workspace.
+        """
+        self._buffers.clear()
+        self._image_shape = None
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Total number of bytes currently held by the workspace.
+        """
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+
+_local = threading.local()
+
+
+def get_workspace(image: Optional[np.ndarray] = None) -> BufferWorkspace:
+    """
+    Returns the workspace of the calling thread.
+
+    Args:
+        image: If given, the workspace is bound to the shape of this image.
+
+    Returns:
+        The thread-local BufferWorkspace instance.
+    """
+    workspace = getattr(_local, "workspace", None)
+    if workspace is None:
+        workspace = BufferWorkspace()
+        _local.workspace = workspace
+    if image is not None:
+        workspace.bind(image)
+    return workspace
+
+
+def buffered_var(array: np.ndarray, tmp: np.ndarray) -> np.float64:
+    """
+    Computes the variance of an array like `np.var`, but reuses `tmp` for the
+    centered squares instead of allocating a temporary.
+
+    Args:
+        array: The input array.
+        tmp: A float64 array with the same shape as `array`.
+
+    Returns:
+        The population variance of all elements of `array`.
+    """
+    np.subtract(array, array.mean(), out=tmp)
+    np.multiply(tmp, tmp, out=tmp)
+    return tmp.sum() / tmp.size
@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.admission import (
+    AdaptiveController,
+    AdmissionService,
+    QualityTier,
+    cheap_metrics,
+    replay,
+)
+from sno_fo_fro.classifier import MockImageClassifier
+
+TIERS = (QualityTier.FULL, QualityTier.REDUCED, QualityTier.CHEAP)
+
+
+def test_controller_degrades_with_queue_and_wait():
+    controller = AdaptiveController(slo=1.0, tiers=TIERS)
+    controller.record(QualityTier.FULL, 0.4, 0.4)
+    controller.record(QualityTier.REDUCED, 0.1, 0.1)
+    controller.record(QualityTier.CHEAP, 0.01, 0.01)
+
+    assert controller.choose(0.0, 0) == QualityTier.FULL
+    # Ten requests behind would take 4 s at full quality
+    assert controller.choose(0.0, 10) == QualityTier.REDUCED
+    assert controller.choose(0.0, 50) == QualityTier.CHEAP
+    assert controller.choose(0.95, 0) == QualityTier.CHEAP
+    assert controller.choose(1.5, 0) == QualityTier.REJECT
+
+
+def test_controller_ceiling_follows_latency_percentile():
+    controller = AdaptiveController(slo=1.0, tiers=TIERS, cooldown=10)
+    for _ in range(10):
+        controller.record(QualityTier.FULL, 0.1, 2.0)
+    assert controller.ceiling == 1
+    assert controller.choose(0.0, 0) == QualityTier.REDUCED
+
+    for _ in range(10):
+        controller.record(QualityTier.REDUCED, 0.1, 0.1)
+    assert controller.ceiling == 0
+
+
+def test_controller_probes_skipped_tiers():
+    controller = AdaptiveController(slo=1.0, tiers=TIERS, probe_interval=5)
+    controller.record(QualityTier.FULL, 1.2, 1.2)
+    controller.record(QualityTier.REDUCED, 0.1, 0.1)
+
+    # Once the load drops, FULL is measured again and recovers
+    chosen = []
+    for _ in range(10):
+        tier = controller.choose(0.0, 0)
+        chosen.append(tier)
+        controller.record(tier, 0.3 if tier == QualityTier.FULL else 0.1, 0.3)
+    assert chosen[:4] == [QualityTier.REDUCED] * 4
+    assert chosen[4] == QualityTier.FULL
+    assert controller.choose(0.0, 0) == QualityTier.FULL
+
+    # Requests waiting in the queue are never used as probes
+    controller.record(QualityTier.FULL, 5.0, 5.0)
+    controller.record(QualityTier.FULL, 5.0, 5.0)
+    assert all(controller.choose(0.0, 1) != QualityTier.FULL for _ in range(20))
+
+
+@pytest.fixture
+def images(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(30):
+        img = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        path = str(tmp_path / f"{i}.jpg")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def test_every_response_is_tagged(images):
+    assert set(cheap_metrics(images[0])) == {
+        "WHITENESS",
+        "CONTRAST",
+        "SATURATION",
+        "COLDNESS",
+    }
+
+    service = AdmissionService(MockImageClassifier(), workers=2)
+    result = service.classify(images[0])
+    assert result.tier == QualityTier.FULL
+    assert result.label is not None
+    service.close()
+
+    # A burst far beyond the capacity degrades instead of queueing
+    controller = AdaptiveController(slo=0.05, tiers=TIERS)
+    service = AdmissionService(
+        MockImageClassifier(),
+        controller,
+        workers=2,
+        cheap_classifier=MockImageClassifier(),
+    )
+    results = replay(service, images, rate=10000)
+    service.close()
+    tiers = {result.tier for result in results}
+    assert tiers - {QualityTier.FULL}
+    for result in results:
+        assert (result.label is None) == (result.tier == QualityTier.REJECT)
+
+
+def test_cheap_tier_requires_its_model():
+    with pytest.raises(ValueError):
+        AdmissionService(MockImageClassifier(), AdaptiveController(tiers=TIERS))
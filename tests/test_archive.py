@@ -0,0 +1,81 @@
+import os
+import tarfile
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.dataset import ArchiveSource, DirectorySource, open_source
+from sno_fo_fro.experiment.experimenter import Experimenter
+from sno_fo_fro.hypotheses import ImageContrastProcessor
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    for label in ("snow", "fogsmog", "frost"):
+        os.makedirs(tmp_path / "data" / label)
+        for i in range(3):
+            h, w = rng.integers(30, 60, 2)
+            img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+            ext = "png" if i % 2 else "jpg"
+            cv2.imwrite(str(tmp_path / "data" / label / f"{i}.{ext}"), img)
+        (tmp_path / "data" / label / "notes.txt").write_text("not an image")
+    return str(tmp_path / "data")
+
+
+def make_archive(dataset, archive_path):
+    if archive_path.endswith(".zip"):
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            for root, _, files in os.walk(dataset):
+                for name in files:
+                    path = os.path.join(root, name)
+                    archive.write(path, os.path.relpath(path, os.path.dirname(dataset)))
+    else:
+        mode = "w:gz" if archive_path.endswith(".gz") else "w"
+        with tarfile.open(archive_path, mode) as archive:
+            archive.add(dataset, arcname="data")
+    return archive_path
+
+
+def by_name(results):
+    return {
+        (label, os.path.basename(path)): value
+        for label, values in results.items()
+        for path, value in values.items()
+    }
+
+
+@pytest.mark.parametrize("name", ["data.tar", "data.tar.gz", "data.zip"])
+def test_archive_matches_directory(dataset, tmp_path, name):
+    archive_path = make_archive(dataset, str(tmp_path / name))
+    source = open_source(archive_path)
+    assert isinstance(source, ArchiveSource)
+
+    from_archive = ImageAnalyzer.process_source(source)
+    from_dir = ImageAnalyzer.process_source(DirectorySource(dataset))
+    from_archive, from_dir = by_name(from_archive), by_name(from_dir)
+    assert from_archive.keys() == from_dir.keys()
+    for key, metrics in from_dir.items():
+        # Same pixels, same metrics: the kernels do not depend on the buffer
+        assert from_archive[key] == metrics
+    assert len(from_archive) == 9
+    assert len(list(source.images("frost"))) == 3
+
+
+def test_experimenter_reads_archive_shards(dataset, tmp_path):
+    shards = []
+    for label in ("snow", "fogsmog", "frost"):
+        shard = str(tmp_path / f"{label}.tar")
+        with tarfile.open(shard, "w") as archive:
+            archive.add(os.path.join(dataset, label), arcname=label)
+        shards.append(shard)
+
+    from_dir = Experimenter(ImageContrastProcessor(), dataset)
+    from_archive = Experimenter(ImageContrastProcessor(), source=ArchiveSource(shards))
+    for weather, sample in from_dir.weather_samples.items():
+        assert sorted(sample) == pytest.approx(
+            sorted(from_archive.weather_samples[weather])
+        )
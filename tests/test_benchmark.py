@@ -0,0 +1,54 @@
+import json
+import os
+
+from sno_fo_fro.scripts.benchmark import main
+
+
+def run_benchmark(tmp_path, *args):
+    output_dir = str(tmp_path / "benchmarks")
+    main(["--mock", "--output-dir", output_dir, "--label", "test", *args])
+    (report_path,) = os.listdir(output_dir)
+    with open(os.path.join(output_dir, report_path), "r") as f:
+        return json.load(f)
+
+
+def test_mock_run_on_synthetic_images(tmp_path):
+    report = run_benchmark(
+        tmp_path,
+        "--synthetic-count",
+        "3",
+        "--synthetic-size",
+        "48",
+        "64",
+        "--requests",
+        "6",
+        "--concurrency",
+        "2",
+    )
+
+    assert report["requests"] == 6 and report["failed"] == 0
+    assert set(report["stages"]) == {"decode", "analyze", "predict", "service", "total"}
+    assert report["meta"]["classifier"] == "mock"
+
+
+def test_runs_without_completed_requests(tmp_path):
+    report = run_benchmark(
+        tmp_path,
+        "--synthetic-count",
+        "1",
+        "--synthetic-size",
+        "48",
+        "64",
+        "--requests",
+        "0",
+    )
+    assert report["requests"] == 0 and report["stages"] == {}
+
+    corpus = tmp_path / "corpus"
+    os.makedirs(corpus)
+    (corpus / "broken.jpg").write_bytes(b"not a jpeg")
+    report = run_benchmark(
+        tmp_path / "broken", "--corpus", str(corpus), "--requests", "3"
+    )
+    assert report["requests"] == 0 and report["failed"] == 3
+    assert report["errors"] == {"Could not read image": 3}
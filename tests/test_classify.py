@@ -0,0 +1,78 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.classifier import MockImageClassifier
+from sno_fo_fro.classify import BatchClassifier, collect_paths, read_checkpoint
+
+
+@pytest.fixture
+def images(tmp_path):
+    rng = np.random.default_rng(0)
+    os.makedirs(tmp_path / "data" / "b")
+    paths = []
+    for name in ("data/a.png", "data/b/c.jpg", "data/b/d.PNG"):
+        path = str(tmp_path / name)
+        cv2.imwrite(path, rng.integers(0, 256, (40, 50, 3), dtype=np.uint8))
+        paths.append(path)
+    with open(tmp_path / "data" / "notes.txt", "w") as f:
+        f.write("not an image")
+    return paths
+
+
+def read_records(output_path):
+    with open(output_path, "r") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_collect_paths(images, tmp_path):
+    manifest = str(tmp_path / "manifest.txt")
+    with open(manifest, "w") as f:
+        f.write("# comment\n\nextra.jpg\n")
+
+    paths = list(collect_paths([str(tmp_path / "data"), "single.png"], manifest))
+    assert paths == images + ["single.png", "extra.jpg"]
+
+
+def test_resume_after_truncated_line(images, tmp_path):
+    output_path = str(tmp_path / "out.jsonl")
+    batch = BatchClassifier(MockImageClassifier(), jobs=1)
+    assert batch.run(images, output_path) == 3
+
+    # An interrupted run leaves the last line unfinished
+    with open(output_path, "rb+") as f:
+        f.truncate(os.path.getsize(output_path) - 10)
+    assert read_checkpoint(output_path) == set(images[:2])
+
+    assert batch.run(images, output_path) == 1
+    records = read_records(output_path)
+    assert [record["path"] for record in records] == images
+    assert all(record["class"] is not None for record in records)
+
+
+def test_errors_are_retried(images, tmp_path):
+    output_path = str(tmp_path / "out.jsonl")
+    broken = str(tmp_path / "data" / "broken.jpg")
+    with open(broken, "wb") as f:
+        f.write(b"not a jpeg")
+    batch = BatchClassifier(MockImageClassifier(), jobs=1)
+    assert batch.run(images + [broken], output_path) == 4
+    assert {"path": broken, "error": "Could not read image"} in read_records(
+        output_path
+    )
+    assert read_checkpoint(output_path) == set(images)
+
+    cv2.imwrite(broken, np.zeros((40, 50, 3), dtype=np.uint8))
+    assert batch.run(images + [broken], output_path) == 1
+    assert "class" in read_records(output_path)[-1]
+    assert read_checkpoint(output_path) == set(images + [broken])
+
+
+def test_in_process_run_restores_opencv_threads(images, tmp_path):
+    previous = cv2.getNumThreads()
+    batch = BatchClassifier(MockImageClassifier(), jobs=1, cv_threads=previous + 1)
+    assert batch.run(images[:1], str(tmp_path / "out.jsonl")) == 1
+    assert cv2.getNumThreads() == previous
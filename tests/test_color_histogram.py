@@ -0,0 +1,105 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.color_histogram import ColorHistogram, histogram_metric_for
+from sno_fo_fro.hypotheses import (
+    ImageBrightSpotsProcessor,
+    ImageColdnessProcessor,
+    ImageContrastProcessor,
+    ImageLuminanceProcessor,
+    ImageSaturationProcessor,
+    ImageWhitenessProcessor,
+)
+
+
+def make_image(seed, h=61, w=83):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    cv2.circle(image, (w // 2, h // 2), min(h, w) // 4, (255, 255, 250), -1)
+    return image
+
+
+def test_metrics_match_processors():
+    image = make_image(0)
+    histogram = ColorHistogram.from_image(image, bright_kernels=(5, 15))
+
+    for value, saturation in ((200, 50), (180.5, 20.5), (0, 255), (256, -1)):
+        processor = ImageWhitenessProcessor(value, saturation)
+        assert histogram.whiteness(value, saturation) == processor.process_image(image)
+    assert histogram.saturation() == pytest.approx(
+        ImageSaturationProcessor().process_image(image), rel=1e-12
+    )
+    assert histogram.brightness() == pytest.approx(
+        ImageLuminanceProcessor(use_brightness=True).process_image(image), rel=1e-12
+    )
+    assert histogram.luminance() == pytest.approx(
+        ImageLuminanceProcessor().process_image(image), rel=1e-12
+    )
+    assert histogram.coldness() == ImageColdnessProcessor().process_image(image)
+    for kernel in (5, 15):
+        for threshold in (-10, 0, 20, 37.5):
+            processor = ImageBrightSpotsProcessor(kernel, threshold)
+            assert histogram.bright_spots(threshold, kernel) == pytest.approx(
+                processor.process_image(image)
+            )
+    assert set(histogram.metrics()) == {
+        "WHITENESS",
+        "SATURATION",
+        "COLDNESS",
+        "BRIGHT_SPOTS",
+    }
+
+
+def test_analyzer_derives_colour_metrics():
+    image = make_image(3, h=97, w=131)
+    expected = {
+        metric.name: metric.img_proc.process_image(image)
+        for metric in ImageAnalyzer.metrics
+    }
+    metrics = ImageAnalyzer.process_image(image)
+
+    assert list(metrics) == list(expected)
+    for name, value in expected.items():
+        assert type(metrics[name]) is type(value), name
+        assert metrics[name] == pytest.approx(value, rel=1e-12), name
+
+    assert histogram_metric_for(ImageContrastProcessor()) is None
+    assert histogram_metric_for(ImageLuminanceProcessor(use_brightness=True))(
+        ColorHistogram.from_image(image)
+    ) == pytest.approx(
+        ImageLuminanceProcessor(use_brightness=True).process_image(image), rel=1e-12
+    )
+
+
+def test_black_image():
+    histogram = ColorHistogram.from_image(np.zeros((40, 60, 3), np.uint8))
+    assert np.isnan(histogram.coldness())
+    assert histogram.whiteness() == 0
+    assert histogram.bright_spots() == 0
+
+
+def test_merge_and_serialize():
+    images = [make_image(1), make_image(2, 40, 40)]
+    merged = ColorHistogram()
+    for image in images:
+        merged.merge(ColorHistogram.from_image(image))
+    assert merged.pixels == sum(i.shape[0] * i.shape[1] for i in images)
+
+    # Merging equals one histogram over the pixels of both images
+    mosaic = np.concatenate([images[0][:40, :40], images[1]], axis=1)
+    tiles = ColorHistogram().merge(ColorHistogram.from_image(mosaic[:, :40]))
+    tiles.merge(ColorHistogram.from_image(mosaic[:, 40:]))
+    assert tiles.whiteness() == ColorHistogram.from_image(mosaic).whiteness()
+
+    restored = ColorHistogram.from_dict(json.loads(json.dumps(merged.to_dict())))
+    assert np.array_equal(restored.sv, merged.sv)
+    assert restored.metrics() == merged.metrics()
+
+    with pytest.raises(ValueError):
+        merged.merge(ColorHistogram(bright_kernels=(5,)))
+    with pytest.raises(ValueError):
+        merged.bright_spots(20, kernel_size=5)
@@ -0,0 +1,190 @@
+import numpy as np
+import pytest
+
+from sno_fo_fro.classifier import ImageClassifier
+from sno_fo_fro.color_histogram import ColorHistogram
+from sno_fo_fro.conformance import (
+    AnalyzerEngine,
+    ConformanceEngine,
+    HistogramEngine,
+    JpegReducedEngine,
+    ProcessorsEngine,
+    SamplingEngine,
+    SweepEngine,
+    StreamEngine,
+    Tolerance,
+    check_engine,
+    format_report,
+    generate_corpus,
+    reference_metrics,
+)
+from sno_fo_fro import conformance
+from sno_fo_fro.hypotheses import ImageColdnessProcessor, ImageLuminanceProcessor
+from sno_fo_fro.jpeg_fast import JpegCalibration
+
+
+class ThresholdClassifier(ImageClassifier):
+    """
+    A deterministic classifier splitting the images by a few of their metrics.
+    """
+
+    def classify(self, image_params):
+        if image_params["WHITENESS"] > 0.3:
+            return "snow"
+        if image_params["BRIGHT_SPOTS"] > 0.05:
+            return "rain"
+        return "sun" if image_params["SATURATION"] > 80 else "fog"
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return generate_corpus(seed=0)
+
+
+def test_corpus_covers_edge_cases(corpus):
+    shapes = {image.shape[:2] for _, image in corpus}
+    assert {(1, 1), (1, 64), (64, 1), (20, 20), (21, 21)} <= shapes
+    # Odd sizes leave partial tiles and segments
+    assert any(h % 2 and w % 2 and h > 100 for h, w in shapes)
+    assert all(image.dtype == np.uint8 and image.shape[2] == 3 for _, image in corpus)
+
+    reference = reference_metrics(corpus[0][1])
+    assert reference["WHITENESS"] is not None
+    failing = dict(corpus)["edge-1x1"]
+    assert reference_metrics(failing)["SEGMENTS_SHARPNESS"] is None
+    # NaN (COLDNESS of a black image) is not a value either
+    assert reference_metrics(dict(corpus)["black-40x40"])["COLDNESS"] is None
+
+
+def test_reference_is_frozen():
+    # The reference must not share code with the processors optimized in place
+    assert conformance.REFERENCE_METRICS["COLDNESS"].__class__ is not (
+        ImageColdnessProcessor
+    )
+    for name, processor in conformance.ANALYZER_METRICS.items():
+        assert processor is not conformance.REFERENCE_METRICS[name]
+    for name, processor in conformance.LUMINANCE_METRICS.items():
+        reference = conformance.REFERENCE_PROCESSORS[name]
+        assert reference.__class__ is not processor.__class__
+        assert reference.use_brightness == processor.use_brightness
+
+
+class DriftedColdnessProcessor(ImageColdnessProcessor):
+    def process_image(self, image):
+        return super().process_image(image) * np.float32(1.001)
+
+
+def test_drift_of_processors_is_reported(corpus, monkeypatch):
+    monkeypatch.setitem(
+        conformance.ANALYZER_METRICS, "COLDNESS", DriftedColdnessProcessor()
+    )
+    result = check_engine(ProcessorsEngine(), corpus)
+
+    assert [v.split(":")[0] for v in result.violations()] == ["COLDNESS"]
+
+
+class DriftedLuminanceProcessor(ImageLuminanceProcessor):
+    def process_image(self, image):
+        return super().process_image(image) + 0.01
+
+
+def test_drift_of_luminance_is_reported(corpus, monkeypatch):
+    monkeypatch.setitem(
+        conformance.LUMINANCE_METRICS,
+        "BRIGHTNESS",
+        DriftedLuminanceProcessor(use_brightness=True),
+    )
+    result = check_engine(ProcessorsEngine(), corpus)
+
+    assert [v.split(":")[0] for v in result.violations()] == ["BRIGHTNESS"]
+    assert result.metrics["LUMINANCE"].passed
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [
+        ProcessorsEngine(),
+        AnalyzerEngine(),
+        HistogramEngine(),
+        SweepEngine(),
+        SamplingEngine(),
+        StreamEngine(),
+    ],
+    ids=lambda engine: engine.name,
+)
+def test_engines_conform_to_reference(engine, corpus):
+    result = check_engine(engine, corpus, ThresholdClassifier())
+
+    assert result.violations() == [], format_report({engine.name: result})
+    assert result.errors == []
+    assert set(result.metrics) == set(engine.metrics)
+    assert all(m.compared >= len(corpus) - 6 for m in result.metrics.values())
+    assert result.agreement is not None
+
+
+class BiasedEngine(ConformanceEngine):
+    name = "biased"
+    metrics = ("WHITENESS", "SATURATION")
+
+    def process(self, image):
+        histogram = ColorHistogram.from_image(image)
+        return {
+            "WHITENESS": histogram.whiteness(),
+            "SATURATION": histogram.saturation() / 2,
+        }
+
+
+def test_deviations_are_reported(corpus):
+    result = check_engine(
+        BiasedEngine(),
+        corpus,
+        ThresholdClassifier(),
+        tolerances={"*": Tolerance(1e-9, 1e-9)},
+        min_agreement=1.0,
+    )
+
+    assert result.metrics["WHITENESS"].passed
+    saturation = result.metrics["SATURATION"]
+    assert not saturation.passed
+    assert saturation.abs_errors[2] > 80
+    assert (
+        saturation.abs_errors[0] <= saturation.abs_errors[1] <= saturation.abs_errors[2]
+    )
+    assert result.agreement < 1.0
+    assert len(result.violations()) == 2
+
+    # A loose enough tolerance accepts the same errors
+    loose = check_engine(BiasedEngine(), corpus, tolerances={"*": Tolerance(0.0, 0.5)})
+    assert loose.violations() == []
+    assert loose.agreement is None
+
+
+class FailingEngine(ConformanceEngine):
+    name = "failing"
+    metrics = ("COLDNESS",)
+
+    def process(self, image):
+        if image.shape[0] < 30:
+            raise RuntimeError("too small")
+        return {"COLDNESS": ColorHistogram.from_image(image).coldness()}
+
+
+def test_engine_failures_are_reported(corpus):
+    result = check_engine(FailingEngine(), corpus)
+
+    failed = {case for case, _ in result.errors}
+    assert "edge-1x1" in failed and "edge-64x1" not in failed
+    assert result.metrics["COLDNESS"].missing == len(failed)
+    assert not result.metrics["COLDNESS"].passed
+    # The NaN COLDNESS of the black image is not a value in both
+    assert "black-40x40" not in failed
+
+
+def test_jpeg_engine_compares_with_full_decode(corpus):
+    engine = JpegReducedEngine(JpegCalibration({2: {}, 4: {}}))
+    result = check_engine(engine, corpus, tolerances={"*": Tolerance(1e-9, 1e-9)})
+
+    assert result.errors == []
+    # Images too small to reduce are decoded in full and match up to rounding
+    assert all(m.rel_errors[0] < 1e-6 for m in result.metrics.values())
+    assert any(not m.passed for m in result.metrics.values())
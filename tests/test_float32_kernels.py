@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.hypotheses import (
+    ImageBrightSpotsProcessor,
+    ImageLuminanceProcessor,
+    ImageWhiteGradientProcessor,
+)
+
+
+def photo_like(seed, h=240, w=320):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, (h // 16, w // 16, 3), dtype=np.uint8)
+    img = cv2.resize(img, (w, h), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 10, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def luminance_f64(image):
+    b, g, r = (image[:, :, i].astype(np.float64) for i in range(3))
+    return np.mean(0.2126 * r + 0.7152 * g + 0.0722 * b)
+
+
+def white_gradient_f64(image):
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    s = hsv[:, :, 1].astype(np.float64)
+    v = hsv[:, :, 2].astype(np.float64)
+    magnitudes = []
+    for channel in (s, v):
+        gx = cv2.Sobel(channel, cv2.CV_64F, 1, 0, ksize=3)
+        gy = cv2.Sobel(channel, cv2.CV_64F, 0, 1, ksize=3)
+        magnitudes.append(np.sqrt(gx**2 + gy**2))
+    return np.std(magnitudes[0] * magnitudes[1] * (v / np.maximum(s, 1)))
+
+
+def bright_spots_f64(image, kernel_size, threshold):
+    v = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)[:, :, 2]
+    local_avg = cv2.blur(v, (kernel_size, kernel_size))
+    return np.mean(v.astype(np.float64) - local_avg > threshold)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_luminance_matches_float64(seed):
+    img = photo_like(seed)
+    assert ImageLuminanceProcessor().process_image(img) == pytest.approx(
+        luminance_f64(img), rel=1e-9
+    )
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_white_gradient_within_tolerance(seed):
+    img = photo_like(seed)
+    assert ImageWhiteGradientProcessor().process_image(img) == pytest.approx(
+        white_gradient_f64(img), rel=1e-4
+    )
+
+
+@pytest.mark.parametrize("threshold", [-5, 0, 20, 20.5])
+def test_bright_spots_exact(threshold):
+    img = photo_like(7)
+    processor = ImageBrightSpotsProcessor(15, threshold)
+    assert processor.process_image(img) == bright_spots_f64(img, 15, threshold)
+
+
+@pytest.mark.parametrize("offset", [1, 3, 8, 13])
+def test_results_do_not_depend_on_buffer_alignment(offset):
+    img = photo_like(3, 101, 77)
+    buffer = np.empty(img.nbytes + 16, dtype=np.uint8)
+    shifted = buffer[offset : offset + img.nbytes].reshape(img.shape)
+    shifted[...] = img
+
+    assert ImageAnalyzer.process_image(shifted) == ImageAnalyzer.process_image(img)
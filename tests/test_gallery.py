@@ -0,0 +1,65 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from sno_fo_fro.classifier import MockImageClassifier  # noqa: E402
+from sno_fo_fro.gallery import GalleryModel, GalleryView, list_images  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def folder(tmp_path):
+    image = np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+    cv2.imwrite(str(tmp_path / "a.jpg"), image)
+    (tmp_path / "broken.jpg").write_bytes(b"not a jpeg")
+    return tmp_path
+
+
+def test_unreadable_thumbnail_is_not_retried(app, folder):
+    model = GalleryModel(list_images(str(folder)), MockImageClassifier())
+    submitted = []
+    model.thumbnails.stop()
+    model.thumbnails.submit = lambda path, priority: submitted.append(path)
+    try:
+        broken = model.index(model.rows[str(folder / "broken.jpg")])
+        assert model.data(broken, Qt.DecorationRole) is None
+        assert len(submitted) == 1
+
+        # The worker reports the failure; the repaint must not decode it again
+        model._load_thumbnails(submitted)
+        app.processEvents()
+        assert model.data(broken, Qt.DecorationRole) is None
+        assert len(submitted) == 1
+
+        readable = model.index(model.rows[str(folder / "a.jpg")])
+        model.data(readable, Qt.DecorationRole)
+        model._load_thumbnails(submitted[1:])
+        app.processEvents()
+        assert not model.data(readable, Qt.DecorationRole).isNull()
+    finally:
+        model.stop()
+
+
+def test_closed_gallery_stops_its_workers(app, folder):
+    view = GalleryView(str(folder), MockImageClassifier())
+    closed = []
+    view.closed.connect(lambda: closed.append(True))
+    view.show()
+    view.close()
+
+    assert closed == [True]
+    view.model.thumbnails.join(timeout=5)
+    view.model.classification.join(timeout=5)
+    assert not view.model.thumbnails.is_alive()
+    assert not view.model.classification.is_alive()
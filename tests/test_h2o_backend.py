@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from sno_fo_fro.h2o_backend import SharedH2OBackend
+from sno_fo_fro.models import ModelRegistry
+
+
+class FakeServer:
+    """
+    Stands in for the JVM: a sleeping process whose pid marks the port as healthy.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def launch(self, port, log_path):
+        process = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(60)"],
+            start_new_session=True,
+        )
+        with open(os.path.join(self.root, f"server-{port}"), "w") as f:
+            f.write(str(process.pid))
+        with open(os.path.join(self.root, "launches"), "a") as f:
+            f.write(f"{process.pid}\n")
+        return process
+
+    def health_check(self, url):
+        port = url.rsplit(":", 1)[1]
+        try:
+            with open(os.path.join(self.root, f"server-{port}"), "r") as f:
+                pid = int(f.read())
+            os.kill(pid, 0)
+        except (OSError, ValueError):
+            return False
+        with open(f"/proc/{pid}/stat", "r") as f:
+            return f.read().split()[2] != "Z"
+
+    def launches(self):
+        with open(os.path.join(self.root, "launches"), "r") as f:
+            return [int(line) for line in f]
+
+
+def make_backend(root, connections=None):
+    server = FakeServer(root)
+    return SharedH2OBackend(
+        os.path.join(root, "state"),
+        port=54999,
+        launcher=server.launch,
+        health_check=server.health_check,
+        connector=lambda url: (
+            connections.append(url) if connections is not None else None
+        ),
+    )
+
+
+def attach(root):
+    return make_backend(root).ensure().pid
+
+
+def test_workers_share_one_backend(tmp_path):
+    root = str(tmp_path)
+    with ProcessPoolExecutor(4) as pool:
+        pids = list(pool.map(attach, [root] * 8))
+    server = FakeServer(root)
+    assert len(server.launches()) == 1
+    assert set(pids) == set(server.launches())
+
+    make_backend(root).shutdown(timeout=5)
+    assert not server.health_check("http://127.0.0.1:54999")
+    assert not os.path.exists(os.path.join(root, "state", "backend.json"))
+
+
+def test_reconnect_after_restart(tmp_path):
+    root = str(tmp_path)
+    connections = []
+    backend = make_backend(root, connections)
+    loads = []
+    registry = backend.registry()
+    registry.loader = lambda path: loads.append(path) or object()
+
+    first = backend.connect()
+    backend.connect()
+    assert len(connections) == 1
+    registry.get("model")
+
+    # The backend dies during a call; it is started again and the call retried
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            os.kill(first.pid, 9)
+            os.waitpid(first.pid, 0)
+            raise ConnectionError("backend is gone")
+        return "ok"
+
+    assert backend.call(call) == "ok"
+    assert backend.connect().pid != first.pid
+    assert len(connections) == 2
+    # Models of the dead backend are loaded again
+    assert registry.loaded == []
+    registry.get("model")
+    assert len(loads) == 2
+    backend.shutdown(timeout=5)
+
+
+def test_errors_of_a_healthy_backend_are_raised(tmp_path):
+    backend = make_backend(str(tmp_path))
+
+    def fail():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        backend.call(fail)
+    assert isinstance(backend.registry(), ModelRegistry)
+    backend.shutdown(timeout=5)
+
+
+def test_calls_do_not_check_the_backend(tmp_path):
+    backend = make_backend(str(tmp_path))
+    checks = []
+    health_check = backend.health_check
+    backend.health_check = lambda url: checks.append(url) or health_check(url)
+    backend.connect()
+    checks.clear()
+
+    assert [backend.call(lambda: i) for i in range(100)] == list(range(100))
+    assert checks == []
+
+    # Once the interval is over, the backend is checked again
+    backend.check_interval = 0.0
+    backend.call(lambda: None)
+    assert len(checks) == 1
+    backend.shutdown(timeout=5)
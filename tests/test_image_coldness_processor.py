@@ -0,0 +1,35 @@
+import numpy as np
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.hypotheses import ImageColdnessProcessor
+from utils import EPS
+
+
+def test_black_image():
+    processor = ImageColdnessProcessor()
+    black_img = np.zeros((100, 100, 3), dtype=np.uint8)
+    result = processor.process_image(black_img)
+    assert np.isnan(result)
+
+
+def test_black_image_analysis():
+    # A dark frame (night camera, covered lens) must not stop the analysis
+    black_img = np.zeros((100, 100, 3), dtype=np.uint8)
+    metrics = ImageAnalyzer.process_image(black_img)
+    assert np.isnan(metrics["COLDNESS"])
+
+
+def test_blue_image():
+    processor = ImageColdnessProcessor()
+    blue_img = np.zeros((100, 100, 3), dtype=np.uint8)
+    blue_img[:, :] = (255, 0, 0)
+    result = processor.process_image(blue_img)
+    assert abs(result - 1) < EPS
+
+
+def test_red_image():
+    processor = ImageColdnessProcessor()
+    red_img = np.zeros((100, 100, 3), dtype=np.uint8)
+    red_img[:, :] = (0, 0, 255)
+    result = processor.process_image(red_img)
+    assert abs(result + 1) < EPS
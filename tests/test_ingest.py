@@ -0,0 +1,128 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro import ingest
+from sno_fo_fro.classifier import MockImageClassifier, WeatherClass
+from sno_fo_fro.ingest import HighWaterMark, IngestDaemon
+
+
+def write_image(path, seed=0):
+    image = np.random.default_rng(seed).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    cv2.imwrite(str(path), image)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ingest.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_daemon(tmp_path, settle_seconds=0.0):
+    drop = tmp_path / "drop"
+    drop.mkdir(exist_ok=True)
+    daemon = IngestDaemon(
+        [str(drop)],
+        MockImageClassifier(),
+        state_path=str(tmp_path / "state.json"),
+        output_path=str(tmp_path / "results.jsonl"),
+        settle_seconds=settle_seconds,
+    )
+    return daemon, drop
+
+
+def read_results(tmp_path):
+    with open(tmp_path / "results.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_high_water_mark(tmp_path):
+    state_path = str(tmp_path / "state.json")
+    mark = HighWaterMark(state_path)
+    a, b, c = (10, "/d/a.jpg"), (20, "/d/b.jpg"), (30, "/d/c.jpg")
+
+    # b is done while a is still pending: the mark cannot pass a
+    mark.commit(b, oldest_pending=a)
+    assert mark.mark == (0, "")
+    assert mark.is_processed(b) and not mark.is_processed(a)
+
+    mark.commit(a, oldest_pending=c)
+    assert mark.mark == b and mark.done == {}
+    assert mark.is_processed(a) and mark.is_processed(b)
+    assert not mark.is_processed(c)
+    # A file rewritten later gets a new change time and is processed again
+    assert not mark.is_processed((25, "/d/b.jpg"))
+
+    restored = HighWaterMark(state_path)
+    assert restored.mark == b and restored.is_processed(a)
+
+
+def test_files_are_processed_once_settled(tmp_path, clock):
+    daemon, drop = make_daemon(tmp_path, settle_seconds=2.0)
+    write_image(drop / "a.jpg")
+
+    assert daemon.run_once() == 0
+    assert daemon.backlog == 1
+
+    # Still being written: the settle time starts over
+    clock[0] += 1.5
+    write_image(drop / "a.jpg", seed=1)
+    with open(drop / "a.jpg", "ab") as f:
+        f.write(b"\0")
+    assert daemon.run_once() == 0
+    clock[0] += 1.5
+    assert daemon.run_once() == 0
+
+    clock[0] += 1.0
+    assert daemon.run_once() == 1
+    assert daemon.backlog == 0
+    assert daemon.run_once() == 0
+
+
+def test_run_once_writes_labels(tmp_path):
+    daemon, drop = make_daemon(tmp_path)
+    write_image(drop / "a.jpg")
+    write_image(drop / "b.png", seed=1)
+    (drop / "broken.jpg").write_bytes(b"not a jpeg")
+    (drop / "notes.txt").write_text("ignored")
+
+    assert daemon.run_once() == 3
+    results = {record["path"]: record for record in read_results(tmp_path)}
+    assert len(results) == 3
+    assert daemon.processed == 2 and daemon.failed == 1
+
+    record = results[str(drop / "a.jpg")]
+    assert record["class"] in list(WeatherClass)
+    assert "\n" not in record["class"]
+    assert record["probabilities"][record["class"]] == 1.0
+    assert set(record["metrics"]) == set(daemon.analyzer.metric_names)
+    assert "error" in results[str(drop / "broken.jpg")]
+
+    # A restarted daemon skips everything that was processed
+    restarted, _ = make_daemon(tmp_path)
+    assert restarted.run_once() == 0
+    write_image(drop / "c.jpg", seed=2)
+    assert restarted.run_once() == 1
+    assert len(read_results(tmp_path)) == 4
+
+
+def test_missing_directory_is_skipped(tmp_path, capsys):
+    share = tmp_path / "share"
+    share.mkdir()
+    daemon, drop = make_daemon(tmp_path)
+    daemon.dir_paths.append(str(share))
+    write_image(drop / "a.jpg")
+
+    # The share is unmounted: the drop directory is still processed
+    share.rmdir()
+    assert daemon.run_once() == 1
+    assert daemon.run_once() == 0
+    assert capsys.readouterr().out.count("Cannot read") == 1
+
+    share.mkdir()
+    write_image(share / "b.jpg")
+    assert daemon.run_once() == 1
+    assert "readable again" in capsys.readouterr().out
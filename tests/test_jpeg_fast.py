@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.jpeg_fast import JpegCalibration, JpegFastAnalyzer, calibrate
+
+
+def write_jpegs(tmp_path, count, size, seed=0):
+    rng = np.random.default_rng(seed)
+    h, w = size
+    paths = []
+    for i in range(count):
+        coarse = rng.integers(0, 256, (h // 40, w // 40, 3), dtype=np.uint8)
+        img = cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC)
+        noise = rng.normal(0, rng.uniform(1, 15), img.shape)
+        img = np.clip(img + noise, 0, 255).astype(np.uint8)
+        path = str(tmp_path / f"{seed}_{i}.jpg")
+        cv2.imwrite(path, img)
+        paths.append(path)
+    return paths
+
+
+def test_calibration_reduces_error_and_round_trips(tmp_path):
+    paths = write_jpegs(tmp_path, 8, (600, 800))
+    calibration, report = calibrate(paths, (2, 4))
+    for name in ("BLURRINESS", "WHITE_GRADIENT"):
+        assert report[4][name]["calibrated_error"] < report[4][name]["raw_error"]
+
+    calibration.save(str(tmp_path / "calibration.json"))
+    loaded = JpegCalibration.load(str(tmp_path / "calibration.json"))
+    fast = JpegFastAnalyzer(loaded, factor=4)
+    estimate = fast.process_image_by_path(paths[0])
+    expected = JpegFastAnalyzer(calibration, factor=4).process_image_by_path(paths[0])
+    assert estimate == pytest.approx(expected)
+    assert set(estimate) == set(ImageAnalyzer.process_image_by_path(paths[0]))
+
+
+def test_small_images_are_analyzed_exactly(tmp_path):
+    (path,) = write_jpegs(tmp_path, 1, (120, 160))
+    calibration, _ = calibrate(write_jpegs(tmp_path, 3, (600, 800), seed=1), (2, 4))
+    fast = JpegFastAnalyzer(calibration, factor=4)
+    _, factor = fast.decode(path)
+    assert factor == 1
+    expected = ImageAnalyzer.process_image_by_path(path)
+    assert fast.process_image_by_path(path) == pytest.approx(
+        {name: float(value) for name, value in expected.items()}
+    )
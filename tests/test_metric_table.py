@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.classifier import MockImageClassifier
+from sno_fo_fro.metric_table import MetricTable
+
+
+def test_append_across_chunks():
+    table = MetricTable(["A", "B"], chunk_rows=4)
+    for i in range(10):
+        table.append(f"dir/{i}-снег.jpg", {"A": i, "B": i / 2})
+    table.append("missing.jpg", {"B": 1.0})
+
+    assert len(table) == 11
+    matrix = table.to_numpy()
+    assert matrix.dtype == np.float32 and matrix.shape == (11, 2)
+    assert matrix.flags.f_contiguous
+    assert table.column("A")[:10].tolist() == list(range(10))
+    assert np.isnan(table.column("A")[10])
+    assert table.path(3) == "dir/3-снег.jpg"
+    assert table["dir/7-снег.jpg"] == {"A": 7.0, "B": 3.5}
+    assert list(table)[-1] == "missing.jpg"
+    # Far less than a dict of dicts: 8 bytes of metrics, the path and its offset
+    assert table.nbytes < 11 * (8 + 20 + 8)
+
+    # Appending after a read does not move the rows already read
+    table.append_values("late.jpg", [1.0, 2.0])
+    assert matrix.shape == (11, 2)
+    assert table.row(11) == {"A": 1.0, "B": 2.0}
+    assert "late.jpg" in table
+
+
+def test_views_share_memory():
+    table = MetricTable.from_rows(
+        ["A", "B"], ((f"{i}.png", {"A": i, "B": -i}) for i in range(5))
+    )
+    matrix = table.to_numpy()
+    assert np.shares_memory(table.column("B"), matrix)
+
+    df = table.to_pandas()
+    assert list(df.columns) == ["A", "B"]
+    assert np.shares_memory(df["A"].to_numpy(), matrix)
+    assert table.to_pandas(with_paths=True)["path"].tolist() == table.paths
+
+    other = MetricTable(["A", "B"])
+    other.extend(table)
+    assert other == table
+    with pytest.raises(ValueError):
+        MetricTable(["A"]).extend(table)
+
+
+def test_to_arrow():
+    pa = pytest.importorskip("pyarrow")
+    table = MetricTable.from_rows(["A"], [("x.png", {"A": 1.5}), ("y.png", {"A": 2})])
+    arrow = table.to_arrow()
+    assert arrow.column_names == ["path", "A"]
+    assert arrow.column("path").to_pylist() == ["x.png", "y.png"]
+    assert arrow.column("A").type == pa.float32()
+
+
+def test_analyzer_returns_table(tmp_path):
+    rng = np.random.default_rng(0)
+    for i in range(3):
+        img = rng.integers(0, 256, (40, 50, 3), dtype=np.uint8)
+        cv2.imwrite(str(tmp_path / f"{i}.png"), img)
+
+    table = ImageAnalyzer.process_images_in_dir(str(tmp_path))
+    assert isinstance(table, MetricTable)
+    assert table.columns == ImageAnalyzer.metric_names
+    for path in table:
+        expected = ImageAnalyzer.process_image_by_path(path)
+        assert table[path] == pytest.approx(expected, rel=1e-6)
+
+    predictions = MockImageClassifier().predict_table(table)
+    assert len(predictions) == 3
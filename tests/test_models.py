@@ -0,0 +1,111 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sno_fo_fro import models
+from sno_fo_fro.models import EnsembleMode, ModelRegistry
+
+CLASSES = ["fogsmog", "frost", "snow"]
+
+
+class FakeModel:
+    """
+    Predicts fixed class probabilities for every row.
+    """
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+
+    def predict(self, rows):
+        frame = pd.DataFrame([self.probabilities] * len(rows), columns=CLASSES)
+        frame.insert(0, "predict", CLASSES[int(np.argmax(self.probabilities))])
+        return type("Predictions", (), {"as_data_frame": lambda _: frame})()
+
+
+def make_registry(tmp_path, models_by_name=None, capacity=2):
+    loads, unloads = [], []
+
+    def loader(path):
+        loads.append(path)
+        name = path.rsplit("/", 1)[1]
+        return (models_by_name or {}).get(name) or FakeModel([1.0, 0.0, 0.0])
+
+    registry = ModelRegistry(
+        str(tmp_path), capacity, loader=loader, unloader=unloads.append
+    )
+    return registry, loads, unloads
+
+
+def test_least_recently_used_model_is_evicted(tmp_path):
+    registry, loads, unloads = make_registry(tmp_path)
+    a = registry.get("a")
+    b = registry.get("b")
+    assert registry.get("a") is a
+    registry.get("c")
+
+    assert unloads == [b]
+    assert registry.loaded == [str(tmp_path / "a"), str(tmp_path / "c")]
+    assert registry.get("a") is a
+    assert len(loads) == 3
+
+    registry.clear()
+    assert registry.loaded == []
+    assert unloads == [b]
+
+
+def test_concurrent_gets_load_once(tmp_path):
+    registry, loads, _ = make_registry(tmp_path)
+    loader = registry.loader
+    registry.loader = lambda path: time.sleep(0.05) or loader(path)
+
+    got = []
+    threads = [
+        threading.Thread(target=lambda: got.append(registry.get("a"))) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len({id(model) for model in got}) == 1
+
+
+@pytest.fixture
+def ensemble(tmp_path, monkeypatch):
+    # The rows are passed to the fake models as they are
+    monkeypatch.setattr(models.h2o, "H2OFrame", lambda rows: rows)
+    registry, _, _ = make_registry(
+        tmp_path,
+        {
+            "sure": FakeModel([0.1, 0.1, 0.8]),
+            "unsure": FakeModel([0.5, 0.3, 0.2]),
+        },
+    )
+    return registry
+
+
+def test_mean_ensemble(ensemble):
+    rows = pd.DataFrame({"WHITENESS": [0.1, 0.9]})
+    result = ensemble.ensemble_proba(rows, ["sure", "unsure"])
+
+    assert list(result.columns) == ["predict"] + CLASSES
+    assert result[CLASSES].to_numpy() == pytest.approx(np.array([[0.3, 0.2, 0.5]] * 2))
+    assert list(result["predict"]) == ["snow", "snow"]
+
+
+def test_stacked_ensemble(ensemble):
+    rows = pd.DataFrame({"WHITENESS": [0.1, 0.9]})
+    with pytest.raises(ValueError):
+        ensemble.ensemble_proba(rows, ["sure", "unsure"], EnsembleMode.STACKED)
+
+    # Both models always disagree with the truth, which the meta-model learns
+    table = rows.assign(class_label=["frost", "frost"])
+    combiner = ensemble.fit_stacking(table, ["sure", "unsure"])
+    result = ensemble.ensemble_proba(
+        rows, ["sure", "unsure"], EnsembleMode.STACKED, combiner
+    )
+    assert list(result["predict"]) == ["frost", "frost"]
@@ -0,0 +1,66 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.dataset import DirectorySource, open_source
+from sno_fo_fro.experiment.experimenter import Experimenter
+from sno_fo_fro.hypotheses import ImageContrastProcessor
+from sno_fo_fro.pack import DatasetPack, build_pack
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    for label in ("snow", "fogsmog", "frost"):
+        os.makedirs(tmp_path / "data" / label)
+        for i in range(3):
+            h, w = rng.integers(30, 60, 2)
+            img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+            cv2.imwrite(str(tmp_path / "data" / label / f"{i}.png"), img)
+    return str(tmp_path / "data")
+
+
+def test_pack_views_match_decoded_images(dataset, tmp_path):
+    pack_path = str(tmp_path / "data.pack")
+    assert build_pack(DirectorySource(dataset), pack_path) == 9
+
+    pack = open_source(pack_path)
+    assert isinstance(pack, DatasetPack)
+    for label in pack.labels():
+        for path, image in pack.images(label):
+            assert not image.flags.writeable
+            assert np.array_equal(image, cv2.imread(path))
+            assert ImageAnalyzer.process_image(
+                image
+            ) == ImageAnalyzer.process_image_by_path(path)
+
+
+def test_pack_with_canonical_size(dataset, tmp_path):
+    pack_path = str(tmp_path / "small.pack")
+    build_pack(DirectorySource(dataset), pack_path, size=(20, 30))
+    pack = DatasetPack(pack_path)
+    assert {pack.image(i).shape for i in range(len(pack))} == {(20, 30, 3)}
+
+
+def test_experimenter_reads_pack(dataset, tmp_path):
+    pack_path = str(tmp_path / "data.pack")
+    build_pack(DirectorySource(dataset), pack_path)
+    from_dir = Experimenter(ImageContrastProcessor(), dataset)
+    from_pack = Experimenter(ImageContrastProcessor(), pack_path)
+    for weather, sample in from_dir.weather_samples.items():
+        assert sorted(sample) == pytest.approx(
+            sorted(from_pack.weather_samples[weather])
+        )
+
+
+def test_experimenter_without_samples(dataset):
+    exact = Experimenter(ImageContrastProcessor(), dataset)
+    sketched = Experimenter(ImageContrastProcessor(), dataset, keep_samples=False)
+    assert sketched.weather_samples is None
+    for weather, sample in exact.weather_samples.items():
+        summary = sketched.summaries[weather]
+        assert summary.count == len(sample)
+        assert summary.moments.mean == pytest.approx(np.mean(sample))
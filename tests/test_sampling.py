@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.hypotheses import (
+    ImageBlurrinessProcessor,
+    ImageBrightSpotsProcessor,
+    ImageColdnessProcessor,
+    ImageLuminanceProcessor,
+    ImageSaturationProcessor,
+    ImageWhitenessProcessor,
+)
+from sno_fo_fro.sampling import SamplingImageProcessor
+
+
+def textured_image(h=600, w=800, seed=0):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, (h // 20, w // 20, 3), dtype=np.uint8)
+    img = cv2.resize(img, (w, h), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-20, 20, img.shape)
+    return np.clip(img.astype(int) + noise, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize(
+    "processor",
+    [
+        ImageSaturationProcessor(),
+        ImageLuminanceProcessor(),
+        ImageLuminanceProcessor(True),
+        ImageColdnessProcessor(),
+        ImageWhitenessProcessor(),
+        ImageBrightSpotsProcessor(),
+    ],
+)
+def test_interval_contains_full_value(processor):
+    img = textured_image()
+    estimate = SamplingImageProcessor.for_processor(
+        processor, target_error=0.01, confidence=0.999
+    ).process_image(img)
+    assert estimate.low <= processor.process_image(img) <= estimate.high
+    assert estimate.samples < estimate.total
+
+
+@pytest.mark.parametrize(
+    "processor, precision",
+    [
+        (ImageWhitenessProcessor(), 0.005),
+        (ImageColdnessProcessor(), 0.005),
+        (ImageSaturationProcessor(), 1.0),
+    ],
+)
+def test_default_target_error_fits_the_metric(processor, precision):
+    img = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    estimate = SamplingImageProcessor.for_processor(processor).process_image(img)
+
+    assert estimate.low <= processor.process_image(img) <= estimate.high
+    assert estimate.half_width <= precision
+
+
+def test_small_image_is_exact():
+    img = textured_image(40, 60)
+    processor = ImageBrightSpotsProcessor()
+    estimate = SamplingImageProcessor.for_processor(processor).process_image(img)
+    assert estimate.exact
+    assert abs(estimate.value - processor.process_image(img)) < 0.01
+
+
+def test_deterministic_under_seed():
+    img = textured_image()
+    sampler = SamplingImageProcessor.for_processor(ImageSaturationProcessor(), seed=7)
+    assert sampler.process_image(img) == sampler.process_image(img)
+
+
+def test_unsupported_processor():
+    with pytest.raises(TypeError):
+        SamplingImageProcessor.for_processor(ImageBlurrinessProcessor())
@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+
+from sno_fo_fro.scheduler import image_size, plan_schedule, typical_pixels
+
+
+def test_image_size_from_header(tmp_path):
+    img = np.zeros((37, 53, 3), dtype=np.uint8)
+    for ext in ("jpg", "png"):
+        path = str(tmp_path / f"img.{ext}")
+        cv2.imwrite(path, img)
+        assert image_size(path) == (37, 53)
+
+
+def test_truncated_headers(tmp_path):
+    img = np.zeros((37, 53, 3), dtype=np.uint8)
+    for ext in ("jpg", "png"):
+        data = cv2.imencode(f".{ext}", img)[1].tobytes()
+        for cut in range(1, len(data)):
+            path = str(tmp_path / f"{cut}.{ext}")
+            with open(path, "wb") as f:
+                f.write(data[:cut])
+            assert image_size(path) in (None, (37, 53))
+
+    # A file cut inside the start of frame does not abort the planning
+    data = cv2.imencode(".jpg", img)[1].tobytes()
+    cut = str(tmp_path / "cut.jpg")
+    with open(cut, "wb") as f:
+        f.write(data[: data.index(b"\xff\xc0") + 6])
+    whole = str(tmp_path / "whole.png")
+    cv2.imwrite(whole, img)
+    assert typical_pixels([cut, whole, whole]) == 37 * 53
+
+
+def test_plan_schedule_strategies():
+    small = plan_schedule(1000, 640 * 480, cpus=8)
+    assert (small.workers, small.cv_threads) == (8, 1)
+
+    large = plan_schedule(1000, 6000 * 4000, cpus=8)
+    assert (large.workers, large.cv_threads) == (2, 4)
+
+    few = plan_schedule(2, 640 * 480, cpus=8)
+    assert (few.workers, few.cv_threads) == (2, 4)
@@ -0,0 +1,72 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.dataset import DirectorySource
+from sno_fo_fro.experiment.experimenter import (
+    ExperimenterCompareMode,
+    ExperimenterWeather,
+)
+from sno_fo_fro.experiment.sequential import (
+    SequentialExperimenter,
+    obrien_fleming_spending,
+)
+from sno_fo_fro.hypotheses import ImageLuminanceProcessor
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    # Snow is brighter than fog, frost is indistinguishable from fog
+    parent = tmp_path_factory.mktemp("data")
+    rng = np.random.default_rng(0)
+    brightness = {"snow": 140, "fogsmog": 100, "frost": 100}
+    for label, mean in brightness.items():
+        os.makedirs(parent / label)
+        for i in range(200):
+            level = np.clip(rng.normal(mean, 20), 0, 255)
+            img = np.full((8, 8, 3), level, dtype=np.uint8)
+            cv2.imwrite(str(parent / label / f"{i}.png"), img)
+    return DirectorySource(str(parent))
+
+
+def test_spending_function():
+    alpha = 0.05
+    ts = np.linspace(0.05, 1, 20)
+    spent = [obrien_fleming_spending(t, alpha) for t in ts]
+    assert np.all(np.diff(spent) > 0)
+    assert spent[-1] == pytest.approx(alpha)
+    assert obrien_fleming_spending(0.2, alpha) < 1e-4
+
+
+def test_clear_effect_stops_early(dataset):
+    experimenter = SequentialExperimenter(
+        ImageLuminanceProcessor(), source=dataset, look_every=20
+    )
+    result = experimenter.run(ExperimenterWeather.SNOW, ExperimenterCompareMode.GREATER)
+    assert result.passed
+    assert result.images_total == 600
+    assert result.images_processed < 200
+    assert all(d.passed for d in result.decisions.values())
+
+
+def test_reverse_effect_stops_for_futility(dataset):
+    experimenter = SequentialExperimenter(
+        ImageLuminanceProcessor(), source=dataset, look_every=20
+    )
+    result = experimenter.run(ExperimenterWeather.SNOW, ExperimenterCompareMode.LESS)
+    assert not result.passed
+    assert result.images_processed < 200
+
+
+def test_no_effect_uses_all_images(dataset):
+    experimenter = SequentialExperimenter(
+        ImageLuminanceProcessor(), source=dataset, look_every=20
+    )
+    result = experimenter.run(ExperimenterWeather.FROST, ExperimenterCompareMode.LESS)
+    assert not result.passed
+    # Frost is darker than snow early on, but never differs from fog
+    assert result.decisions[ExperimenterWeather.SNOW].passed
+    assert not result.decisions[ExperimenterWeather.FOG].passed
+    assert 400 <= result.images_processed < 600
@@ -0,0 +1,112 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro import shard
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.shard import (
+    build_manifest,
+    merge,
+    missing_shards,
+    partial_path,
+    run_local,
+    run_shard,
+    shard_of,
+    write_manifest,
+)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    rng = np.random.default_rng(0)
+    for label in ("snow", "fogsmog", "frost"):
+        os.makedirs(tmp_path / "data" / label)
+        for i in range(4):
+            img = rng.integers(0, 256, (40, 50, 3), dtype=np.uint8)
+            cv2.imwrite(str(tmp_path / "data" / label / f"{i}.png"), img)
+    manifest_path = str(tmp_path / "manifest.tsv")
+    write_manifest(build_manifest(str(tmp_path / "data")), manifest_path)
+    return manifest_path
+
+
+def test_shard_assignment_is_deterministic():
+    paths = [f"weather-data/snow/{i}.jpg" for i in range(100)]
+    assert [shard_of(p, 7) for p in paths] == [shard_of(p, 7) for p in paths]
+    assert len({shard_of(p, 7) for p in paths}) == 7
+
+
+def test_merge_of_local_processes(manifest, tmp_path):
+    output_dir = str(tmp_path / "parts")
+    run_local(manifest, 3, output_dir, jobs=3)
+    result = merge(manifest, 3, output_dir)
+
+    assert len(result.table) == 12
+    assert set(result.samples["CONTRAST"]) == {"snow", "fogsmog", "frost"}
+
+    snow_dir = str(tmp_path / "data" / "snow")
+    expected = sorted(
+        float(m["CONTRAST"])
+        for m in ImageAnalyzer.process_images_in_dir(snow_dir).values()
+    )
+    assert sorted(result.samples["CONTRAST"]["snow"]) == pytest.approx(expected)
+
+    # The sketches of the shards merge into the same statistics
+    summary = result.summaries["CONTRAST"]["snow"]
+    assert summary.count == 4
+    assert summary.moments.mean == pytest.approx(np.mean(expected))
+    assert summary.quantiles.quantile(1.0) == pytest.approx(max(expected))
+
+
+def test_rerun_and_missing_shards(manifest, tmp_path):
+    output_dir = str(tmp_path / "parts")
+    run_local(manifest, 2, output_dir, jobs=2)
+    first = os.path.getmtime(partial_path(output_dir, 0, 2))
+    run_shard(manifest, 0, 2, output_dir)
+    assert os.path.getmtime(partial_path(output_dir, 0, 2)) == first
+
+    os.remove(partial_path(output_dir, 1, 2))
+    assert missing_shards(manifest, 2, output_dir) == [1]
+    with pytest.raises(ValueError):
+        merge(manifest, 2, output_dir)
+
+
+def test_black_image_does_not_spoil_summaries(manifest, tmp_path):
+    # COLDNESS of a black image is NaN
+    black = str(tmp_path / "data" / "snow" / "black.png")
+    cv2.imwrite(black, np.zeros((40, 50, 3), dtype=np.uint8))
+    write_manifest(build_manifest(str(tmp_path / "data")), manifest)
+    output_dir = str(tmp_path / "parts")
+    run_local(manifest, 2, output_dir, jobs=2)
+    result = merge(manifest, 2, output_dir)
+
+    summary = result.summaries["COLDNESS"]["snow"]
+    assert (summary.count, summary.non_finite) == (4, 1)
+    values = [
+        float(m["COLDNESS"])
+        for path, m in ImageAnalyzer.process_images_in_dir(
+            str(tmp_path / "data" / "snow")
+        ).items()
+        if path != black
+    ]
+    statistics = summary.statistics()
+    assert statistics["mean"] == pytest.approx(np.mean(values))
+    assert statistics["min"] == pytest.approx(min(values))
+    assert statistics["max"] == pytest.approx(max(values))
+
+
+def test_planned_threads_cover_missing_workers(manifest, tmp_path, monkeypatch):
+    pools = []
+
+    class RecordingExecutor(shard.ProcessPoolExecutor):
+        def __init__(self, max_workers, initializer=None, initargs=()):
+            pools.append((max_workers, initargs))
+            super().__init__(max_workers, initializer=initializer, initargs=initargs)
+
+    monkeypatch.setattr(shard, "ProcessPoolExecutor", RecordingExecutor)
+    monkeypatch.setattr(shard, "available_cpus", lambda: 8)
+    run_local(manifest, 2, str(tmp_path / "parts"))
+
+    # 12 small images plan 8 single-threaded workers, but there are 2 shards
+    assert pools == [(2, (4,))]
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from sno_fo_fro.experiment.experimenter import (
+    ExperimenterCompareMode,
+    SampleAnalyzer,
+    SketchSampleAnalyzer,
+)
+from sno_fo_fro.sketch import FixedHistogram, KLLSketch, MetricSummary, MomentSketch
+
+
+def test_merged_moments_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=10000)
+    sketch = MomentSketch()
+    for part in np.array_split(values, 7):
+        sketch.merge(MomentSketch().update(part))
+
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(values.std())
+    assert sketch.skewness == pytest.approx(stats.skew(values))
+    assert sketch.kurtosis == pytest.approx(stats.kurtosis(values, fisher=False))
+    assert (sketch.min, sketch.max) == (values.min(), values.max())
+
+
+def test_kll_quantiles_after_merge_and_serialization():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=50000)
+    sketch = KLLSketch(200, seed=0)
+    for seed, part in enumerate(np.array_split(values, 5)):
+        part_sketch = KLLSketch(200, seed=seed).update(part)
+        sketch.merge(KLLSketch.from_dict(json.loads(json.dumps(part_sketch.to_dict()))))
+
+    assert sketch.count == len(values)
+    assert sum(len(c) for c in sketch.compactors) < 1000
+    for q in (0.05, 0.25, 0.5, 0.75, 0.95):
+        assert np.mean(values <= sketch.quantile(q)) == pytest.approx(q, abs=0.02)
+
+    # Short streams are kept exactly
+    small = values[:101]
+    assert KLLSketch().update(small).quantile(0.5) == np.median(small)
+
+
+def test_summary_histogram_and_statistics():
+    rng = np.random.default_rng(2)
+    values = rng.uniform(0, 1, 1000)
+    summary = MetricSummary(low=0, high=1, bins=10)
+    other = MetricSummary(low=0, high=1, bins=10)
+    summary.update(values[:600])
+    other.update(values[600:])
+    summary = MetricSummary.from_dict(json.loads(json.dumps(summary.to_dict())))
+    summary.merge(other)
+
+    counts, edges = summary.histogram_counts()
+    assert np.array_equal(counts, np.histogram(values, 10, (0, 1))[0])
+    assert np.allclose(edges, np.linspace(0, 1, 11))
+    statistics = summary.statistics()
+    assert statistics["count"] == 1000
+    assert statistics["mean"] == pytest.approx(values.mean())
+    assert statistics["median"] == pytest.approx(np.median(values), abs=0.02)
+
+    with pytest.raises(ValueError):
+        FixedHistogram(0, 1, 10).merge(FixedHistogram(0, 2, 10))
+
+
+def test_non_finite_values_are_skipped():
+    summary = MetricSummary.from_values([1, np.nan, 2, 3, np.inf])
+    assert summary.statistics() == pytest.approx(
+        {
+            "count": 3,
+            "mean": 2.0,
+            "median": 2.0,
+            "min": 1.0,
+            "max": 3.0,
+            "std": np.std([1, 2, 3]),
+            "non_finite": 2,
+        }
+    )
+    summary.merge(MetricSummary.from_dict(summary.to_dict()))
+    assert (summary.count, summary.non_finite) == (6, 4)
+    assert KLLSketch().update([np.nan, 2, 1]).quantile(0.0) == 1.0
+
+
+@pytest.mark.parametrize("mode", list(ExperimenterCompareMode))
+def test_sketch_tests_match_exact_tests(mode):
+    rng = np.random.default_rng(3)
+    a, b = rng.normal(0, 1, 120), rng.normal(0.3, 1.2, 150)
+    exact = SampleAnalyzer(a, b, mode)
+    sketched = SketchSampleAnalyzer(
+        MetricSummary.from_values(a), MetricSummary.from_values(b), mode
+    )
+
+    expected = stats.mannwhitneyu(a, b, alternative=mode, method="asymptotic")
+    assert sketched.mannwhitneyu().statistic == expected.statistic
+    assert sketched.mannwhitneyu().pvalue == pytest.approx(expected.pvalue)
+    assert sketched.t_test().pvalue == pytest.approx(exact.t_test().pvalue)
+    assert sketched.ks_2samp().statistic == pytest.approx(exact.ks_2samp().statistic)
+    assert SketchSampleAnalyzer.normaltest(
+        MetricSummary.from_values(a)
+    ).pvalue == pytest.approx(stats.normaltest(a).pvalue)
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.stream import StreamAnalyzer
+from sno_fo_fro.workspace import get_workspace
+
+
+def make_scene(h=333, w=471):
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:h, 0:w]
+    base = np.dstack([xx * 255 / w, yy * 255 / h, (xx + yy) % 256]).astype(np.uint8)
+    scene = cv2.add(base, rng.integers(0, 40, (h, w, 3), dtype=np.uint8))
+    cv2.circle(scene, (150, 120), 50, (255, 255, 255), -1)
+    return scene
+
+
+def assert_matches_reference(metrics, frame, edges_tolerance=0.0):
+    expected = ImageAnalyzer.process_image(frame)
+    assert list(metrics) == list(expected)
+    for name, value in expected.items():
+        if name == "EDGE_DENSITY":
+            assert metrics[name] == pytest.approx(value, abs=edges_tolerance)
+        else:
+            assert metrics[name] == pytest.approx(value, rel=1e-7, abs=1e-12)
+
+
+def test_static_and_changed_frames():
+    scene = make_scene()
+    analyzer = StreamAnalyzer(tile_size=60, refresh_every=10)
+    assert_matches_reference(analyzer.process_image(scene), scene)
+    assert analyzer.last_recomputed == 1.0
+
+    # A static scene costs no tile recomputation
+    metrics = analyzer.process_image(scene.copy())
+    assert analyzer.last_recomputed == 0.0
+    assert_matches_reference(metrics, scene)
+
+    # A new object in the partial tiles at the bottom right corner
+    changed = scene.copy()
+    cv2.rectangle(changed, (430, 300), (470, 332), (250, 250, 250), -1)
+    metrics = analyzer.process_image(changed)
+    assert 0 < analyzer.last_recomputed < 0.5
+    assert analyzer.full_refreshes == 1
+    assert_matches_reference(metrics, changed, edges_tolerance=1e-3)
+
+
+def test_periodic_refresh():
+    scene = make_scene()
+    analyzer = StreamAnalyzer(tile_size=60, refresh_every=3)
+    frames = [scene]
+    for i in range(5):
+        frame = frames[-1].copy()
+        frame[10 * i : 10 * i + 30, 200:260] = (
+            255 - frame[10 * i : 10 * i + 30, 200:260]
+        )
+        frames.append(frame)
+    for frame in frames:
+        metrics = analyzer.process_image(frame)
+    assert analyzer.full_refreshes == 2
+    assert_matches_reference(metrics, frames[-1], edges_tolerance=1e-3)
+
+    # A new resolution starts over
+    analyzer.process_image(cv2.resize(scene, (200, 150)))
+    assert analyzer.full_refreshes == 3
+
+
+def test_invalid_tiles():
+    with pytest.raises(ValueError):
+        StreamAnalyzer(tile_size=50)
+    with pytest.raises(ValueError):
+        StreamAnalyzer(halo=2)
+
+
+def test_dark_frames():
+    # An offline camera sends black frames; COLDNESS is NaN as in the reference
+    analyzer = StreamAnalyzer(tile_size=60)
+    black = np.zeros((150, 200, 3), np.uint8)
+    for frame in (black, black.copy()):
+        metrics = analyzer.process_image(frame)
+        assert np.isnan(metrics["COLDNESS"])
+        assert metrics["WHITENESS"] == 0
+
+
+def test_workspace_stays_bounded():
+    scene = make_scene()
+    get_workspace().release()
+    ImageAnalyzer.process_image(scene)
+    full_frame = get_workspace().nbytes
+
+    # Changes of many sizes give dirty blocks of many shapes
+    analyzer = StreamAnalyzer(tile_size=60, refresh_every=1000)
+    frame = scene
+    for i in range(20):
+        frame = frame.copy()
+        cv2.rectangle(frame, (0, 0), (30 * i % 470, 25 * i % 330), (i, 0, 255), -1)
+        analyzer.process_image(frame)
+    assert get_workspace().nbytes <= full_frame
@@ -0,0 +1,74 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from sno_fo_fro.dataset import DirectorySource
+from sno_fo_fro.experiment.experimenter import (
+    ExperimenterCompareMode,
+    ExperimenterWeather,
+)
+from sno_fo_fro.sweep import (
+    BrightSpotsSweeper,
+    EdgeDensitySweeper,
+    SegmentsSharpnessSweeper,
+    WhitenessSweeper,
+    sweep,
+)
+
+
+def photo_like(seed, h=150, w=210, noise=10):
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, (h // 10, w // 10, 3), dtype=np.uint8)
+    img = cv2.resize(img, (w, h), interpolation=cv2.INTER_CUBIC)
+    return np.clip(img + rng.normal(0, noise, img.shape), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize(
+    "sweeper",
+    [
+        WhitenessSweeper(
+            {
+                "value_threshold": (100, 180.5, 255),
+                "saturation_threshold": (0, 49.5, 90),
+            }
+        ),
+        EdgeDensitySweeper(),
+        SegmentsSharpnessSweeper(
+            {
+                "segment_size": (7, 20),
+                "low_threshold": (50, 300),
+                "high_threshold": (400,),
+            }
+        ),
+        BrightSpotsSweeper(
+            {"kernel_size": (3, 15), "threshold_value": (-3, 0, 2.5, 20)}
+        ),
+    ],
+)
+def test_sweep_matches_processors(sweeper):
+    for seed in range(2):
+        img = photo_like(seed)
+        expected = [sweeper.processor(p).process_image(img) for p in sweeper.points]
+        assert sweeper.evaluate(img) == pytest.approx(np.array(expected, float))
+
+
+def test_sweep_ranks_separating_parameters(tmp_path):
+    for i, weather in enumerate(ExperimenterWeather):
+        os.makedirs(tmp_path / weather)
+        for j in range(6):
+            # Snow images get brighter and noisier than the others
+            img = photo_like(10 * i + j, noise=25 if weather == "snow" else 3)
+            cv2.imwrite(str(tmp_path / weather / f"{j}.png"), img)
+
+    table = sweep(
+        BrightSpotsSweeper({"kernel_size": (9,), "threshold_value": (10, 200)}),
+        DirectorySource(str(tmp_path)),
+        ExperimenterWeather.SNOW,
+        ExperimenterCompareMode.GREATER,
+    )
+    assert len(table) == 2
+    assert table.loc[0, "threshold_value"] == 10
+    assert table.loc[0, "passed"]
+    assert not table.loc[1, "passed"]
@@ -0,0 +1,30 @@
+import numpy as np
+
+from sno_fo_fro.analyzer import ImageAnalyzer
+from sno_fo_fro.workspace import BufferWorkspace, get_workspace
+
+
+def test_buffers_reused_for_same_shape():
+    ws = BufferWorkspace()
+    img = np.zeros((10, 20, 3), dtype=np.uint8)
+    first = ws.bind(img).get("hsv", img.shape)
+    second = ws.bind(img).get("hsv", img.shape)
+    assert first is second
+
+
+def test_buffers_released_on_shape_change():
+    ws = BufferWorkspace()
+    ws.bind(np.zeros((10, 20, 3), dtype=np.uint8)).get("hsv", (10, 20, 3))
+    assert ws.nbytes > 0
+    ws.bind(np.zeros((11, 20, 3), dtype=np.uint8))
+    assert ws.nbytes == 0
+
+
+def test_steady_state_results_are_stable():
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+    first = ImageAnalyzer.process_image(img)
+    held = get_workspace().nbytes
+    second = ImageAnalyzer.process_image(img)
+    assert first == second
+    assert get_workspace().nbytes == held